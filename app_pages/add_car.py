@@ -0,0 +1,25 @@
+import streamlit as st
+
+from carsapp.jobs import SCRAPE_PAGES, start_scrape
+from ui.jobs import job_runner, jobs_panel
+
+
+# ---------------- PAGE: ADD ----------------
+st.title("📝 Add New Car Listing")
+
+autotrader_pages = st.number_input("Autotrader pages to crawl (50 ads each)", min_value=1, max_value=200,
+                                   value=SCRAPE_PAGES)
+AutotraderSubmitted = st.button("Updata Autotrader Car")
+kijiji_pages = st.number_input("Kijiji pages to crawl", min_value=1, max_value=100, value=SCRAPE_PAGES)
+KjijiSubmitted = st.button("Updata Kjiji Car")
+refresh = st.checkbox("Also refresh prices of stored cars (crawls every page)")
+
+if KjijiSubmitted:
+    start_scrape("kijiji", kijiji_pages, runner=job_runner(), refresh=refresh)
+
+if AutotraderSubmitted:
+    start_scrape("autotrader", autotrader_pages, runner=job_runner(), refresh=refresh)
+
+# Each source retries with backoff on its own; this only polls their progress,
+# including scrapes run by `python -m carsapp scrape` / `schedule` in another process.
+jobs_panel(["autotrader", "kijiji"])
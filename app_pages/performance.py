@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from carsapp.metrics import flush, histogram, load_counters, load_spans, recent_profiles, slowest_runs, stage_summary
+
+
+# ---------------- PAGE: PERFORMANCE ----------------
+st.title("⏱️ Performance")
+st.caption("Time per stage of page renders and jobs (scrapes run from the command line included).")
+flush()     # this process's latest spans, so the page includes the rerun before it
+
+windows = {"Last hour": timedelta(hours=1), "Last 24 hours": timedelta(days=1),
+           "Last 7 days": timedelta(days=7), "Everything stored": None}
+window = windows[st.selectbox("Window", list(windows), index=1)]
+since = datetime.now() - window if window else None
+spans = load_spans(since=since)
+
+if spans.empty:
+    st.info("No timings recorded in this window yet.")
+else:
+    summary = stage_summary(spans)
+    st.subheader("Latency per stage")
+    st.bar_chart(summary.set_index("stage")[["p50_ms", "p95_ms"]], stack=False, horizontal=True, sort=False)
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+
+    stage = st.selectbox("Latency distribution of", summary["stage"])
+    st.bar_chart(histogram(spans, stage), sort=False)
+
+    st.subheader("Slowest recent runs")
+    st.caption("Page renders and jobs, with the time spent in each stage directly inside them "
+               "(ms; stages that run in parallel, like page fetches, add up past the run's own time).")
+    st.dataframe(slowest_runs(spans), use_container_width=True, hide_index=True)
+
+st.subheader("Counters")
+st.dataframe(load_counters(since=since), use_container_width=True, hide_index=True)
+
+st.subheader("Profiling")
+# Kept outside the widget's own state, which is dropped while other pages are shown.
+st.session_state["profile_reruns"] = st.checkbox(
+    "Profile every rerun of this session", value=st.session_state.get("profile_reruns", False),
+    help="Saves a profile of each rerun (pyinstrument if installed, else cProfile) to read below.",
+)
+profiles = recent_profiles()
+if profiles:
+    shown = st.selectbox("Profile", profiles, format_func=lambda path: path.rsplit("/", 1)[-1])
+    with open(shown, encoding="utf-8") as f:
+        st.code(f.read(), language=None)
@@ -0,0 +1,128 @@
+from datetime import date, timedelta
+
+import streamlit as st
+
+from carsapp.jobs import start_snapshot
+from carsapp.queries import days_on_market, price_drops
+from ui.common import export_data, na
+from ui.jobs import job_runner, jobs_panel
+from ui.listings import (
+    autotrader_details, kijiji_details, listing_controls, merged_details, paged_query, pager, render_cards,
+    search_panel, with_combined_valuations, with_valuations,
+)
+from ui.market_guide import bearer_token, market_guide_button, value_all_button
+
+
+# ---------------- PAGE: VIEW ----------------
+tokenTitle = st.text_input("Add your token", "enterprise-api.kdp.kardataservices")
+token = bearer_token(tokenTitle)
+value_all_button(token)
+search_panel()
+st.title("🚗 Autotrader Car Listings")
+with st.expander("See Autotrader explanation"):
+    filters, sort = listing_controls("autotrader", "autotrader")
+    page_result = paged_query("autotrader", "autotrader", filters, sort)
+    df = with_valuations(page_result.rows, "autotrader")
+
+    if df.empty:
+        st.info("No cars found. Add new cars using the 'Add Car' page or loosen the filters.")
+    else:
+        # Show DataFrame
+        st.dataframe(df, use_container_width=True)
+
+        # Card-style display
+        render_cards(
+            "autotrader", df, "title", "image_src", autotrader_details,
+            actions=lambda car: market_guide_button("autotrader", car, car["title"], car["brand"], token),
+        )
+
+        pager("autotrader", page_result)
+
+        # Download CSV
+        st.download_button(
+            label="📊 Download autotreader Excel",
+            data=export_data("autotrader", "xlsx"),
+            file_name="autotreader.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+
+        st.download_button(
+            "📥 Download CSV",
+            data=export_data("autotrader", "csv"),
+            file_name="cars.csv",
+            mime="text/csv",
+        )
+with st.expander("See Kijiji Vehicles"):
+    filters, sort = listing_controls("kijiji", "kijiji")
+    page_result = paged_query("kijiji", "kijiji", filters, sort)
+    kdf = with_valuations(page_result.rows, "kijiji")
+
+    if kdf.empty:
+        st.info("🚗 No Kijiji cars found. Add new cars, scrape data first or loosen the filters.")
+    else:
+        # Display DataFrame overview
+        st.dataframe(kdf, use_container_width=True)
+
+        # Card-style view
+        render_cards(
+            "kijiji", kdf, "name", "image", kijiji_details,
+            actions=lambda car: market_guide_button("kijiji", car, na(car["name"], ""), car["brand_name"], token),
+        )
+
+        pager("kijiji", page_result)
+
+        # --- Download button ---
+        st.download_button(
+            label="📊 Download kjiji Excel",
+            data=export_data("kijiji", "xlsx"),
+            file_name="kijiji_cars.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+        st.download_button(
+            "📥 Download All Cars (CSV)",
+            data=export_data("kijiji", "csv"),
+            file_name="kijiji_cars.csv",
+            mime="text/csv",
+        )       
+with st.expander("🧩 Combined View: Kijiji + Autotrader"):
+    filters, sort = listing_controls("merged", "combined")
+    page_result = paged_query("merged", "combined", filters, sort)
+    merged_df = with_combined_valuations(page_result.rows)
+
+    if merged_df.empty and sort == "best_deal":
+        st.info("No deal scores yet. They are computed after each scrape, or run `python -m carsapp score`.")
+    elif merged_df.empty:
+        st.info("No cars found in either table.")
+    else:
+        st.dataframe(merged_df, use_container_width=True)
+
+        # Card-style display
+        render_cards("merged", merged_df, "title", "image_src", merged_details)
+
+        pager("merged", page_result)
+
+        # Excel Download
+        st.download_button(
+            label="📊 Download Combined Excel",
+            data=export_data("combined", "xlsx"),
+            file_name="merged_cars.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+        # Parquet snapshot for analysis outside the app; only new rows are appended.
+        if st.button("🗂️ Update Parquet snapshot"):
+            start_snapshot(runner=job_runner())
+        jobs_panel(["snapshot"])
+
+st.title("📉 Price Changes")
+with st.expander("See price drops and days on market"):
+    since = st.date_input("Changed since", value=date.today() - timedelta(days=30), key="drops_since")
+    drops = price_drops(since=since)
+    if drops.empty:
+        st.info("No price drops seen yet. Refresh a source on the 'Add Car' page to track prices.")
+    else:
+        st.dataframe(drops, use_container_width=True)
+    st.subheader("Days on market")
+    st.dataframe(days_on_market(min_listings=3), use_container_width=True)
@@ -0,0 +1,79 @@
+"""Query cache: the reads of one View-page rerun, uncached vs cold vs warm cache.
+
+    python benchmarks/bench_cache.py --rows 100000 --reruns 20
+
+The queries a rerun of the View page makes (filter options, first page of
+each source, its valuations, price drops, days on market) run against a
+throwaway database: through the uncached functions, then through
+carsapp.cache with nothing new, and again right after an ingest into one
+source, which should only miss for the queries reading that source.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_ingest import synthetic_autotrader, synthetic_kijiji  # noqa: E402
+from carsapp.cache import get_cache  # noqa: E402
+from carsapp.db import Database, init_db  # noqa: E402
+from carsapp.ingest import ingest_autotrader, ingest_kijiji  # noqa: E402
+from carsapp.queries import ListingFilters, days_on_market, distinct_values, price_drops, query_listings  # noqa: E402
+from carsapp.valuation import get_valuations  # noqa: E402
+
+
+def rerun(db, uncached=False):
+    call = (lambda fn, *args, **kwargs: fn.__wrapped__(*args, db=db, **kwargs)) if uncached else (
+        lambda fn, *args, **kwargs: fn(*args, db=db, **kwargs))
+    for source in ("autotrader", "kijiji", "combined"):
+        call(distinct_values, source, "brand")
+        call(distinct_values, source, "model")
+        page = call(query_listings, source, ListingFilters(hide_duplicates=source == "combined"))
+        ids = page.rows["listing_id" if source == "combined" else "id"]
+        call(get_valuations, "kijiji" if source == "kijiji" else "autotrader", ids)
+    call(price_drops)
+    call(days_on_market, min_listings=3)
+
+
+def measure(label, fn, reruns):
+    times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    print(f"  {label:<26} median {statistics.median(times) * 1000:8.2f} ms  max {max(times) * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="rows per source")
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = init_db(Database(os.path.join(tmp, "cache.db")))
+        ingest_autotrader(synthetic_autotrader(args.rows), db)
+        ingest_kijiji(synthetic_kijiji(args.rows), db)
+
+        rerun(db, uncached=True)     # warm sqlite's page cache first
+        print(f"one View rerun, {args.rows} rows per source")
+        measure("uncached", lambda: rerun(db, uncached=True), args.reruns)
+        measure("cold cache", lambda: (get_cache().clear(), rerun(db)), args.reruns)
+        get_cache().clear()
+        rerun(db)
+        measure("warm cache", lambda: rerun(db), args.reruns)
+
+        ingest_kijiji([{"name": "2020 Mazda CX-5", "url": "https://www.kijiji.ca/v/bench-new", "price": "25000"}], db)
+        before = get_cache().stats().set_index("function")["misses"]
+        measure("first rerun after ingest", lambda: rerun(db), 1)
+        after = get_cache().stats().set_index("function")["misses"]
+        print("  misses after the ingest:", (after - before.reindex(after.index, fill_value=0)).to_dict())
+        print(get_cache().stats().to_string(index=False))
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
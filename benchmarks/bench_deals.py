@@ -0,0 +1,132 @@
+"""Deal scores: vectorized carsapp.deals vs a per-group apply, incremental rescoring, best-deal sort.
+
+    python benchmarks/bench_deals.py --listings 200000
+
+Synthetic Kijiji listings are priced from make/model, age and odometer with
+noise, plus monthly-payment "prices" (outliers the scorer must skip) and a
+set of planted deals listed 30% under their value. Timed: scoring every
+group at once, the same statistics through groupby().apply of a Python
+function, rescoring after one more page of ads, and the first page of the
+best-deal sort against loading every listing to sort it in pandas. Also
+reports how many planted deals make the first pages of the sort.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carsapp.db import Database, init_db  # noqa: E402
+from carsapp.deals import GROUP, MIN_PEERS, MIN_PRICE, _dirty_listings, score_deals, score_frame  # noqa: E402
+from carsapp.ingest import ingest_kijiji  # noqa: E402
+from carsapp.queries import ListingFilters, query_listings  # noqa: E402
+
+
+MAKES = ["Honda", "Toyota", "Ford", "Mazda", "Hyundai", "Subaru", "Chevrolet", "Nissan", "Kia", "BMW",
+         "Audi", "Volkswagen", "Jeep", "Ram", "GMC", "Dodge", "Lexus", "Acura", "Tesla", "Mitsubishi"]
+# Twelve models per make, each with its own new price: a few thousand peer groups in all.
+MODELS = {f"{make} M{i}": random.Random(f"{make}{i}").randint(20, 90) * 1000 for make in MAKES for i in range(12)}
+
+
+def synthetic(n, rnd, start=0, deal_share=0.002, payment_share=0.01):
+    cars, planted = [], set()
+    for i in range(start, start + n):
+        name = rnd.choice(list(MODELS))
+        make, model = name.split(" ", 1)
+        year, km = rnd.randint(2008, 2025), rnd.randint(0, 300) * 1000
+        value = MODELS[name] * 0.87 ** (2025 - year) * (1 - km / 600_000)
+        price = max(1000, value * rnd.gauss(1, 0.08))
+        if rnd.random() < payment_share:
+            price = rnd.randint(199, 699)           # "$399/month" ads
+        elif rnd.random() < deal_share and value > 4000:
+            price = value * 0.7
+            planted.add(f"https://www.kijiji.ca/v/{i}")
+        cars.append({
+            "@type": "Car", "name": f"{year} {name}", "url": f"https://www.kijiji.ca/v/{i}",
+            "price": str(round(price, -2)), "brand.name": make, "model": model, "vehicleModelDate": str(year),
+            "mileageFromOdometer.value": str(km), "mileageFromOdometer.unitCode": "KMT",
+        })
+    return cars, planted
+
+
+def apply_scores(df):
+    # The same statistics the obvious way: a Python function per peer group.
+    def one(group):
+        price = group["price_num"].where(group["price_num"] >= MIN_PRICE)
+        q1, q3 = price.quantile(0.25), price.quantile(0.75)
+        spread = max(q3 / q1, 1.25) ** 3
+        inlier = price.between(q1 / spread, q3 * spread)
+        fit = group[inlier & group["odometer_km"].notna()]
+        expected = pd.Series(price[inlier].median(), index=group.index)
+        if len(fit) >= MIN_PEERS and fit["odometer_km"].nunique() > 1:
+            design = np.column_stack([np.ones(len(fit)), fit["odometer_km"], fit["year"]])
+            (a, per_km, per_year), *_ = np.linalg.lstsq(design, np.log(fit["price_num"]), rcond=None)
+            if per_km < 0 and per_year >= 0:
+                km = group["odometer_km"].clip(fit["odometer_km"].min(), fit["odometer_km"].max())
+                expected = np.exp(a + per_km * km + per_year * group["year"])
+        return ((expected - price) / expected).where(inlier & (inlier.sum() >= MIN_PEERS))
+    return df.groupby(GROUP, group_keys=False).apply(one, include_groups=False)
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<44} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=200_000)
+    parser.add_argument("--page", type=int, default=40, help="ads in the incremental page")
+    args = parser.parse_args()
+
+    rnd = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = init_db(Database(os.path.join(tmp, "deals.db")))
+        cars, planted = synthetic(args.listings, rnd)
+        ingest_kijiji(cars, db)
+        print(f"{args.listings} listings, {len(planted)} planted deals")
+
+        with db.writer() as conn:
+            df = _dirty_listings(conn)
+        print(f"  {df.groupby(GROUP).ngroups} peer groups")
+        timed("score_frame (vectorized groupby)", lambda: score_frame(df))
+        timed("groupby().apply per group", lambda: apply_scores(df))
+        stats = timed("score_deals, every group (read + write)", lambda: score_deals(db=db))
+        print(f"  {'':<44} {stats.scored} of {stats.listings} scored")
+        stats = timed("score_deals, every group again (no changes)", lambda: score_deals(full=True, db=db))
+        print(f"  {'':<44} {stats.changed} rows written")
+
+        page, _ = synthetic(args.page, rnd, start=args.listings)
+        ingest_kijiji(page, db)
+        stats = timed(f"score_deals after one page of {args.page} ads", lambda: score_deals(db=db))
+        print(f"  {'':<44} {stats.groups} groups, {stats.listings} listings rescored, {stats.changed} changed")
+
+        best = query_listings.__wrapped__
+        combined = ListingFilters(hide_duplicates=True)
+        rows = timed("best-deal sort, first page (indexed)",
+                     lambda: best("combined", combined, sort="best_deal", db=db).rows)
+        with db.reader() as conn:
+            timed("same from pandas: load every listing, sort", lambda: pd.read_sql_query(
+                "SELECT * FROM listings", conn).nlargest(len(rows), "deal_score"))
+        first = []
+        cursor = None
+        for _ in range(5):
+            result = best("combined", combined, sort="best_deal", after=cursor, db=db)
+            first.extend(result.rows["ad_link"])
+            cursor = result.next_cursor
+        print(f"  planted deals in the first {len(first)} best deals: {len(planted & set(first))}"
+              f" (of {len(planted)}); monthly payments: "
+              f"{sum(r['price_num'] < MIN_PRICE for r in result.rows.to_dict('records'))}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
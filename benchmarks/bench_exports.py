@@ -0,0 +1,75 @@
+"""Full-table exports: old DataFrame -> openpyxl/to_csv in memory vs carsapp.exports.
+
+    python benchmarks/bench_exports.py --rows 100000
+
+Time and peak Python memory of each path on a throwaway database, plus a
+second carsapp.exports call that is served from the file cache because the
+table has not changed. Peak memory comes from a separate run under
+tracemalloc, which slows openpyxl down too much to time it at the same time.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_ingest import synthetic_autotrader  # noqa: E402
+from carsapp import exports  # noqa: E402
+from carsapp.db import Database, get_all_autotrader_cars, init_db  # noqa: E402
+from carsapp.ingest import ingest_autotrader  # noqa: E402
+
+
+def old_excel(db):
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        get_all_autotrader_cars(db).to_excel(writer, index=False, sheet_name='Merged Cars')
+    return output.getvalue()
+
+
+def old_csv(db):
+    return get_all_autotrader_cars(db).to_csv(index=False).encode("utf-8")
+
+
+def measure(label, fn, reset=lambda: None):
+    reset()
+    start = time.perf_counter()
+    data = fn()
+    elapsed = time.perf_counter() - start
+    reset()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  {label:<18} {elapsed:7.2f}s  peak {peak / 2**20:8.1f} MiB  file {len(data) / 2**20:6.1f} MiB")
+
+
+def clear_cache():
+    shutil.rmtree(exports.EXPORT_DIR, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exports.EXPORT_DIR = os.path.join(tmp, "exports")
+        db = init_db(Database(os.path.join(tmp, "exports.db")))
+        ingest_autotrader(synthetic_autotrader(args.rows), db)
+        for fmt, old in (("xlsx", old_excel), ("csv", old_csv)):
+            print(f"{fmt}, {args.rows} rows")
+            measure("old (in memory)", lambda: old(db))
+            measure("streamed", lambda: exports.export_bytes("autotrader", fmt, db), clear_cache)
+            measure("streamed (cached)", lambda: exports.export_bytes("autotrader", fmt, db))
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Price history: repeated upserts of the same listings, then the history queries.
+
+    python benchmarks/bench_history.py --listings 100000 --rounds 5 --change-rate 0.05
+
+Each round re-scrapes every synthetic Kijiji listing with --change-rate of
+them repriced (mostly down) into a throwaway database. Only the changed
+ones should add listing_observations rows.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carsapp.db import Database, init_db  # noqa: E402
+from carsapp.ingest import ingest_kijiji  # noqa: E402
+from carsapp.queries import days_on_market, price_drops, price_history  # noqa: E402
+
+
+MAKES = ["Honda Civic", "Toyota Corolla", "Ford F-150", "Mazda CX-5", "Hyundai Elantra", "Subaru Outback"]
+
+
+def listings(n, rnd):
+    cars = []
+    for i in range(n):
+        make, model = rnd.choice(MAKES).split(" ", 1)
+        cars.append({
+            "@type": "Car", "name": f"{rnd.randint(2005, 2025)} {make} {model}",
+            "price": str(rnd.randint(3, 80) * 1000), "priceCurrency": "CAD",
+            "url": f"https://www.kijiji.ca/v-cars-trucks/{i}", "brand.name": make, "model": model,
+            "mileageFromOdometer.value": str(rnd.randint(0, 300) * 1000), "mileageFromOdometer.unitCode": "KMT",
+        })
+    return cars
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<28} {(time.perf_counter() - start) * 1000:9.1f} ms  {result}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--change-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    rnd = random.Random(3)
+    cars = listings(args.listings, rnd)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = init_db(Database(os.path.join(tmp, "history.db")))
+        print("upserts")
+        timed("first scrape", lambda: ingest_kijiji(cars, db))
+        for round_number in range(1, args.rounds + 1):
+            for car in rnd.sample(cars, int(len(cars) * args.change_rate)):
+                car["price"] = str(max(500, int(car["price"]) + rnd.choice([-3000, -2000, -1000, -500, 1000])))
+            timed(f"re-scrape {round_number}", lambda: ingest_kijiji(cars, db))
+        with db.reader() as conn:
+            observations = conn.execute("SELECT COUNT(*) FROM listing_observations").fetchone()[0]
+            newest = conn.execute("SELECT MAX(seen_at) FROM listing_observations").fetchone()[0]
+        print(f"  {observations} observations for {args.listings} listings")
+
+        print("queries")
+        timed("price_drops (all)", lambda: len(price_drops(db=db)))
+        timed("price_drops (since newest)", lambda: len(price_drops(since=newest[:10], db=db)))
+        timed("days_on_market", lambda: len(days_on_market(db=db)))
+        timed("price_history", lambda: len(price_history(args.listings // 2, db=db)))
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
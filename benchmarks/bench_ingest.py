@@ -0,0 +1,119 @@
+"""Compare the bulk ingest path against the old one-connection-per-row inserts.
+
+    python benchmarks/bench_ingest.py --rows 100000 --legacy-rows 5000
+
+Both paths write into throwaway databases in a temp directory. The legacy path
+does a connect/INSERT/commit/close per listing exactly like the old
+insert_car_autotreader helper, so by default it only runs on a slice of the
+batch and is compared on rows/sec.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carsapp.db import Database, init_db  # noqa: E402
+from carsapp.ingest import ingest_autotrader, ingest_kijiji  # noqa: E402
+
+
+MAKES = ["Honda Civic", "Toyota Corolla", "Ford F-150", "Mazda CX-5", "Hyundai Elantra", "Subaru Outback"]
+
+
+def synthetic_autotrader(n):
+    rnd = random.Random(42)
+    for i in range(n):
+        year = rnd.randint(2005, 2025)
+        yield {
+            "title": f"{year} {rnd.choice(MAKES)}",
+            "price": f"${rnd.randint(3, 80) * 1000:,}",
+            "location": "London, ON",
+            "odometer": f"{rnd.randint(0, 300) * 1000:,} km",
+            "image_src": f"https://images.example.com/{i}.jpg",
+            "ad_link": f"https://www.autotrader.ca/a/{i}",
+        }
+
+
+def synthetic_kijiji(n):
+    rnd = random.Random(7)
+    for i in range(n):
+        make, model = rnd.choice(MAKES).split(" ", 1)
+        yield {
+            "@type": "Car",
+            "name": f"{rnd.randint(2005, 2025)} {make} {model}",
+            "description": "One owner, winter tires included.",
+            "image": f"https://images.example.com/k{i}.jpg",
+            "price": str(rnd.randint(3, 80) * 1000),
+            "priceCurrency": "CAD",
+            "url": f"https://www.kijiji.ca/v-cars-trucks/{i}",
+            "brand.name": make,
+            "mileageFromOdometer.value": str(rnd.randint(0, 300) * 1000),
+            "mileageFromOdometer.unitCode": "KMT",
+            "model": model,
+        }
+
+
+def legacy_autotrader(db_file, cars):
+    for car in cars:
+        conn = sqlite3.connect(db_file)
+        c = conn.cursor()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        c.execute("""
+            INSERT INTO autotrader (title, price, location, odometer, image_src, ad_link, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (car["title"], car["price"], car["location"], car["odometer"], car["image_src"], car["ad_link"], now))
+        conn.commit()
+        conn.close()
+
+
+def bulk(db, ingest, cars):
+    return ingest(cars, db=db)
+
+
+def timed(label, n, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {n:>8} rows  {elapsed:8.2f}s  {n / elapsed:>12,.0f} rows/sec")
+    if result is not None:
+        print(f"{'':<28} {result}")
+    return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--legacy-rows", type=int, default=5_000,
+                        help="rows pushed through the per-row path (0 = same as --rows)")
+    args = parser.parse_args()
+    legacy_rows = args.legacy_rows or args.rows
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {name: os.path.join(tmp, f"{name}.db") for name in ("legacy", "bulk_at", "bulk_kj")}
+        dbs = {name: init_db(Database(path)) for name, path in paths.items()}
+        # The old helpers ran against a default rollback-journal database.
+        dbs.pop("legacy").close()
+        sqlite3.connect(paths["legacy"]).execute("PRAGMA journal_mode=DELETE").fetchone()
+
+        legacy = timed("autotrader per-row", legacy_rows,
+                       lambda: legacy_autotrader(paths["legacy"], synthetic_autotrader(legacy_rows)))
+        fast = timed("autotrader bulk", args.rows,
+                     lambda: bulk(dbs["bulk_at"], ingest_autotrader, synthetic_autotrader(args.rows)))
+        timed("kijiji bulk", args.rows,
+              lambda: bulk(dbs["bulk_kj"], ingest_kijiji, synthetic_kijiji(args.rows)))
+        timed("kijiji bulk (all known)", args.rows,
+              lambda: bulk(dbs["bulk_kj"], ingest_kijiji, synthetic_kijiji(args.rows)))
+
+        for db in dbs.values():
+            db.close()
+
+    print(f"\nbulk speedup over per-row: {fast / legacy:,.1f}x")
+
+
+if __name__ == "__main__":
+    main()
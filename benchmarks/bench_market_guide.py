@@ -0,0 +1,148 @@
+"""Market-guide lookups against a local stub API: uncached per-call requests vs MarketGuideClient.
+
+    python benchmarks/bench_market_guide.py --lookups 300 --distinct 100 --latency-ms 20
+
+The stub server mimics /marketguide/models and /marketguide, sleeps
+--latency-ms per request and counts how many requests and new TCP
+connections it saw. The "uncached" run does what the old button handler did:
+two fresh requests.get calls per car, no session and no cache.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carsapp.market_guide import MarketGuideClient, TTLCache  # noqa: E402
+
+
+MODELS = {
+    "Honda": ["Civic", "Accord", "CR-V", "Pilot"],
+    "Toyota": ["Corolla", "Camry", "RAV4", "Tacoma"],
+    "Ford": ["F-150", "Escape", "Focus", "Mustang"],
+    "Mazda": ["CX-5", "Mazda3", "CX-30"],
+}
+
+
+class StubAPI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real API
+    disable_nagle_algorithm = True
+    latency = 0.0
+    stats = {"requests": 0, "connections": 0}
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            self.stats["connections"] += 1
+
+    def do_GET(self):
+        with self.lock:
+            self.stats["requests"] += 1
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.endswith("/marketguide/models"):
+            body = {"modelNames": MODELS.get(query["makeNames"][0], [])}
+        else:
+            rnd = random.Random(url.query)
+            vehicles = [{"salePrice": rnd.randint(8, 40) * 1000} for _ in range(10)]
+            body = {"marketGuideVehicles": vehicles, "totalCount": len(vehicles)}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(latency):
+    StubAPI.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def sample_cars(n, distinct):
+    # Lookups repeat, as they do when the same listings are viewed across reruns and sessions.
+    rnd = random.Random(1)
+    pool = []
+    for _ in range(distinct):
+        make = rnd.choice(list(MODELS))
+        model = rnd.choice(MODELS[make])
+        year = rnd.randint(2012, 2022)
+        pool.append((f"{year} {make} {model}", make, year, rnd.randint(20, 200) * 1000))
+    return [rnd.choice(pool) for _ in range(n)]
+
+
+def uncached(base_url, cars):
+    for title, make, year, odometer in cars:
+        models = requests.get(f"{base_url}/marketguide/models",
+                              params={"makeNames": make}, timeout=30).json()["modelNames"]
+        model = next(m for m in models if m.lower() in title.lower())
+        requests.get(f"{base_url}/marketguide", timeout=30, params={
+            "makeNames": make, "modelNames": model, "yearMin": year - 1, "odometerMax": odometer + 5000,
+        }).json()
+
+
+def client_run(base_url, cars):
+    client = MarketGuideClient("stub-token", base_url=base_url,
+                               models_cache=TTLCache(256, 3600), guide_cache=TTLCache(4096, 3600))
+    for title, make, year, odometer in cars:
+        client.lookup(title, make=make, year=year, odometer_km=odometer)
+    client.close()
+    return client
+
+
+def measure(label, base_url, fn, cars):
+    StubAPI.stats.update(requests=0, connections=0)
+    latencies = []
+
+    def timed_cars():
+        for car in cars:
+            start = time.perf_counter()
+            yield car
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    result = fn(base_url, timed_cars())
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed:7.2f}s  requests={StubAPI.stats['requests']:<5} "
+          f"connections={StubAPI.stats['connections']:<5} "
+          f"p50={statistics.median(latencies) * 1000:6.1f}ms  "
+          f"p95={statistics.quantiles(latencies, n=20)[-1] * 1000:6.1f}ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=300)
+    parser.add_argument("--distinct", type=int, default=100, help="distinct cars the lookups are drawn from")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    server, base_url = start_stub(args.latency_ms / 1000)
+    try:
+        cars = sample_cars(args.lookups, args.distinct)
+        measure("uncached", base_url, uncached, cars)
+        client = measure("client", base_url, client_run, cars)
+        print(f"\nclient cache: models {client.models_cache.hits} hits / {client.models_cache.misses} misses, "
+              f"guides {client.guide_cache.hits} hits / {client.guide_cache.misses} misses")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
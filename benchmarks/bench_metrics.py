@@ -0,0 +1,76 @@
+"""Metrics overhead: cost of a span and a counter, flushing, and reading the store back.
+
+    python benchmarks/bench_metrics.py --spans 200000
+
+Times a bare loop against the same loop with a span (nested under a root
+span, as in a render or a job) and a counter increment per iteration, with
+metrics enabled and disabled. Then flushes the buffered records into a
+throwaway store and times what the Performance page does with them: load,
+stage summary, one histogram and the slowest runs.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carsapp import metrics  # noqa: E402
+
+
+STAGES = ["fetch", "parse", "upsert", "db_read", "merge", "thumbnails"]
+
+
+def timed(label, fn, per=None):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    extra = f"  {elapsed / per * 1e6:7.2f} µs each" if per else ""
+    print(f"  {label:<44} {elapsed * 1000:9.1f} ms{extra}")
+    return result
+
+
+def spans(n, rnd):
+    # Twenty stages per root, like a render reading a page of cards.
+    for i in range(0, n, 20):
+        with metrics.span("render", root=True, page="view_cars"):
+            for _ in range(20):
+                with metrics.span(rnd.choice(STAGES), source="kijiji"):
+                    pass
+                metrics.count("bench.items")
+
+
+def bare(n, rnd):
+    for i in range(0, n, 20):
+        for _ in range(20):
+            rnd.choice(STAGES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spans", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics.METRICS_DIR = tmp
+        metrics.FLUSH_SECONDS = 3600     # flushed by record count only, as under load
+        print(f"{args.spans} spans")
+        timed("bare loop", lambda: bare(args.spans, random.Random(1)), args.spans)
+        metrics.ENABLED = False
+        timed("span + counter, metrics disabled", lambda: spans(args.spans, random.Random(1)), args.spans)
+        metrics.ENABLED = True
+        timed("span + counter, recorded and flushed", lambda: spans(args.spans, random.Random(1)), args.spans)
+        timed("final flush", metrics.flush)
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+        print(f"  {'':<44} {size / 1e6:9.1f} MB in {len(os.listdir(tmp))} file(s)")
+
+        loaded = timed("load_spans", metrics.load_spans)
+        timed("stage_summary", lambda: metrics.stage_summary(loaded))
+        timed("histogram (one stage)", lambda: metrics.histogram(loaded, "fetch"))
+        timed("slowest_runs", lambda: metrics.slowest_runs(loaded))
+
+
+if __name__ == "__main__":
+    main()
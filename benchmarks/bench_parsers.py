@@ -0,0 +1,214 @@
+"""Per-page parse time of the scraper parsers against the old full-document BeautifulSoup code.
+
+    python benchmarks/bench_parsers.py --pages 20
+    python benchmarks/bench_parsers.py --fixtures saved_pages/
+
+With --fixtures, every autotrader*.html (an AdsHtml fragment) and kijiji*.html
+(a full list page) in the directory is parsed; otherwise synthetic pages shaped
+like the real ones are generated (--save-fixtures DIR writes them out). Each
+parser must return exactly what the old code returns for the same page.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carsapp.scrapers import autotrader, kijiji  # noqa: E402
+
+
+# ---------------- OLD PARSERS ----------------
+def legacy_autotrader(html):
+    soup = BeautifulSoup(html, "html.parser")
+    cars = []
+    for wrapper in soup.find_all("div", class_="dealer-split-wrapper"):
+        car = {}
+        title_tag = wrapper.find("span", class_="title-with-trim")
+        car["title"] = title_tag.get_text(strip=True) if title_tag else None
+        price_tag = wrapper.find("span", class_="price-amount")
+        car["price"] = price_tag.get_text(strip=True) if price_tag else None
+        location_tag = wrapper.find("span", class_="proximity-text overflow-ellipsis")
+        car["location"] = location_tag.get_text(strip=True) if location_tag else None
+        odometer_tag = wrapper.find("span", class_="odometer-proximity")
+        car["odometer"] = odometer_tag.get_text(strip=True) if odometer_tag else None
+        image_tag = wrapper.find("img", class_="photo-image") or wrapper.find("img")
+        image_url = None
+        if image_tag:
+            for attr in ["data-original", "data-src", "src"]:
+                if image_tag.get(attr) and not image_tag[attr].startswith("data:image"):
+                    image_url = image_tag[attr]
+                    break
+        car["image_src"] = image_url
+        ad_tag = wrapper.find("a", class_="inner-link")
+        car["ad_link"] = autotrader.BASE_URL + ad_tag["href"] if ad_tag and ad_tag.has_attr("href") else None
+        cars.append(car)
+    return cars
+
+
+def legacy_kijiji(html):
+    soup = BeautifulSoup(html, "html.parser")
+    json_blocks = []
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            json_blocks.append(json.loads(script.string))
+        except (json.JSONDecodeError, TypeError):
+            pass
+    for block in json_blocks:
+        if isinstance(block, dict) and "itemListElement" in block:
+            return [kijiji.extract_vehicle_info(v) for v in block["itemListElement"]]
+    return []
+
+
+# ---------------- FIXTURES ----------------
+MAKES = ["Honda Civic", "Toyota Corolla", "Ford F-150", "Mazda CX-5", "Hyundai Elantra", "Subaru Outback"]
+
+
+def autotrader_fragment(rnd, page, ads=50):
+    # Roughly the markup of one search result: nested layout divs, badges and a photo carousel.
+    out = []
+    for i in range(ads):
+        ad = page * ads + i
+        year, name = rnd.randint(2005, 2025), rnd.choice(MAKES)
+        lazy = rnd.random() < 0.5
+        image = (f'<img class="photo-image" src="data:image/gif;base64,R0lGOD" data-original="https://images.autotrader.ca/{ad}.jpg">'
+                 if lazy else f'<img class="photo-image" src="https://images.autotrader.ca/{ad}.jpg">')
+        out.append(f"""
+<div class="result-item-inner organic" data-ad="{ad}">
+  <div class="dealer-split-wrapper">
+    <div class="col-xs-12 photo-wrapper"><div class="badge-row"><span class="badge">Great price</span></div>
+      <div class="carousel">{image}<img class="thumb" src="https://images.autotrader.ca/{ad}_2.jpg"></div></div>
+    <div class="col-xs-12 detail-wrapper">
+      <a class="inner-link" href="/a/{name.split()[0].lower()}/{ad}/?showcpo=ShowCpo&amp;ncse=no">
+        <h2 class="h2-title"><span class="title-with-trim"> {year} {name} <span class="trim">LX</span> </span></h2></a>
+      <div class="price"><span class="price-amount">${rnd.randint(3, 80) * 1000:,}</span>
+        <span class="price-delta">${rnd.randint(1, 20) * 100} below market</span></div>
+      <div class="kms"><span class="odometer-proximity"> {rnd.randint(0, 300) * 1000:,} km </span></div>
+      <div class="location"><span class="proximity-text overflow-ellipsis">London, ON &middot; {rnd.randint(1, 90)} km</span>
+        <span class="proximity-text">Dealer</span></div>
+      <ul class="features">{''.join(f'<li><i class="icon"></i>feature {j}</li>' for j in range(8))}</ul>
+    </div>
+  </div>
+</div>""")
+    return "\n".join(out)
+
+
+def kijiji_page(rnd, page, ads=40):
+    items = []
+    for i in range(ads):
+        ad = page * ads + i
+        make, model = rnd.choice(MAKES).split(" ", 1)
+        items.append({"@type": "ListItem", "position": i + 1, "item": {
+            "@type": "Car", "name": f"{rnd.randint(2005, 2025)} {make} {model}",
+            "url": f"https://www.kijiji.ca/v-cars-trucks/london/{ad}", "image": f"https://media.kijiji.ca/{ad}.jpg",
+            "description": "One owner, winter tires included. " * 6,
+            "offers": {"price": str(rnd.randint(3, 80) * 1000), "priceCurrency": "CAD"},
+            "brand": {"name": make}, "model": model,
+            "mileageFromOdometer": {"value": str(rnd.randint(0, 300) * 1000), "unitCode": "KMT"},
+            "vehicleEngine": {"fuelType": "Gasoline"}, "vehicleTransmission": "Automatic",
+        }})
+    blocks = [
+        {"@context": "https://schema.org", "@type": "WebPage", "name": "Cars & Trucks in London"},
+        {"@context": "https://schema.org", "@type": "ItemList", "itemListElement": items},
+        {"@context": "https://schema.org", "@type": "Organization", "name": "Kijiji", "url": "https://www.kijiji.ca"},
+    ]
+    scripts = "".join(f'<script type="application/ld+json">{json.dumps(b)}</script>' for b in blocks[::2])
+    cards = "".join(
+        f'<li data-listingid="{page * ads + i}"><section class="card"><div class="image"><img src="x.jpg" alt=""></div>'
+        f'<div class="info"><h3><a href="/v/{i}">Listing {i}</a></h3><p class="price">$1</p>'
+        f'<p class="desc">{"Lorem ipsum dolor sit amet " * 20}</p></div></section></li>'
+        for i in range(ads)
+    )
+    state = json.dumps({"props": {"pageProps": {"listings": [item["item"] for item in items] * 3}}})
+    return (f'<!DOCTYPE html><html><head><title>Cars</title>{scripts}'
+            f'<script>window.__APOLLO__ = {{}};</script></head><body><nav>{"<a href=#>x</a>" * 200}</nav>'
+            f'<main><ul class="results">{cards}</ul></main>'
+            f'<script type="application/ld+json">{json.dumps(blocks[1])}</script>'
+            f'<script id="__NEXT_DATA__" type="application/json">{state}</script></body></html>')
+
+
+def load_pages(args):
+    if args.fixtures:
+        pages = {}
+        for source in ("autotrader", "kijiji"):
+            files = sorted(glob.glob(os.path.join(args.fixtures, f"{source}*.html")))
+            pages[source] = [open(f, encoding="utf-8").read() for f in files]
+        return pages
+    rnd = random.Random(3)
+    pages = {
+        "autotrader": [autotrader_fragment(rnd, p) for p in range(args.pages)],
+        "kijiji": [kijiji_page(rnd, p) for p in range(args.pages)],
+    }
+    if args.save_fixtures:
+        os.makedirs(args.save_fixtures, exist_ok=True)
+        for source, htmls in pages.items():
+            for i, html in enumerate(htmls):
+                with open(os.path.join(args.save_fixtures, f"{source}_{i:03d}.html"), "w", encoding="utf-8") as f:
+                    f.write(html)
+    return pages
+
+
+# ---------------- RUN ----------------
+def per_page(parse, pages, repeat):
+    times, results = [], None
+    for _ in range(repeat):
+        results = []
+        for html in pages:
+            start = time.perf_counter()
+            results.append(parse(html))
+            times.append(time.perf_counter() - start)
+    return times, results
+
+
+def report(label, times, baseline=None):
+    median = statistics.median(times) * 1000
+    line = f"  {label:<16} median {median:7.2f} ms/page  p95 {statistics.quantiles(times, n=20)[-1] * 1000:7.2f} ms"
+    if baseline:
+        line += f"  ({baseline / median:5.1f}x)"
+    print(line)
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20, help="synthetic pages per source")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--fixtures", help="directory of saved autotrader*.html / kijiji*.html pages")
+    parser.add_argument("--save-fixtures", help="write the synthetic pages to this directory")
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    runs = {
+        "autotrader": [("old soup", legacy_autotrader), ("soup strainer", autotrader._parse_ads_soup)]
+                      + ([("lxml xpath", autotrader._parse_ads_lxml)] if autotrader.lxml_html is not None else []),
+        "kijiji": [("old soup", legacy_kijiji), ("soup strainer", lambda html: kijiji._vehicles(
+                   kijiji._ld_json_blocks_soup(html)) or []), ("regex", kijiji.parse_list_page)],
+    }
+    for source, parsers in runs.items():
+        if not pages[source]:
+            continue
+        size = statistics.mean(len(html) for html in pages[source]) / 1024
+        print(f"{source}: {len(pages[source])} pages, {size:.0f} KiB each")
+        baseline, expected = None, None
+        for label, parse in parsers:
+            times, results = per_page(parse, pages[source], args.repeat)
+            if expected is None:
+                if not any(results):
+                    raise SystemExit(f"{source}: the old parser found no listings in these pages")
+                expected = results
+            elif results != expected:
+                raise SystemExit(f"{source} {label}: output differs from the old parser")
+            median = report(label, times, baseline)
+            baseline = baseline or median
+    if autotrader.lxml_html is None:
+        print("\nlxml is not installed; parse_ads_html uses the SoupStrainer path.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""End-to-end fetch -> parse -> insert over replayed responses, through the job runner.
+
+    python benchmarks/bench_pipeline.py --pages 20 --latency-ms 80 --error-rate 0.05
+    python benchmarks/bench_pipeline.py --fixtures fixtures/ --pages 5
+    python benchmarks/bench_pipeline.py --record fixtures/ --pages 5    # live sites
+
+Without --fixtures, a synthetic origin serving pages shaped like the real
+ones (see bench_parsers.py) is recorded into a temp fixture store first.
+--record records the live sites instead. Either way, the crawl then runs as a
+background scrape job against carsapp.replay.ReplayServer, into a throwaway
+database, with injected latency and 503s retried by the job's backoff.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_parsers import autotrader_fragment, kijiji_page  # noqa: E402
+from carsapp.db import Database, init_db  # noqa: E402
+from carsapp.jobs import Backoff, JobRunner, recent_jobs, scrape_job  # noqa: E402
+from carsapp.replay import FixtureStore, ReplayServer, record_crawl  # noqa: E402
+from carsapp.scrapers import autotrader, kijiji  # noqa: E402
+
+
+CRAWLERS = {
+    # source: (module, parse function name, ingest function name)
+    "autotrader": (autotrader, "parse_ads_html", "ingest_autotrader"),
+    "kijiji": (kijiji, "parse_list_page", "ingest_kijiji"),
+}
+
+
+# ---------------- SYNTHETIC ORIGIN ----------------
+class Origin(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _send(self, payload, content_type):
+        payload = payload.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        page = body["Skip"] // body["Top"]
+        self._send(json.dumps({"AdsHtml": autotrader_fragment(random.Random(page), page, body["Top"])}),
+                   "application/json")
+
+    def do_GET(self):
+        page = int(self.path.split("/page-")[1].split("/")[0]) if "/page-" in self.path else 1
+        self._send(kijiji_page(random.Random(page), page), "text/html")
+
+    def log_message(self, *args):
+        pass
+
+
+def record_synthetic(directory, pages):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Origin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        for source in CRAWLERS:
+            record_crawl(source, directory, pages, base_url=f"http://127.0.0.1:{server.server_address[1]}")
+    finally:
+        server.shutdown()
+
+
+# ---------------- STAGE TIMING ----------------
+def timed(times, fn):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            times.append(time.perf_counter() - start)
+    return wrapper
+
+
+def instrument(module, parse_name, ingest_name):
+    """Wrap the crawler's stage functions with timers; returns the timings and an undo function."""
+    stages = {"fetch": [], "parse": [], "upsert": []}
+    originals = {name: getattr(module, name) for name in ("fetch_page", parse_name, ingest_name)}
+    setattr(module, "fetch_page", timed(stages["fetch"], originals["fetch_page"]))
+    setattr(module, parse_name, timed(stages["parse"], originals[parse_name]))
+    setattr(module, ingest_name, timed(stages["upsert"], originals[ingest_name]))
+
+    def undo():
+        for name, fn in originals.items():
+            setattr(module, name, fn)
+    return stages, undo
+
+
+def ms(values, q):
+    if len(values) < 2:
+        return (values[0] if values else 0) * 1000
+    return statistics.quantiles(values, n=100)[q - 1] * 1000
+
+
+def run_source(source, store, args):
+    module, parse_name, ingest_name = CRAWLERS[source]
+    stages, undo = instrument(module, parse_name, ingest_name)
+    with tempfile.TemporaryDirectory() as tmp, \
+            ReplayServer(store, args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, seed=1) as server:
+        db = init_db(Database(os.path.join(tmp, "bench.db")))
+        runner = JobRunner(db, max_attempts=args.max_attempts, backoff=Backoff(base=0.05, cap=0.5),
+                           breaker_threshold=args.max_attempts + 1)
+        try:
+            start = time.perf_counter()
+            runner.submit(source, scrape_job(source, args.pages, base_url=server.url, db=db, workers=args.workers))
+            while True:
+                job = recent_jobs(1, db).iloc[0]
+                if job["status"] in ("succeeded", "failed"):
+                    break
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            with db.reader() as conn:
+                rows = conn.execute(f"SELECT COUNT(*) FROM {'kjiji' if source == 'kijiji' else source}").fetchone()[0]
+        finally:
+            runner.shutdown()
+            db.close()
+            undo()
+
+    pages = len(stages["parse"])
+    print(f"{source}: {job['status']} after {job['attempts']} attempt(s) in {elapsed:.2f}s — {job['message']}")
+    print(f"  {pages / elapsed:7.1f} pages/s  {rows / elapsed:9.0f} rows/s  "
+          f"({server.stats['requests']} requests, {server.stats['errors']} injected errors, "
+          f"{server.stats['missing']} unrecorded)")
+    for stage, values in stages.items():
+        if values:
+            print(f"  {stage:<7} n={len(values):<4} p50 {ms(values, 50):8.2f} ms  p95 {ms(values, 95):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-attempts", type=int, default=6)
+    parser.add_argument("--sources", nargs="+", default=list(CRAWLERS), choices=list(CRAWLERS))
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--fixtures", help="replay an existing fixture store")
+    group.add_argument("--record", help="record the live sites into this fixture store first")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.fixtures or args.record or tmp
+        if args.record:
+            for source in args.sources:
+                print(f"recording {source}: {record_crawl(source, directory, args.pages)}")
+        elif not args.fixtures:
+            record_synthetic(directory, args.pages)
+        store = FixtureStore(directory)
+        print(f"{len(store)} recorded responses, latency {args.latency_ms:.0f}+{args.jitter_ms:.0f} ms, "
+              f"error rate {args.error_rate:.0%}\n")
+        for source in args.sources:
+            run_source(source, store, args)
+
+
+if __name__ == "__main__":
+    main()
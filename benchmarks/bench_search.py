@@ -0,0 +1,112 @@
+"""Listing search: FTS5 (carsapp.queries.search_listings) vs LIKE vs pandas str.contains.
+
+    python benchmarks/bench_search.py --listings 300000
+
+Synthetic Autotrader and Kijiji listings with free-text descriptions are
+bulk-ingested into a throwaway database (which also builds the FTS index
+through its triggers). Each query then runs as a ranked FTS5 search for
+its first and a deep page, as the LIKE scan over listings and kjiji it
+replaces, and as str.contains over DataFrames already in memory.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carsapp.db import Database, init_db  # noqa: E402
+from carsapp.ingest import ingest_autotrader, ingest_kijiji  # noqa: E402
+from carsapp.queries import search_listings  # noqa: E402
+
+
+MAKES = ["Honda Civic", "Toyota Corolla", "Ford F-150", "Mazda CX-5", "Hyundai Elantra", "Subaru Outback"]
+TRIMS = ["LX", "EX", "Sport", "Touring", "SE", "XLE", "Limited", "GT", "AWD", "4x4"]
+PHRASES = [
+    "one owner", "no accidents", "winter tires included", "clean carfax", "leather seats", "sunroof",
+    "heated seats", "remote start", "backup camera", "new brakes", "certified", "low km", "dealer maintained",
+    "needs tlc", "as is", "navigation", "apple carplay", "tow package", "fresh oil change", "non smoker",
+]
+QUERIES = ["awd", "one owner", "sunroof leather", "carfax", "tow package 4x4", "civic sport"]
+
+
+def synthetic(n, rnd):
+    autotrader, kijiji = [], []
+    for i in range(n):
+        make, model = rnd.choice(MAKES).split(" ", 1)
+        year, trim = rnd.randint(2005, 2025), rnd.choice(TRIMS)
+        autotrader.append({"title": f"{year} {make} {model} {trim}", "ad_link": f"https://www.autotrader.ca/a/{i}"})
+        kijiji.append({
+            "@type": "Car", "name": f"{year} {make} {model} {trim}", "url": f"https://www.kijiji.ca/v/{i}",
+            "description": ". ".join(rnd.sample(PHRASES, rnd.randint(2, 6))).capitalize() + ".",
+            "brand.name": make, "model": model,
+        })
+    return autotrader, kijiji
+
+
+def like_search(db, text):
+    # What a search box would do without the index: every word in title or description.
+    words = re.findall(r"\w+", text.lower())
+    clause = " AND ".join("(l.title LIKE ? OR k.description LIKE ?)" for _ in words)
+    params = [f"%{word}%" for word in words for _ in range(2)]
+    with db.reader() as conn:
+        return len(conn.execute(
+            f"SELECT l.id FROM listings l LEFT JOIN kjiji k ON l.source = 'kijiji' AND k.id = l.listing_id"
+            f" WHERE {clause}", params,
+        ).fetchall())
+
+
+def pandas_search(df, text):
+    mask = pd.Series(True, index=df.index)
+    for word in re.findall(r"\w+", text.lower()):
+        mask &= df["text"].str.contains(word, case=False, regex=False)
+    return int(mask.sum())
+
+
+def ms(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=300_000, help="listings in total, half per source")
+    args = parser.parse_args()
+
+    rnd = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = init_db(Database(os.path.join(tmp, "search.db")))
+        autotrader, kijiji = synthetic(args.listings // 2, rnd)
+        start = time.perf_counter()
+        ingest_autotrader(autotrader, db)
+        ingest_kijiji(kijiji, db)
+        print(f"ingest with FTS triggers: {time.perf_counter() - start:.1f}s for {args.listings} listings")
+        with db.reader() as conn:
+            df = pd.read_sql_query(
+                "SELECT l.id, l.title || ' ' || coalesce(k.description, '') AS text FROM listings l"
+                " LEFT JOIN kjiji k ON l.source = 'kijiji' AND k.id = l.listing_id", conn,
+            )
+
+        search = search_listings.__wrapped__     # the query cache would turn repeats into dict lookups
+        print(f"\n{'query':<18} {'matches':>8} {'fts p1':>9} {'fts p50':>9} {'LIKE':>9} {'pandas':>9}   (ms)")
+        for text in QUERIES:
+            first, results = ms(lambda: search(text, db=db))
+            deep, _ = ms(lambda: search(text, page=50, db=db))
+            like, like_count = ms(lambda: like_search(db, text), repeat=1)
+            scan, _ = ms(lambda: pandas_search(df, text), repeat=1)
+            print(f"{text:<18} {results.total:>8} {first:>9.1f} {deep:>9.1f} {like:>9.1f} {scan:>9.1f}"
+                  + ("" if results.total <= like_count else "   (FTS found more than LIKE!)"))
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
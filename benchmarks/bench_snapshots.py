@@ -0,0 +1,73 @@
+"""Parquet snapshots: full and incremental writes, and reads against querying SQLite.
+
+    python benchmarks/bench_snapshots.py --rows 200000 --batch 5000
+
+Bulk-ingests synthetic listings into a throwaway database, snapshots them,
+appends a batch and snapshots again (only the batch should be written), then
+loads the combined data back both from the snapshot and with read_sql_query.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from itertools import islice
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_ingest import synthetic_autotrader, synthetic_kijiji  # noqa: E402
+from carsapp.db import Database, init_db  # noqa: E402
+from carsapp.ingest import ingest_autotrader, ingest_kijiji  # noqa: E402
+from carsapp.snapshots import read_snapshot, write_snapshot  # noqa: E402
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<34} {time.perf_counter() - start:7.2f}s  {result}")
+    return result
+
+
+def du(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="rows per source")
+    parser.add_argument("--batch", type=int, default=5_000, help="rows per source in the incremental append")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = init_db(Database(os.path.join(tmp, "snapshots.db")))
+        directory = os.path.join(tmp, "snapshots")
+        ingest_autotrader(synthetic_autotrader(args.rows), db)
+        ingest_kijiji(synthetic_kijiji(args.rows), db)
+
+        print("write")
+        timed("full snapshot", lambda: write_snapshot(directory=directory, db=db))
+        timed("nothing new", lambda: write_snapshot(directory=directory, db=db))
+        # The generators are deterministic: skip the rows already ingested.
+        ingest_autotrader(islice(synthetic_autotrader(args.rows + args.batch), args.rows, None), db)
+        ingest_kijiji(islice(synthetic_kijiji(args.rows + args.batch), args.rows, None), db)
+        timed("incremental append", lambda: write_snapshot(directory=directory, db=db))
+        print(f"  snapshot {du(directory) / 2**20:.1f} MiB on disk, database {os.path.getsize(db.path) / 2**20:.1f} MiB")
+
+        print("read combined")
+        columns = ["id", "brand", "model", "year", "price_num", "odometer_km", "created_at"]
+        with db.reader() as conn:
+            timed("read_sql_query (all columns)", lambda: pd.read_sql_query("SELECT * FROM listings", conn).shape)
+            timed("snapshot (all columns)", lambda: read_snapshot("combined", directory=directory).shape)
+            timed("read_sql_query (analysis columns)",
+                  lambda: pd.read_sql_query(f"SELECT {', '.join(columns)} FROM listings", conn).shape)
+        timed("snapshot (analysis columns)",
+              lambda: read_snapshot("combined", columns=columns, directory=directory).shape)
+        timed("snapshot (one source)",
+              lambda: read_snapshot("combined", source="kijiji", columns=columns, directory=directory).shape)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
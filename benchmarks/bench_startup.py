@@ -0,0 +1,169 @@
+"""App start-up: cold first run and rerun time per page, with the imports each page pulls in.
+
+    python benchmarks/bench_startup.py --reruns 10 --baseline <git revision>
+
+Each measurement runs in a fresh interpreter under python -X importtime,
+which imports Streamlit's test harness first (a server has it loaded
+before any session arrives) and then runs app.py through AppTest: the
+first run is the cold start of that page, including every import the app
+itself triggers, and the reruns after it are what each widget interaction
+costs. The database is a throwaway one with a few thousand listings and no
+photos, so nothing waits on the network.
+
+--baseline also measures the app at another git revision (extracted with
+git archive) on its default page, for a before/after comparison; a revision
+from before the carsapp package, the single-file app, is seeded with plain
+sqlite3 inserts.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = {"View Cars": "app_pages/view_cars.py", "Add Car": "app_pages/add_car.py",
+         "Performance": "app_pages/performance.py"}
+# Imports worth naming when a page pulls them in (including Streamlit's own lazy ones, like altair for charts).
+HEAVY = ("openpyxl", "lxml", "bs4", "PIL", "requests", "altair", "pstats", "carsapp.scrapers",
+         "carsapp.market_guide", "carsapp.jobs")
+
+# The same cars for every tree: dicts shaped like the scrapers' output.
+CARS = """
+import os, random, sys
+tree, n, rnd = sys.argv[1], int(sys.argv[2]), random.Random(3)
+makes = ["Honda Civic", "Toyota Corolla", "Ford Escape", "Mazda CX-5", "Hyundai Elantra"]
+autotrader = [{"title": f"{rnd.randint(2005, 2025)} {rnd.choice(makes)}", "price": f"${rnd.randint(3, 80)},000",
+               "location": "London, ON", "odometer": f"{rnd.randint(0, 300)},000 km", "image_src": None,
+               "ad_link": f"https://www.autotrader.ca/a/{i}"} for i in range(n)]
+kijiji = [{"@type": "Car", "name": f"{rnd.randint(2005, 2025)} {m}", "price": str(rnd.randint(3, 80) * 1000),
+           "url": f"https://www.kijiji.ca/v/{i}", "brand.name": m.split()[0], "model": m.split()[1]}
+          for i, m in enumerate(rnd.choice(makes) for _ in range(n))]
+"""
+
+POPULATE = CARS + """
+sys.path.insert(0, tree)
+from carsapp.db import get_db, init_db
+from carsapp.ingest import ingest_autotrader, ingest_kijiji
+db = init_db(get_db())
+ingest_autotrader(autotrader, db)
+ingest_kijiji(kijiji, db)
+"""
+
+# A tree from before the carsapp package (the single-file app) has no ingest to
+# call and ignores CARSAPP_DB: plain INSERTs into the cars.db next to its app.py,
+# which carries its schema, filling the columns its own inserts filled. That
+# app hands photo URLs to the browser unfetched but fails on a listing without
+# one, so every car gets a (never loaded) photo URL.
+LEGACY_POPULATE = CARS + """
+import sqlite3
+from datetime import datetime
+now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+photo = "https://photos.invalid/car.jpg"
+with sqlite3.connect(os.path.join(tree, "cars.db")) as conn:
+    conn.execute("DELETE FROM autotrader")
+    conn.execute("DELETE FROM kjiji")
+    conn.executemany(
+        "INSERT INTO autotrader (title, price, location, odometer, image_src, ad_link, created_at)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(c["title"], c["price"], c["location"], c["odometer"], photo, c["ad_link"], now) for c in autotrader])
+    conn.executemany(
+        "INSERT INTO kjiji (type, name, image, price, url, brand_name, model, created_at)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(c["@type"], c["name"], photo, c["price"], c["url"], c["brand.name"], c["model"], now) for c in kijiji])
+"""
+
+MEASURE = """
+import json, os, sys, time
+tree, page, reruns = sys.argv[1], sys.argv[2], int(sys.argv[3])
+sys.path.insert(0, tree)
+from streamlit.testing.v1 import AppTest
+print("--app--", file=sys.stderr, flush=True)
+at = AppTest.from_file(os.path.join(tree, "app.py"), default_timeout=120)
+if page:
+    at.switch_page(page)
+start = time.perf_counter()
+at.run()
+first = time.perf_counter() - start
+times = []
+for _ in range(reruns):
+    start = time.perf_counter()
+    at.run()
+    times.append(time.perf_counter() - start)
+print(json.dumps({"first": first, "reruns": times, "errors": [str(e.value) for e in at.exception]}))
+"""
+
+
+def app_imports(stderr):
+    # (total µs of the imports made after the harness was loaded, {heavy module: cumulative µs}).
+    total, heavy, started = 0, {}, False
+    for line in stderr.splitlines():
+        if line.startswith("--app--"):
+            started = True
+        elif started and line.startswith("import time:"):
+            _, cumulative, name = line.split(":", 1)[1].split("|", 2)
+            if not name[1:].startswith(" "):     # nested imports are indented under their importer
+                total += int(cumulative)
+            if name.strip() in HEAVY:
+                heavy[name.strip()] = int(cumulative)
+    return total, heavy
+
+
+def measure(tree, page, reruns, env):
+    run = subprocess.run([sys.executable, "-X", "importtime", "-c", MEASURE, tree, page, str(reruns)],
+                         capture_output=True, text=True, env=env, cwd=tree)
+    if run.returncode:
+        sys.exit(run.stderr[-2000:])
+    result = json.loads(run.stdout.strip().splitlines()[-1])
+    result["imports"], result["heavy"] = app_imports(run.stderr)
+    return result
+
+
+def report(label, result):
+    heavy = sorted(result["heavy"].items(), key=lambda item: -item[1])
+    print(f"  {label:<16} first run {result['first'] * 1000:6.0f} ms  (imports {result['imports'] / 1000:4.0f} ms)"
+          f"   rerun median {statistics.median(result['reruns']) * 1000:6.1f} ms")
+    if heavy:
+        print(f"  {'':<16} " + ", ".join(f"{name} {us / 1000:.0f} ms" for name, us in heavy))
+    if result["errors"]:
+        print(f"  {'':<16} errors: {result['errors']}")
+
+
+def prepare(tree, tmp, listings):
+    env = dict(os.environ, CARSAPP_DB=os.path.join(tmp, "cars.db"), CARSAPP_METRICS=os.path.join(tmp, "metrics"),
+               CARSAPP_THUMBNAILS=os.path.join(tmp, "thumbnails"), CARSAPP_SNAPSHOTS=os.path.join(tmp, "snapshots"))
+    populate = POPULATE if os.path.isdir(os.path.join(tree, "carsapp")) else LEGACY_POPULATE
+    subprocess.run([sys.executable, "-c", populate, tree, str(listings)], check=True, env=env, cwd=tree)
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--listings", type=int, default=2_000, help="listings per source")
+    parser.add_argument("--baseline", help="git revision to compare against (its default page)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.baseline:
+            tree = os.path.join(tmp, "baseline")
+            os.makedirs(tree)
+            archive = subprocess.run(["git", "archive", args.baseline], cwd=ROOT, capture_output=True, check=True)
+            subprocess.run(["tar", "-x", "-C", tree], input=archive.stdout, check=True)
+            os.makedirs(os.path.join(tmp, "baseline-data"))
+            env = prepare(tree, os.path.join(tmp, "baseline-data"), args.listings)
+            print(f"baseline {args.baseline}")
+            report("default page", measure(tree, "", args.reruns, env))
+
+        os.makedirs(os.path.join(tmp, "data"))
+        env = prepare(ROOT, os.path.join(tmp, "data"), args.listings)
+        print("this tree")
+        for label, path in PAGES.items():
+            report(label, measure(ROOT, path, args.reruns, env))
+
+
+if __name__ == "__main__":
+    main()
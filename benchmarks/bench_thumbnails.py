@@ -0,0 +1,121 @@
+"""Listing photos for one page of cards: full-size remote images vs carsapp.thumbnails.
+
+    python benchmarks/bench_thumbnails.py --cards 24 --latency-ms 80 --width 1280
+
+A local stub CDN serves --cards distinct JPEGs of --width pixels after
+--latency-ms. Compared per page view: what the browser had to pull before
+(every full-size photo, one after another), the first view through the
+thumbnail cache (concurrent downloads, shrunk to 180px), and later views
+(local files only). Also times shrink() itself with and without draft().
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import requests
+from PIL import Image, ImageDraw, JpegImagePlugin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carsapp import thumbnails  # noqa: E402
+
+
+def photo(width, seed):
+    rnd = random.Random(seed)
+    image = Image.new("RGB", (width, width * 3 // 4), tuple(rnd.randint(0, 255) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(200):
+        x, y = rnd.randint(0, width), rnd.randint(0, width * 3 // 4)
+        draw.ellipse((x, y, x + rnd.randint(10, 200), y + rnd.randint(10, 200)),
+                     fill=tuple(rnd.randint(0, 255) for _ in range(3)))
+    out = BytesIO()
+    image.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+class StubCDN(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    photos = {}
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = self.photos.get(self.path)
+        self.send_response(200 if body else 404)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body or b"")))
+        self.end_headers()
+        self.wfile.write(body or b"")
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(label, fn, note=""):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<34} {(time.perf_counter() - start) * 1000:9.1f} ms  {note}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=24)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--width", type=int, default=1280)
+    args = parser.parse_args()
+
+    StubCDN.latency = args.latency_ms / 1000
+    StubCDN.photos = {f"/photos/{i}.jpg": photo(args.width, i) for i in range(args.cards)}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCDN)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    urls = [f"{base}/photos/{i}.jpg" for i in range(args.cards)] + [f"{base}/photos/missing.jpg"]
+    full_size = sum(map(len, StubCDN.photos.values()))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"one page of {args.cards} cards, {args.width}px photos, {args.latency_ms:.0f} ms latency")
+        session = requests.Session()
+        timed("full-size photos, sequential", lambda: [session.get(url).content for url in urls],
+              f"{full_size / 2**20:.1f} MiB transferred")
+        paths = timed("thumbnails, first view", lambda: thumbnails.thumbnails(urls, tmp, wait=60))
+        local = sum(os.path.getsize(path) for path in paths.values() if path)
+        timed("thumbnails, later views", lambda: thumbnails.thumbnails(urls, tmp),
+              f"{local / 2**10:.0f} KiB served locally, {sum(p is None for p in paths.values())} placeholder(s)")
+
+        # A CDN slower than the page's wait budget: placeholders now, thumbnails next rerun.
+        StubCDN.latency = thumbnails.WAIT * 2
+        slow = [f"{url}?slow" for url in urls[:-1]]
+        StubCDN.photos.update({f"{path}?slow": body for path, body in list(StubCDN.photos.items())})
+        paths = timed(f"first view, {StubCDN.latency:.0f} s CDN", lambda: thumbnails.thumbnails(slow, tmp))
+        print(f"  {'':<34} {sum(p is not None for p in paths.values())} of {len(slow)} ready")
+        time.sleep(StubCDN.latency * -(-len(slow) // thumbnails.WORKERS) + 0.5)   # let the pool finish
+        paths = timed("next rerun", lambda: thumbnails.thumbnails(slow, tmp))
+        print(f"  {'':<34} {sum(p is not None for p in paths.values())} of {len(slow)} ready")
+
+        data = next(iter(StubCDN.photos.values()))
+        thumbnails.shrink(data)
+        timed("shrink() x20", lambda: [thumbnails.shrink(data) for _ in range(20)])
+        draft = JpegImagePlugin.JpegImageFile.draft
+        JpegImagePlugin.JpegImageFile.draft = lambda self, mode, size: None
+        try:
+            timed("shrink() x20 without draft()", lambda: [thumbnails.shrink(data) for _ in range(20)])
+        finally:
+            JpegImagePlugin.JpegImageFile.draft = draft
+
+        StubCDN.latency = 0
+        budget = local // 2
+        removed = thumbnails.evict(tmp, max_bytes=budget)
+        left = sum(entry.stat().st_size for entry in os.scandir(tmp))
+        print(f"  evict to {budget / 2**10:.0f} KiB: removed {removed} files, {left / 2**10:.0f} KiB left")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
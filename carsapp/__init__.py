@@ -0,0 +1 @@
+# Shared database, ingest and scraping code for the Car Listings App.
@@ -0,0 +1,107 @@
+"""Command line for the scraping side of the app; no Streamlit needed.
+
+    python -m carsapp scrape --source kijiji --pages 20
+    python -m carsapp schedule --every kijiji=30m --every autotrader=2h --every snapshot=1d
+    python -m carsapp snapshot
+    python -m carsapp score [--full]
+
+Jobs go through carsapp.jobs like the UI's buttons, so they are recorded in
+the jobs table (the UI's job panels show them) and a source already being
+scraped by another process is not scraped twice.
+"""
+import argparse
+import re
+import signal
+import sys
+import threading
+
+from carsapp.db import get_db, init_db
+from carsapp.jobs import (
+    SCRAPE_PAGES, SOURCES, get_runner, run_schedule, start_scrape, start_scoring, start_snapshot, wait_for_job,
+)
+
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def interval(text):
+    # "kijiji=30m" -> ("kijiji", 1800.0); a bare number is minutes.
+    match = re.fullmatch(r"(\w+)=(\d+(?:\.\d+)?)([smhd]?)", text.strip())
+    if not match or match[1] not in SOURCES + ("snapshot",):
+        raise argparse.ArgumentTypeError(
+            f"expected KIND=INTERVAL with KIND one of {', '.join(SOURCES)}, snapshot (e.g. kijiji=30m), got {text!r}"
+        )
+    seconds = float(match[2]) * UNITS[match[3] or "m"]
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError(f"interval must be positive, got {text!r}")
+    return match[1], seconds
+
+
+def _show(kind, job_id):
+    def progress(status, message):
+        print(f"{kind} #{job_id} {status}: {message or ''}", flush=True)
+    return progress
+
+
+def scrape(args):
+    runner = get_runner()
+    jobs = {source: start_scrape(source, args.pages, runner, refresh=args.refresh)
+            for source in args.source or SOURCES}
+    # Sources crawl side by side on the runner; report them in order.
+    try:
+        statuses = [wait_for_job(job_id, _show(source, job_id))[0] for source, job_id in jobs.items()]
+    except KeyboardInterrupt:
+        runner.shutdown(wait=False)     # cancels pending retries; pages in flight still finish
+        return 130
+    return 0 if all(status == "succeeded" for status in statuses) else 1
+
+
+def snapshot(args):
+    job_id = start_snapshot(get_runner())
+    return 0 if wait_for_job(job_id, _show("snapshot", job_id))[0] == "succeeded" else 1
+
+
+def score(args):
+    job_id = start_scoring(args.full, get_runner())
+    return 0 if wait_for_job(job_id, _show("score", job_id))[0] == "succeeded" else 1
+
+
+def schedule(args):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        run_schedule(dict(args.every), max_pages=args.pages, refresh=args.refresh, stop=stop,
+                     log=lambda line: print(line, flush=True))
+    except KeyboardInterrupt:
+        pass
+    print("stopping: waiting for jobs in flight to finish", flush=True)
+    get_runner().shutdown()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m carsapp", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    one = commands.add_parser("scrape", help="crawl sources once and wait for the result")
+    one.add_argument("--source", action="append", choices=SOURCES, help="repeatable; default: every source")
+
+    every = commands.add_parser("schedule", help="keep scraping on per-source intervals until stopped")
+    every.add_argument("--every", action="append", type=interval, required=True, metavar="KIND=INTERVAL",
+                       help="repeatable, e.g. kijiji=30m, autotrader=2h, snapshot=1d (units s/m/h/d)")
+
+    for command in (one, every):
+        command.add_argument("--pages", type=int, default=SCRAPE_PAGES, help="pages to crawl per scrape")
+        command.add_argument("--refresh", action="store_true",
+                             help="crawl every page to refresh prices of stored cars")
+    commands.add_parser("snapshot", help="append new rows to the Parquet snapshot")
+    scoring = commands.add_parser("score", help="rescore deals of the peer groups changed since the last run")
+    scoring.add_argument("--full", action="store_true", help="rescore every peer group")
+
+    args = parser.parse_args(argv)
+    init_db(get_db())
+    return {"scrape": scrape, "schedule": schedule, "snapshot": snapshot, "score": score}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
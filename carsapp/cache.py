@@ -0,0 +1,114 @@
+"""Process-wide cache of query results, invalidated through data_versions.
+
+A cached function names the tables it reads. Its results are keyed on its
+arguments plus those tables' version counters (carsapp.db.data_version), which
+triggers bump on every write from any connection or process. The first call
+after new data lands is therefore a miss, and nothing has to be cleared by hand.
+Results are shared by every caller (all Streamlit sessions) and must be
+treated as read-only.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import astuple, is_dataclass
+from functools import wraps
+
+import pandas as pd
+
+from carsapp.db import data_version, get_db
+from carsapp.metrics import count, span
+
+
+# ---------------- CONFIG ----------------
+MAX_ENTRIES = 512   # least recently used results are dropped past this
+
+
+def _freeze(value):
+    # Hashable stand-in for an argument (filters dataclasses, id Series...).
+    if is_dataclass(value):
+        return (type(value).__name__,) + astuple(value)
+    if isinstance(value, (list, tuple, pd.Series, pd.Index)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value))
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value.item() if hasattr(value, "item") else value
+
+
+class VersionedCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+
+    def get(self, name, key, tables, compute, db):
+        key = (name, db.path, key, data_version(tables, db))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits[name] = self.hits.get(name, 0) + 1
+                count("cache.hits")
+                return self._entries[key]
+            self.misses[name] = self.misses.get(name, 0) + 1
+        # Computed outside the lock: two sessions missing at once both query,
+        # which is cheaper than making every reader wait on one slow query.
+        with span("db_read", fn=name):
+            value = compute()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        """Hits and misses per cached function, with totals in the last row."""
+        with self._lock:
+            names = sorted(set(self.hits) | set(self.misses))
+            df = pd.DataFrame({
+                "function": names,
+                "hits": [self.hits.get(name, 0) for name in names],
+                "misses": [self.misses.get(name, 0) for name in names],
+            })
+            entries = len(self._entries)
+        df.loc[len(df)] = ["total", df["hits"].sum(), df["misses"].sum()]
+        df[["hits", "misses"]] = df[["hits", "misses"]].astype(int)
+        df["hit_rate"] = (df["hits"] / (df["hits"] + df["misses"]).where(lambda n: n > 0)).round(3)
+        df.attrs["entries"] = entries
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits.clear()
+            self.misses.clear()
+
+
+_cache = VersionedCache()
+
+
+def get_cache():
+    return _cache
+
+
+def cached(tables):
+    """Cache the decorated function's results until one of `tables` changes.
+
+    `tables` is a tuple of table names, or a callable taking the function's
+    arguments and returning one (when it depends on e.g. the source). The
+    function must take `db` as a keyword argument; `__wrapped__` is the
+    uncached original.
+    """
+    def decorate(fn):
+        name = fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, db=None, **kwargs):
+            db = db or get_db()
+            read = tables(*args, **kwargs) if callable(tables) else tables
+            key = (_freeze(args), _freeze(kwargs))
+            return _cache.get(name, key, read, lambda: fn(*args, db=db, **kwargs), db)
+
+        return wrapper
+    return decorate
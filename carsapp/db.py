@@ -0,0 +1,704 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from carsapp.normalize import parse_odometer, parse_price, parse_year
+
+
+# ---------------- CONFIG ----------------
+DB_FILE = os.environ.get(
+    "CARSAPP_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cars.db"),
+)
+
+MMAP_SIZE = 256 * 1024 * 1024   # bytes of the db file mapped into memory
+CACHE_KIB = 32 * 1024           # page cache per connection
+BUSY_TIMEOUT_MS = 30_000
+READERS = 4                     # idle read connections kept open between uses
+
+
+# ---------------- CONNECTIONS ----------------
+class Database:
+    """Process-wide access to one sqlite file.
+
+    Reads check a connection out of a small pool for the length of a `with
+    db.reader() as conn` block, and all writes go through a single writer
+    connection guarded by a lock. With WAL journaling readers keep working
+    while a scrape is writing.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DB_FILE
+        self._idle = []     # read connections not checked out, most recently used last
+        self._readers_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._write_depth = 0
+
+    def _open(self):
+        # isolation_level=None: transactions are only opened explicitly by writer().
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_KIB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.create_function("parse_price", 1, parse_price, deterministic=True)
+        conn.create_function("parse_odometer", 2, parse_odometer, deterministic=True)
+        conn.create_function("parse_year", 1, parse_year, deterministic=True)
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """A read-only connection for the block, from the pool of idle ones.
+
+        Pooled per use, not per thread: Streamlit runs every rerun on a fresh
+        thread, and a new connection would redo the pragmas with a cold page
+        cache. Beyond READERS idle connections, returned ones are closed.
+        """
+        with self._readers_lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+            conn.execute("PRAGMA query_only=1")
+        try:
+            yield conn
+        finally:
+            with self._readers_lock:
+                if len(self._idle) < READERS:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    @contextmanager
+    def writer(self):
+        """Serialized write transaction. Nested calls join the outer transaction."""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open()
+            conn = self._writer
+            if self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield conn
+                finally:
+                    self._write_depth -= 1
+                return
+
+            conn.execute("BEGIN IMMEDIATE")
+            self._write_depth = 1
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+            finally:
+                self._write_depth = 0
+
+    def close(self):
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._readers_lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle.clear()
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_db(path=None):
+    path = os.path.abspath(path or DB_FILE)
+    with _databases_lock:
+        db = _databases.get(path)
+        if db is None:
+            db = _databases[path] = Database(path)
+        return db
+
+
+# ---------------- SCHEMA ----------------
+# Each migration runs once, in order, inside the init_db write transaction.
+# PRAGMA user_version records how many have been applied to a given file.
+def _migration_base_tables(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS autotrader (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            price TEXT,
+            location TEXT,
+            odometer TEXT,
+            image_src TEXT,
+            ad_link TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS kjiji (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT,
+            name TEXT,
+            description TEXT,
+            image TEXT,
+            price TEXT,
+            priceCurrency TEXT,
+            url TEXT UNIQUE,
+            brand_name TEXT,
+            mileage_value TEXT,
+            mileage_unitCode TEXT,
+            model TEXT,
+            vehicleModelDate TEXT,
+            bodyType TEXT,
+            color TEXT,
+            numberOfDoors TEXT,
+            fuelType TEXT,
+            vehicleTransmission TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _migration_typed_columns(c):
+    # Numeric copies of the display strings so filters and ORDER BY run in sqlite.
+    for column, kind in [("price_num", "REAL"), ("odometer_km", "INTEGER"), ("year", "INTEGER"),
+                         ("brand", "TEXT"), ("model", "TEXT")]:
+        c.execute(f"ALTER TABLE autotrader ADD COLUMN {column} {kind}")
+    for column, kind in [("price_num", "REAL"), ("odometer_km", "INTEGER"), ("year", "INTEGER")]:
+        c.execute(f"ALTER TABLE kjiji ADD COLUMN {column} {kind}")
+
+    c.execute("""
+        UPDATE autotrader SET
+            price_num = parse_price(price),
+            odometer_km = parse_odometer(odometer, NULL),
+            year = parse_year(title)
+    """)
+    c.execute("""
+        UPDATE kjiji SET
+            price_num = parse_price(price),
+            odometer_km = parse_odometer(mileage_value, mileage_unitCode),
+            year = coalesce(parse_year(vehicleModelDate), parse_year(name))
+    """)
+
+    c.execute("CREATE INDEX idx_autotrader_brand_model_year ON autotrader(brand, model, year)")
+    c.execute("CREATE INDEX idx_autotrader_price ON autotrader(price_num)")
+    c.execute("CREATE INDEX idx_autotrader_odometer ON autotrader(odometer_km)")
+    c.execute("CREATE INDEX idx_autotrader_created_at ON autotrader(created_at)")
+    c.execute("CREATE INDEX idx_autotrader_ad_link ON autotrader(ad_link)")
+    # kjiji.url (its ad link) is already covered by the UNIQUE constraint.
+    c.execute("CREATE INDEX idx_kjiji_brand_model_year ON kjiji(brand_name, model, year)")
+    c.execute("CREATE INDEX idx_kjiji_price ON kjiji(price_num)")
+    c.execute("CREATE INDEX idx_kjiji_odometer ON kjiji(odometer_km)")
+    c.execute("CREATE INDEX idx_kjiji_created_at ON kjiji(created_at)")
+
+
+def _migration_autotrader_make_model(c):
+    # Autotrader only has a free-text title; store the matcher's make/model/year.
+    from carsapp.matcher import get_matcher
+
+    rows = c.execute("SELECT id, title FROM autotrader").fetchall()
+    if not rows:
+        return
+    ids = [row[0] for row in rows]
+    found = get_matcher().extract([row[1] for row in rows])
+    found = found.astype(object).where(found.notna(), None)
+    c.executemany(
+        "UPDATE autotrader SET brand = ?, model = ?, year = coalesce(?, year) WHERE id = ?",
+        zip(found["make"], found["model"], found["year"], ids),
+    )
+
+
+def _migration_valuations(c):
+    # Market-guide summary per listing, filled by the batch valuation job.
+    c.execute("""
+        CREATE TABLE valuations (
+            source TEXT NOT NULL,
+            listing_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            make TEXT,
+            model TEXT,
+            year INTEGER,
+            avg_price REAL,
+            median_price REAL,
+            comparable_count INTEGER,
+            message TEXT,
+            valued_at TEXT NOT NULL,
+            PRIMARY KEY (source, listing_id)
+        )
+    """)
+
+
+def _migration_jobs(c):
+    # Background scrape/valuation jobs and their progress, polled by the UI.
+    c.execute("""
+        CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            params TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            message TEXT,
+            pid INTEGER,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT
+        )
+    """)
+    c.execute("CREATE INDEX idx_jobs_kind_status ON jobs(kind, status)")
+
+
+# Where each column of the combined `listings` table comes from in a source
+# row. {row} is "NEW." inside the triggers and empty for the backfill.
+LISTING_SOURCES = {
+    "autotrader": ("autotrader", {
+        "title": "{row}title", "price": "{row}price", "currency": "NULL",
+        "brand": "{row}brand", "model": "{row}model", "vehicleModelDate": "CAST({row}year AS TEXT)",
+        "bodyType": "NULL", "color": "NULL", "fuelType": "NULL", "vehicleTransmission": "NULL",
+        "odometer": "{row}odometer", "image_src": "{row}image_src", "ad_link": "{row}ad_link",
+        "created_at": "{row}created_at",
+        "price_num": "{row}price_num", "odometer_km": "{row}odometer_km", "year": "{row}year",
+    }),
+    "kijiji": ("kjiji", {
+        "title": "{row}name", "price": "{row}price", "currency": "{row}priceCurrency",
+        "brand": "{row}brand_name", "model": "{row}model", "vehicleModelDate": "{row}vehicleModelDate",
+        "bodyType": "{row}bodyType", "color": "{row}color", "fuelType": "{row}fuelType",
+        "vehicleTransmission": "{row}vehicleTransmission",
+        "odometer": "{row}mileage_value", "image_src": "{row}image", "ad_link": "{row}url",
+        "created_at": "{row}created_at",
+        "price_num": "{row}price_num", "odometer_km": "{row}odometer_km", "year": "{row}year",
+    }),
+}
+
+
+def _listing_triggers(c, source, table, spec):
+    # (Re)creates the triggers copying inserts and updates of `table` into listings.
+    columns = ", ".join(spec)
+    new = [expr.format(row="NEW.") for expr in spec.values()]
+    c.execute(f"DROP TRIGGER IF EXISTS {table}_listings_insert")
+    c.execute(f"""
+        CREATE TRIGGER {table}_listings_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO listings (source, listing_id, {columns})
+            VALUES ('{source}', NEW.id, {", ".join(new)});
+        END
+    """)
+    c.execute(f"DROP TRIGGER IF EXISTS {table}_listings_update")
+    c.execute(f"""
+        CREATE TRIGGER {table}_listings_update AFTER UPDATE ON {table} BEGIN
+            UPDATE listings SET {", ".join(f"{col} = {expr}" for col, expr in zip(spec, new))}
+            WHERE source = '{source}' AND listing_id = NEW.id;
+        END
+    """)
+
+
+def _migration_listings(c):
+    # Both sources in one table, kept in step by triggers on every write path,
+    # so the combined view is one indexed query instead of a pandas merge.
+    c.execute("""
+        CREATE TABLE listings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            listing_id INTEGER NOT NULL,
+            title TEXT,
+            price TEXT,
+            currency TEXT,
+            brand TEXT,
+            model TEXT,
+            vehicleModelDate TEXT,
+            bodyType TEXT,
+            color TEXT,
+            fuelType TEXT,
+            vehicleTransmission TEXT,
+            odometer TEXT,
+            image_src TEXT,
+            ad_link TEXT,
+            created_at TEXT,
+            price_num REAL,
+            odometer_km INTEGER,
+            year INTEGER,
+            UNIQUE (source, listing_id)
+        )
+    """)
+    for source, (table, spec) in LISTING_SOURCES.items():
+        _listing_triggers(c, source, table, spec)
+        c.execute(f"""
+            CREATE TRIGGER {table}_listings_delete AFTER DELETE ON {table} BEGIN
+                DELETE FROM listings WHERE source = '{source}' AND listing_id = OLD.id;
+            END
+        """)
+        c.execute(f"""
+            INSERT INTO listings (source, listing_id, {", ".join(spec)})
+            SELECT '{source}', id, {", ".join(expr.format(row="") for expr in spec.values())}
+            FROM {table} ORDER BY id
+        """)
+
+    c.execute("CREATE INDEX idx_listings_created_at ON listings(created_at)")
+    c.execute("CREATE INDEX idx_listings_brand_model_year ON listings(brand, model, year)")
+    c.execute("CREATE INDEX idx_listings_price ON listings(price_num)")
+    c.execute("CREATE INDEX idx_listings_odometer ON listings(odometer_km)")
+    c.execute("CREATE INDEX idx_listings_year ON listings(year)")
+
+
+def _migration_dedupe(c):
+    # Cross-source duplicate detection (carsapp.dedupe): its blocking index,
+    # the clusters it found and how far through listings it has got.
+    c.execute("""
+        CREATE TABLE dedupe_blocks (
+            block_key TEXT NOT NULL,
+            listing_id INTEGER NOT NULL,
+            source TEXT NOT NULL,
+            PRIMARY KEY (block_key, listing_id)
+        ) WITHOUT ROWID
+    """)
+    c.execute("CREATE INDEX idx_dedupe_blocks_listing ON dedupe_blocks(listing_id)")
+    c.execute("""
+        CREATE TABLE listing_links (
+            listing_id INTEGER PRIMARY KEY,     -- listings.id
+            cluster_id INTEGER NOT NULL,        -- lowest listings.id in the cluster
+            score REAL
+        )
+    """)
+    c.execute("CREATE INDEX idx_listing_links_cluster ON listing_links(cluster_id)")
+    c.execute("CREATE TABLE dedupe_state (id INTEGER PRIMARY KEY CHECK (id = 1), last_listing_id INTEGER NOT NULL)")
+    c.execute("INSERT INTO dedupe_state VALUES (1, 0)")
+    c.execute("""
+        CREATE TRIGGER listings_dedupe_delete AFTER DELETE ON listings BEGIN
+            DELETE FROM dedupe_blocks WHERE listing_id = OLD.id;
+            DELETE FROM listing_links WHERE listing_id = OLD.id;
+        END
+    """)
+
+
+# Autotrader columns refreshed from the latest sighting of an ad.
+AUTOTRADER_SCRAPED = "title, price, location, odometer, image_src, price_num, odometer_km, year, brand, model"
+
+
+# Tables whose contents are versioned for caches keyed on them (exports,
+# carsapp.cache). listings only changes through the source-table triggers,
+# so its version is the pair of theirs.
+VERSIONED_TABLES = ("autotrader", "kjiji", "valuations", "listing_links", "deal_groups")
+
+
+def _version_triggers(c, table):
+    # A counter per table, bumped by every write to it.
+    c.execute("INSERT INTO data_versions VALUES (?, 0)", (table,))
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        c.execute(f"""
+            CREATE TRIGGER {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = '{table}';
+            END
+        """)
+
+
+def _migration_data_versions(c):
+    c.execute("CREATE TABLE data_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL) WITHOUT ROWID")
+    for table in ("autotrader", "kjiji"):
+        _version_triggers(c, table)
+
+
+def _fold_autotrader_duplicates(c):
+    # Autotrader rows used to be appended on every scrape. Keep the first row
+    # of each ad_link (its created_at is when the ad was first seen), give it
+    # the latest values, and return the price/odometer changes in between as
+    # {kept id: [(seen_at, price_num, odometer_km), ...]}.
+    rows = c.execute("""
+        SELECT id, ad_link, created_at, price_num, odometer_km FROM autotrader
+        WHERE ad_link IN (SELECT ad_link FROM autotrader GROUP BY ad_link HAVING COUNT(*) > 1)
+        ORDER BY ad_link, id
+    """).fetchall()
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[1], []).append(row)
+
+    history = {}
+    for group in groups.values():
+        kept, latest = group[0][0], group[-1]
+        changes = history[kept] = [group[0][2:]]
+        for _, _, seen_at, price, odometer in group[1:]:
+            if (price, odometer) != changes[-1][1:]:
+                changes.append((seen_at, price, odometer))
+        c.execute("DELETE FROM autotrader WHERE ad_link = ? AND id != ?", (latest[1], kept))
+        c.execute(f"""
+            UPDATE autotrader SET ({AUTOTRADER_SCRAPED}) = (
+                SELECT {AUTOTRADER_SCRAPED} FROM autotrader_latest WHERE id = ?
+            ), last_seen = ? WHERE id = ?
+        """, (latest[0], latest[2], kept))
+    return history
+
+
+def _migration_price_history(c):
+    # Listings are upserted on their ad URL from now on (carsapp.ingest): every
+    # sighting refreshes last_seen, and a price or odometer change adds a row
+    # to listing_observations. created_at stays the first time a car was seen.
+    for table in ("autotrader", "kjiji", "listings"):
+        c.execute(f"ALTER TABLE {table} ADD COLUMN last_seen TEXT")
+    for source, (table, spec) in LISTING_SOURCES.items():
+        _listing_triggers(c, source, table, {**spec, "last_seen": "{row}last_seen"})
+        c.execute(f"UPDATE {table} SET last_seen = created_at")
+
+    # Duplicate rows are deleted as they are folded, so copy them aside first.
+    c.execute(f"CREATE TEMP TABLE autotrader_latest AS SELECT id, {AUTOTRADER_SCRAPED} FROM autotrader")
+    history = _fold_autotrader_duplicates(c)
+    c.execute("DROP TABLE autotrader_latest")
+    c.execute("DROP INDEX idx_autotrader_ad_link")
+    c.execute("CREATE UNIQUE INDEX idx_autotrader_ad_link ON autotrader(ad_link)")
+
+    c.execute("""
+        CREATE TABLE listing_observations (
+            listing_id INTEGER NOT NULL,    -- listings.id
+            seen_at TEXT NOT NULL,
+            price_num REAL,
+            odometer_km INTEGER,
+            PRIMARY KEY (listing_id, seen_at)
+        ) WITHOUT ROWID
+    """)
+    c.execute("CREATE INDEX idx_listing_observations_seen_at ON listing_observations(seen_at)")
+    for kept, changes in history.items():
+        c.executemany(
+            "INSERT OR REPLACE INTO listing_observations SELECT id, ?, ?, ? FROM listings"
+            " WHERE source = 'autotrader' AND listing_id = ?",
+            [change + (kept,) for change in changes],
+        )
+    c.execute("""
+        INSERT OR IGNORE INTO listing_observations
+        SELECT id, created_at, price_num, odometer_km FROM listings WHERE created_at IS NOT NULL
+    """)
+
+    c.execute("""
+        CREATE TRIGGER listings_observe_insert AFTER INSERT ON listings BEGIN
+            INSERT OR REPLACE INTO listing_observations
+            VALUES (NEW.id, coalesce(NEW.last_seen, NEW.created_at, CURRENT_TIMESTAMP), NEW.price_num, NEW.odometer_km);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER listings_observe_update AFTER UPDATE OF price_num, odometer_km ON listings
+        WHEN NEW.price_num IS NOT OLD.price_num OR NEW.odometer_km IS NOT OLD.odometer_km BEGIN
+            INSERT OR REPLACE INTO listing_observations
+            VALUES (NEW.id, coalesce(NEW.last_seen, CURRENT_TIMESTAMP), NEW.price_num, NEW.odometer_km);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER listings_observe_delete AFTER DELETE ON listings BEGIN
+            DELETE FROM listing_observations WHERE listing_id = OLD.id;
+        END
+    """)
+    c.execute("CREATE INDEX idx_listings_last_seen ON listings(last_seen)")
+    # Covers the days-on-market aggregate per make/model.
+    c.execute("CREATE INDEX idx_listings_market ON listings(brand, model, created_at, last_seen)")
+
+
+def _migration_cache_versions(c):
+    # Cached valuation lookups and duplicate-hiding queries read these too.
+    for table in ("valuations", "listing_links"):
+        _version_triggers(c, table)
+
+
+def _migration_search(c):
+    # Full-text index over listing titles (Autotrader title, Kijiji name) and
+    # Kijiji descriptions; rowid is listings.id. The triggers only touch it
+    # when the text really changed, so upserting a re-seen ad costs nothing here.
+    c.execute("""
+        CREATE VIRTUAL TABLE listings_fts USING fts5(
+            title, description, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+    """)
+    # ORDER BY rank: title matches weigh more than description ones.
+    c.execute("INSERT INTO listings_fts (listings_fts, rank) VALUES ('rank', 'bm25(4.0, 1.0)')")
+    c.execute("""
+        INSERT INTO listings_fts (rowid, title, description)
+        SELECT l.id, l.title, k.description FROM listings l
+        LEFT JOIN kjiji k ON l.source = 'kijiji' AND k.id = l.listing_id
+    """)
+    c.execute("""
+        CREATE TRIGGER listings_fts_insert AFTER INSERT ON listings BEGIN
+            INSERT INTO listings_fts (rowid, title, description) VALUES (
+                NEW.id, NEW.title,
+                CASE WHEN NEW.source = 'kijiji' THEN (SELECT description FROM kjiji WHERE id = NEW.listing_id) END
+            );
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER listings_fts_title AFTER UPDATE OF title ON listings
+        WHEN OLD.title IS NOT NEW.title BEGIN
+            UPDATE listings_fts SET title = NEW.title WHERE rowid = NEW.id;
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER kjiji_fts_description AFTER UPDATE OF description ON kjiji
+        WHEN OLD.description IS NOT NEW.description BEGIN
+            UPDATE listings_fts SET description = NEW.description
+            WHERE rowid = (SELECT id FROM listings WHERE source = 'kijiji' AND listing_id = NEW.id);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER listings_fts_delete AFTER DELETE ON listings BEGIN
+            DELETE FROM listings_fts WHERE rowid = OLD.id;
+        END
+    """)
+
+
+def _migration_observation_upsert(c):
+    # Inside a trigger, INSERT OR REPLACE gives way to the outer statement's
+    # conflict policy, so a price change seen in the same second as the last
+    # observation aborted carsapp.ingest's whole upsert. An upsert clause is
+    # not overridden.
+    upsert = ("ON CONFLICT (listing_id, seen_at) DO UPDATE SET"
+              " price_num = excluded.price_num, odometer_km = excluded.odometer_km")
+    c.execute("DROP TRIGGER listings_observe_insert")
+    c.execute(f"""
+        CREATE TRIGGER listings_observe_insert AFTER INSERT ON listings BEGIN
+            INSERT INTO listing_observations
+            VALUES (NEW.id, coalesce(NEW.last_seen, NEW.created_at, CURRENT_TIMESTAMP), NEW.price_num, NEW.odometer_km)
+            {upsert};
+        END
+    """)
+    c.execute("DROP TRIGGER listings_observe_update")
+    c.execute(f"""
+        CREATE TRIGGER listings_observe_update AFTER UPDATE OF price_num, odometer_km ON listings
+        WHEN NEW.price_num IS NOT OLD.price_num OR NEW.odometer_km IS NOT OLD.odometer_km BEGIN
+            INSERT INTO listing_observations
+            VALUES (NEW.id, coalesce(NEW.last_seen, CURRENT_TIMESTAMP), NEW.price_num, NEW.odometer_km)
+            {upsert};
+        END
+    """)
+
+
+# A listing's deal peer group: normalized make and model plus a band of model
+# years. {row} is "NEW." / "OLD." inside the triggers and empty elsewhere.
+DEAL_YEAR_BAND = 3
+DEAL_GROUP = ("lower(trim({row}brand))", "lower(trim({row}model))", f"{{row}}year - {{row}}year % {DEAL_YEAR_BAND}")
+
+
+def deal_group(row=""):
+    return ", ".join(expr.format(row=row) for expr in DEAL_GROUP)
+
+
+def _migration_deal_scores(c):
+    # Deal scores against same-model peers (carsapp.deals). The score sits on
+    # listings so "best deal" is one more indexed sort; the peer statistics go
+    # to deal_groups. Triggers queue every group a write touches in deal_dirty,
+    # and only those groups are rescored.
+    c.execute("ALTER TABLE listings ADD COLUMN expected_price REAL")
+    c.execute("ALTER TABLE listings ADD COLUMN deal_score REAL")
+    c.execute("CREATE INDEX idx_listings_deal_score ON listings(deal_score)")
+    c.execute("""
+        CREATE TABLE deal_groups (
+            make TEXT NOT NULL,
+            model TEXT NOT NULL,
+            year_band INTEGER NOT NULL,
+            odometer_band INTEGER NOT NULL,     -- first km of the band
+            peers INTEGER,
+            median REAL,
+            q1 REAL,
+            q3 REAL,
+            slope_per_km REAL,                  -- of log price, over the whole make/model/year band:
+            slope_per_year REAL,                -- roughly the share of value lost per km / gained per year
+            scored_at TEXT,
+            PRIMARY KEY (make, model, year_band, odometer_band)
+        ) WITHOUT ROWID
+    """)
+    _version_triggers(c, "deal_groups")
+    c.execute("""
+        CREATE TABLE deal_dirty (
+            make TEXT NOT NULL,
+            model TEXT NOT NULL,
+            year_band INTEGER NOT NULL,
+            PRIMARY KEY (make, model, year_band)
+        ) WITHOUT ROWID
+    """)
+    # An upsert clause, not OR IGNORE: inside a trigger, OR IGNORE gives way to the
+    # outer statement's conflict policy (ABORT for carsapp.ingest's upserts).
+    queue = ("INSERT INTO deal_dirty SELECT {group}"
+             " WHERE {row}brand IS NOT NULL AND {row}model IS NOT NULL AND {row}year IS NOT NULL"
+             " ON CONFLICT DO NOTHING;")
+    # OR IGNORE also skips listings without a make, model or year (NOT NULL).
+    c.execute(f"INSERT OR IGNORE INTO deal_dirty SELECT DISTINCT {deal_group()} FROM listings")
+    # Expression index: rescoring seeks just the listings of each queued group.
+    c.execute(f"CREATE INDEX idx_listings_deal_group ON listings({deal_group()})")
+    c.execute(f"""
+        CREATE TRIGGER listings_deal_insert AFTER INSERT ON listings BEGIN
+            {queue.format(group=deal_group("NEW."), row="NEW.")}
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER listings_deal_update AFTER UPDATE OF price_num, odometer_km, brand, model, year ON listings
+        WHEN NEW.price_num IS NOT OLD.price_num OR NEW.odometer_km IS NOT OLD.odometer_km
+          OR NEW.brand IS NOT OLD.brand OR NEW.model IS NOT OLD.model OR NEW.year IS NOT OLD.year BEGIN
+            {queue.format(group=deal_group("OLD."), row="OLD.")}
+            {queue.format(group=deal_group("NEW."), row="NEW.")}
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER listings_deal_delete AFTER DELETE ON listings BEGIN
+            {queue.format(group=deal_group("OLD."), row="OLD.")}
+        END
+    """)
+
+
+def _migration_source_year_indexes(c):
+    # The "year_new" sort on a source table: without these, every page was a
+    # full scan and a temp b-tree sort.
+    c.execute("CREATE INDEX idx_autotrader_year ON autotrader(year, id)")
+    c.execute("CREATE INDEX idx_kjiji_year ON kjiji(year, id)")
+
+
+MIGRATIONS = [
+    _migration_base_tables,
+    _migration_typed_columns,
+    _migration_autotrader_make_model,
+    _migration_valuations,
+    _migration_jobs,
+    _migration_listings,
+    _migration_dedupe,
+    _migration_data_versions,
+    _migration_price_history,
+    _migration_cache_versions,
+    _migration_search,
+    _migration_observation_upsert,
+    _migration_deal_scores,
+    _migration_source_year_indexes,
+]
+
+
+def init_db(db=None):
+    db = db or get_db()
+    with db.writer() as c:
+        version = c.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(c)
+            c.execute(f"PRAGMA user_version={number}")
+    return db
+
+
+# ---------------- READS ----------------
+def data_version(tables=VERSIONED_TABLES, db=None):
+    """Version counters of `tables`; any write to one of them changes the result."""
+    db = db or get_db()
+    placeholders = ",".join("?" * len(tables))
+    with db.reader() as conn:
+        versions = dict(conn.execute(
+            f"SELECT name, version FROM data_versions WHERE name IN ({placeholders})", list(tables)
+        ).fetchall())
+    return tuple(versions.get(table, 0) for table in tables)
+
+
+def get_all_autotrader_cars(db=None):
+    db = db or get_db()
+    with db.reader() as conn:
+        return pd.read_sql_query("SELECT * FROM autotrader ORDER BY id DESC", conn)
+
+
+def get_all_kijiji_cars(db=None):
+    db = db or get_db()
+    with db.reader() as conn:
+        return pd.read_sql_query("SELECT * FROM kjiji ORDER BY id DESC", conn)
+
@@ -0,0 +1,174 @@
+"""Deal scores: how far each listing's price sits below that of comparable cars.
+
+Peers are listings of the same normalized make and model within a band of
+model years (carsapp.db.DEAL_GROUP), split further into odometer bands. For
+every group, in one vectorized pandas pass over all of them:
+
+  * quartiles of price; prices more than TRIM_IQR interquartile ranges (of
+    log price) outside them are left unscored (monthly payments, "call for price" placeholders, typos)
+    and kept out of the statistics;
+  * a least-squares fit of log price against odometer and model year over
+    the remaining peers, for a mileage-adjusted expected price;
+  * the median of each odometer band, the fallback when there is no usable
+    fit (too few cars with an odometer, or price rising with km).
+
+deal_score = (expected_price - price) / expected_price, so 0.15 reads "15%
+below comparable cars". Scores are written to listings (indexed, for the
+best-deal sort) and band statistics to deal_groups. Triggers queue the groups
+each write touches in deal_dirty; score_deals() rescores just those.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from carsapp.db import DEAL_GROUP, deal_group, get_db
+from carsapp.metrics import timed
+
+
+# ---------------- CONFIG ----------------
+ODOMETER_BAND_KM = 40_000
+MIN_PEERS = 5               # listings (itself included) a group needs before it is scored
+MIN_PRICE = 500             # anything lower is not a real asking price
+TRIM_IQR = 3.0              # outlier fences: quartiles -/+ this many IQRs of log price
+MIN_SPREAD = 0.25           # q3 / q1 taken as at least 1 + this: fences reach at least q1 / 1.25**3
+UNKNOWN_KM = -1             # odometer_band of listings without an odometer
+
+GROUP = ["make", "model", "year_band"]
+BAND = GROUP + ["odometer_band"]
+SCORES = ("expected_price", "deal_score")
+NUMERIC = ["price_num", "odometer_km", "year"]
+
+
+@dataclass
+class DealStats:
+    groups: int = 0
+    listings: int = 0
+    scored: int = 0
+    changed: int = 0
+
+
+# ---------------- SCORING ----------------
+def score_frame(df):
+    """Score listings (make, model, year_band, year, price_num, odometer_km) against each other.
+
+    Returns (scores indexed like `df` with expected_price and deal_score,
+    band statistics with one row per make/model/year band/odometer band).
+    """
+    df = df.copy()
+    # Straight from sqlite, a column none of the rows has a value in is all None (object dtype).
+    df[NUMERIC] = df[NUMERIC].apply(pd.to_numeric).astype(float)
+    df["odometer_band"] = (df["odometer_km"] // ODOMETER_BAND_KM * ODOMETER_BAND_KM).fillna(UNKNOWN_KM).astype(int)
+    keys = [df[c] for c in GROUP]
+    price = df["price_num"].where(df["price_num"] >= MIN_PRICE)
+
+    # Fences on log price: asking prices of one model spread by ratios, not dollars.
+    q1, q3 = _group_quantile(price, df, 0.25), _group_quantile(price, df, 0.75)
+    spread = np.maximum(q3 / q1, 1 + MIN_SPREAD) ** TRIM_IQR
+    inlier = price.between(q1 / spread, q3 * spread)
+    price = price.where(inlier)
+    peers = price.groupby(keys).transform("count")
+
+    # Log price against odometer (thousands of km) and model year over the
+    # inliers of each group (cars lose a share of their value per km and per
+    # year): two-variable least squares solved from per-group sums. Groups of
+    # a single model year fall back to odometer alone.
+    fit = inlier & df["odometer_km"].notna() & df["year"].notna()
+    x, t, y = (df["odometer_km"] / 1000).where(fit), df["year"].where(fit), np.log(price.where(fit))
+    mean_x, mean_t, mean_y = (v.groupby(keys).transform("mean") for v in (x, t, y))
+    dx, dt, dy = x - mean_x, t - mean_t, y - mean_y
+    sxx, stt, sxt, sxy, sty = ((a * b).groupby(keys).transform("sum")
+                               for a, b in ((dx, dx), (dt, dt), (dx, dt), (dx, dy), (dt, dy)))
+    det = sxx * stt - sxt * sxt
+    both = det > 1e-9 * sxx * stt
+    per_km = ((stt * sxy - sxt * sty) / det).where(both, sxy / sxx)
+    per_year = ((sxx * sty - sxt * sxy) / det).where(both, 0.0)
+    # Too few cars, or a line where price rises with km or falls with year, is noise.
+    usable = (x.groupby(keys).transform("count") >= MIN_PEERS) & (sxx > 0) & (per_km < 0) & (per_year >= 0)
+    per_km, per_year = per_km.where(usable), per_year.where(usable)
+    # No extrapolating past the odometers the line was fitted on.
+    km = (df["odometer_km"] / 1000).clip(x.groupby(keys).transform("min"), x.groupby(keys).transform("max"))
+    predicted = np.exp(mean_y + per_km * (km - mean_x) + per_year * (df["year"] - mean_t))
+
+    band_keys = [df[c] for c in BAND]
+    band_median = price.groupby(band_keys).transform("median")
+    band_peers = price.groupby(band_keys).transform("count")
+    fallback = band_median.where(band_peers >= MIN_PEERS, price.groupby(keys).transform("median"))
+    expected = predicted.where(predicted.notna(), fallback)
+
+    scored = inlier & (peers >= MIN_PEERS)
+    scores = pd.DataFrame({
+        "expected_price": expected.where(scored).round(0),
+        "deal_score": ((expected - price) / expected).where(scored).round(4),
+    })
+
+    bands = df[BAND].assign(price=price, slope_per_km=per_km / 1000, slope_per_year=per_year)
+    bands = bands.dropna(subset=["price"]).groupby(BAND)
+    stats = pd.concat([
+        bands["price"].agg(["count", "median"]).rename(columns={"count": "peers"}),
+        bands["price"].quantile(0.25).rename("q1"),
+        bands["price"].quantile(0.75).rename("q3"),
+        bands[["slope_per_km", "slope_per_year"]].first(),
+    ], axis=1).reset_index()
+    return scores, stats
+
+
+def _group_quantile(values, df, q):
+    # Per-row quantile of its make/model/year band, from one groupby.quantile.
+    by_group = values.groupby([df[c] for c in GROUP]).quantile(q)
+    return pd.Series(by_group.reindex(pd.MultiIndex.from_frame(df[GROUP])).to_numpy(), index=df.index)
+
+
+# ---------------- STORE ----------------
+def _dirty_listings(conn):
+    # Every listing of the queued groups (they are scored against each other),
+    # one seek per group on the deal group expression index.
+    key = " AND ".join(f"{expr.format(row='')} = ?" for expr in DEAL_GROUP)
+    sql = (f"SELECT id, price_num, odometer_km, year, {deal_group()}, expected_price, deal_score"
+           f" FROM listings WHERE {key}")
+    rows = []
+    for group in conn.execute("SELECT make, model, year_band FROM deal_dirty").fetchall():
+        rows.extend(conn.execute(sql, group))
+    return pd.DataFrame(rows, columns=["id", "price_num", "odometer_km", "year"] + GROUP + list(SCORES))
+
+
+@timed("score")
+def score_deals(full=False, db=None):
+    """Rescore the peer groups queued since the last run (every group with `full`).
+
+    Runs in one write transaction, so a group queued by a concurrent write
+    is either seen here or left queued for the next run.
+    """
+    db = db or get_db()
+    stats = DealStats()
+    with db.writer() as conn:
+        if full:
+            conn.execute(f"INSERT OR IGNORE INTO deal_dirty SELECT DISTINCT {deal_group()} FROM listings")
+        stats.groups = conn.execute("SELECT COUNT(*) FROM deal_dirty").fetchone()[0]
+        if not stats.groups:
+            return stats
+        df = _dirty_listings(conn)
+        scores, bands = score_frame(df)
+        bands["scored_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        # Only rows whose score moved are written; a rerun on unchanged data writes none.
+        same = ((scores == df[list(SCORES)]) | (scores.isna() & df[list(SCORES)].isna())).all(axis=1)
+        changed = scores[~same].astype(object).where(scores[~same].notna(), None)
+        conn.executemany(
+            "UPDATE listings SET expected_price = ?, deal_score = ? WHERE id = ?",
+            zip(changed["expected_price"], changed["deal_score"], df.loc[~same, "id"].tolist()),
+        )
+        conn.execute("DELETE FROM deal_groups WHERE (make, model, year_band) IN"
+                     " (SELECT make, model, year_band FROM deal_dirty)")
+        columns = BAND + ["peers", "median", "q1", "q3", "slope_per_km", "slope_per_year", "scored_at"]
+        conn.executemany(
+            f"INSERT INTO deal_groups ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            bands[columns].astype(object).where(bands[columns].notna(), None).itertuples(index=False, name=None),
+        )
+        conn.execute("DELETE FROM deal_dirty")
+    stats.listings = len(df)
+    stats.scored = int(scores["deal_score"].notna().sum())
+    stats.changed = len(changed)
+    return stats
+
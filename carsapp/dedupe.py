@@ -0,0 +1,246 @@
+"""Link listings of the same car on Autotrader and Kijiji.
+
+Every listing gets a handful of blocking keys (normalized make/model/year with
+odometer and price buckets, its image URL, and MinHash bands of its title).
+Only listings sharing a key are compared, and keys shared by more than
+MAX_BLOCK listings are ignored, so the work grows with the number of new
+listings rather than with the square of the table. Linked listings get a
+row in listing_links; the cluster id is the lowest listings.id in the cluster.
+"""
+import re
+import zlib
+from dataclasses import dataclass
+
+from carsapp.db import get_db
+from carsapp.metrics import timed
+
+
+# ---------------- CONFIG ----------------
+ODOMETER_BUCKET_KM = 5_000
+PRICE_BUCKET = 2_000
+MAX_BLOCK = 64              # blocks larger than this are too generic to be useful
+MATCH_THRESHOLD = 0.85
+CHUNK_SIZE = 5_000          # new listings handled per write transaction
+
+MINHASH_SEEDS = (0x5bd1e995, 0x1b873593, 0x85ebca6b, 0xc2b2ae35, 0x27d4eb2f, 0x165667b1, 0x9e3779b1, 0x7feb352d)
+MINHASH_BAND = 2            # hashes per band: titles sharing a band are candidates
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+# ---------------- KEYS ----------------
+def _norm(text):
+    return "".join(WORD_PATTERN.findall(str(text).lower())) if text else ""
+
+
+def _buckets(value, width):
+    # Two overlapping buckets, so values just either side of a boundary still share one.
+    if value is None:
+        return ("?",)
+    return (f"{int(value // width)}", f"{int(value / width + 0.5)}h")
+
+
+def _image_key(url):
+    if not url:
+        return None
+    url = url.split("?", 1)[0].lower()
+    return url if url.startswith("http") else None
+
+
+def title_words(title):
+    return set(WORD_PATTERN.findall(str(title).lower())) if title else set()
+
+
+def _minhash_bands(words):
+    if len(words) < 2:
+        return []
+    ordered = sorted(words)
+    shingles = [zlib.crc32(f"{a} {b}".encode()) for a, b in zip(ordered, ordered[1:])]
+    signature = [min(h ^ seed for h in shingles) for seed in MINHASH_SEEDS]
+    return [
+        "t:%d:%s" % (i, "-".join(map(str, signature[i:i + MINHASH_BAND])))
+        for i in range(0, len(signature), MINHASH_BAND)
+    ]
+
+
+def blocking_keys(listing):
+    """Block keys of one listing row (a dict with the listings table's columns)."""
+    keys = []
+    make, model = _norm(listing["brand"]), _norm(listing["model"])
+    if make and listing["year"]:
+        for odometer in _buckets(listing["odometer_km"], ODOMETER_BUCKET_KM):
+            for price in _buckets(listing["price_num"], PRICE_BUCKET):
+                keys.append(f"m:{make}:{model}:{listing['year']}:{odometer}:{price}")
+    image = _image_key(listing["image_src"])
+    if image:
+        keys.append(f"i:{image}")
+    keys.extend(_minhash_bands(title_words(listing["title"])))
+    return keys
+
+
+# ---------------- SCORING ----------------
+def _close(a, b, tolerance):
+    return a is not None and b is not None and abs(a - b) <= tolerance * max(abs(a), abs(b), 1)
+
+
+def match_score(a, b):
+    """0..1 likelihood that two listings are the same car."""
+    if _image_key(a["image_src"]) and _image_key(a["image_src"]) == _image_key(b["image_src"]):
+        return 1.0
+    if _norm(a["brand"]) != _norm(b["brand"]) or not a["brand"]:
+        return 0.0
+    if a["year"] and b["year"] and a["year"] != b["year"]:
+        return 0.0
+    # Far-apart readings or prices rule a match out whatever the rest says.
+    for column, limit in (("odometer_km", 0.10), ("price_num", 0.25)):
+        if a[column] is not None and b[column] is not None and not _close(a[column], b[column], limit):
+            return 0.0
+
+    score = 0.0
+    if a["model"] and _norm(a["model"]) == _norm(b["model"]):
+        score += 0.25
+    if a["year"] and a["year"] == b["year"]:
+        score += 0.15
+    if _close(a["odometer_km"], b["odometer_km"], 0.01):
+        score += 0.30
+    elif _close(a["odometer_km"], b["odometer_km"], 0.03):
+        score += 0.20
+    if _close(a["price_num"], b["price_num"], 0.02):
+        score += 0.20
+    elif _close(a["price_num"], b["price_num"], 0.05):
+        score += 0.10
+    words_a, words_b = title_words(a["title"]), title_words(b["title"])
+    if words_a and words_b:
+        score += 0.10 * len(words_a & words_b) / len(words_a | words_b)
+    return score
+
+
+# ---------------- LINKING ----------------
+@dataclass
+class DedupeStats:
+    listings: int = 0
+    candidates: int = 0
+    matches: int = 0
+
+
+LISTING_FIELDS = "id, source, title, brand, model, year, odometer_km, price_num, image_src"
+
+
+def _rows(conn, sql, params=()):
+    cursor = conn.execute(sql, params)
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in cursor]
+
+
+def _find(parent, x):
+    while parent.setdefault(x, x) != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def _apply_matches(conn, matches):
+    # Union the matched pairs with the clusters they already belong to and
+    # rewrite the link rows of every cluster that changed.
+    ids = {i for pair in matches for i in pair}
+    placeholders = ",".join("?" * len(ids))
+    existing = conn.execute(
+        f"SELECT listing_id, cluster_id, score FROM listing_links WHERE cluster_id IN"
+        f" (SELECT cluster_id FROM listing_links WHERE listing_id IN ({placeholders}))",
+        list(ids),
+    ).fetchall()
+
+    parent, scores = {}, {}
+    for listing_id, cluster_id, score in existing:
+        parent[_find(parent, listing_id)] = _find(parent, cluster_id)
+        scores[listing_id] = score
+    for (a, b), score in matches.items():
+        parent[_find(parent, a)] = _find(parent, b)
+        for i in (a, b):
+            scores[i] = max(scores.get(i) or 0.0, score)
+
+    clusters = {}
+    for listing_id in parent:
+        clusters.setdefault(_find(parent, listing_id), []).append(listing_id)
+    rows = []
+    for members in clusters.values():
+        cluster_id = min(members)
+        rows.extend((listing_id, cluster_id, scores.get(listing_id)) for listing_id in members)
+    conn.executemany("INSERT OR REPLACE INTO listing_links (listing_id, cluster_id, score) VALUES (?, ?, ?)", rows)
+
+
+def _link_chunk(conn, listings, stats):
+    conn.executemany(
+        "INSERT OR IGNORE INTO dedupe_blocks (block_key, listing_id, source) VALUES (?, ?, ?)",
+        [(key, listing["id"], listing["source"]) for listing in listings for key in blocking_keys(listing)],
+    )
+    new_ids = [listing["id"] for listing in listings]
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS dedupe_new (listing_id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM dedupe_new")
+    conn.executemany("INSERT INTO dedupe_new VALUES (?)", ((i,) for i in new_ids))
+
+    # Other-source members of the new listings' blocks (only cross-source
+    # pairs are duplicates here), skipping blocks too big to say anything.
+    # CROSS JOIN pins the join order: the planner has no stats for the temp
+    # table and would otherwise scan every block.
+    pairs = conn.execute("""
+        SELECT DISTINCT n.listing_id, o.listing_id
+        FROM dedupe_new d
+        CROSS JOIN dedupe_blocks n ON n.listing_id = d.listing_id
+        CROSS JOIN dedupe_blocks o ON o.block_key = n.block_key AND o.source != n.source
+        WHERE (SELECT COUNT(*) FROM (
+            SELECT 1 FROM dedupe_blocks s WHERE s.block_key = n.block_key LIMIT ?
+        )) < ?
+    """, (MAX_BLOCK + 1, MAX_BLOCK + 1)).fetchall()
+    pairs = {(min(a, b), max(a, b)) for a, b in pairs}
+
+    others = {i for pair in pairs for i in pair} - set(new_ids)
+    by_id = {listing["id"]: listing for listing in listings}
+    for start in range(0, len(others), 900):
+        chunk = list(others)[start:start + 900]
+        for row in _rows(conn, f"SELECT {LISTING_FIELDS} FROM listings WHERE id IN ({','.join('?' * len(chunk))})",
+                         chunk):
+            by_id[row["id"]] = row
+
+    matches = {}
+    for a, b in pairs:
+        left, right = by_id.get(a), by_id.get(b)
+        if left is None or right is None:
+            continue
+        stats.candidates += 1
+        score = match_score(left, right)
+        if score >= MATCH_THRESHOLD:
+            matches[(a, b)] = score
+    if matches:
+        _apply_matches(conn, matches)
+        stats.matches += len(matches)
+    stats.listings += len(listings)
+
+
+@timed("dedupe")
+def link_new(db=None, chunk_size=CHUNK_SIZE):
+    """Block, score and link every listing added since the last run."""
+    db = db or get_db()
+    stats = DedupeStats()
+    while True:
+        with db.writer() as conn:
+            last = conn.execute("SELECT last_listing_id FROM dedupe_state WHERE id = 1").fetchone()[0]
+            listings = _rows(
+                conn, f"SELECT {LISTING_FIELDS} FROM listings WHERE id > ? ORDER BY id LIMIT ?", (last, chunk_size)
+            )
+            if not listings:
+                return stats
+            _link_chunk(conn, listings, stats)
+            conn.execute("UPDATE dedupe_state SET last_listing_id = ? WHERE id = 1", (listings[-1]["id"],))
+
+
+def cluster_members(listing_id, db=None):
+    # listings.id of every listing linked to this one, itself included.
+    db = db or get_db()
+    with db.reader() as conn:
+        rows = conn.execute("""
+            SELECT m.listing_id FROM listing_links l
+            JOIN listing_links m ON m.cluster_id = l.cluster_id
+            WHERE l.listing_id = ? ORDER BY m.listing_id
+        """, (listing_id,)).fetchall()
+    return [row[0] for row in rows] or [listing_id]
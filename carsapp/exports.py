@@ -0,0 +1,95 @@
+"""CSV/Excel exports of whole tables, streamed from a cursor into cached files.
+
+Rows are fetched CHUNK_SIZE at a time and written straight out (openpyxl's
+write-only mode for Excel), so memory stays flat however large the table.
+Finished files are kept in EXPORT_DIR under the tables' data_version and
+reused until the tables change.
+"""
+import csv
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+
+from carsapp.db import data_version, get_db
+from carsapp.metrics import span
+
+
+# ---------------- CONFIG ----------------
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "carsapp-exports")
+CHUNK_SIZE = 5_000
+SHEET_NAME = "Merged Cars"
+
+# export name -> (query, tables whose version keys the cached file)
+EXPORTS = {
+    "autotrader": ("SELECT * FROM autotrader ORDER BY id DESC", ("autotrader",)),
+    "kijiji": ("SELECT * FROM kjiji ORDER BY id DESC", ("kjiji",)),
+    "combined": ("SELECT * FROM listings ORDER BY created_at DESC, id DESC", ("autotrader", "kjiji", "deal_groups")),
+}
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _chunks(cursor, size=CHUNK_SIZE):
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+# ---------------- WRITERS ----------------
+def write_csv(path, cursor):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([d[0] for d in cursor.description])
+        for rows in _chunks(cursor):
+            writer.writerows(rows)
+
+
+def write_xlsx(path, cursor, sheet=SHEET_NAME):
+    from openpyxl import Workbook   # ~0.1 s to import (lxml included): only once an Excel file is built
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet)
+    worksheet.append([d[0] for d in cursor.description])
+    for rows in _chunks(cursor):
+        for row in rows:
+            worksheet.append(row)
+    workbook.save(path)
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx}
+
+
+# ---------------- CACHE ----------------
+def export_path(name, fmt, db=None):
+    """Path of an up-to-date export file, building it first if the tables changed."""
+    db = db or get_db()
+    sql, tables = EXPORTS[name]
+    # The db path is part of the name so two databases never share files.
+    prefix = f"{name}-{hashlib.sha1(db.path.encode()).hexdigest()[:8]}"
+    path = os.path.join(EXPORT_DIR, f"{prefix}-{'-'.join(map(str, data_version(tables, db)))}.{fmt}")
+
+    with _locks_guard:
+        lock = _locks.setdefault((prefix, fmt), threading.Lock())
+    with lock:
+        if os.path.exists(path):
+            return path
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with span("export", name=name, fmt=fmt), db.reader() as conn:
+            WRITERS[fmt](tmp, conn.execute(sql))
+        os.replace(tmp, path)
+        for stale in glob.glob(os.path.join(EXPORT_DIR, f"{prefix}-*.{fmt}")):
+            if stale != path:
+                os.remove(stale)
+    return path
+
+
+def export_bytes(name, fmt, db=None):
+    # For st.download_button(data=...): only the finished file is held in memory.
+    with open(export_path(name, fmt, db), "rb") as f:
+        return f.read()
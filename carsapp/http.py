@@ -0,0 +1,43 @@
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import urlparse
+
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "requests")
+
+
+@lru_cache(maxsize=None)
+def request_template(name):
+    """Captured browser headers, cookies and request bodies of one site, from TEMPLATE_DIR/<name>.json.
+
+    Read once per process; callers share the dicts and copy before changing them.
+    """
+    with open(os.path.join(TEMPLATE_DIR, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class HostRateLimiter:
+    """Spaces out requests so no host sees more than `per_second` of them.
+
+    Shared by all worker threads of a job; each caller blocks only for its own
+    slot, so other hosts are not held up.
+    """
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
@@ -0,0 +1,186 @@
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+
+from carsapp.db import get_db
+from carsapp.matcher import get_matcher
+from carsapp.metrics import count, span
+from carsapp.normalize import parse_odometer, parse_price, parse_year
+
+
+# Rows are sent to sqlite in chunks so a streamed iterable never has to be
+# materialized in full, but the whole call is still one transaction.
+CHUNK_SIZE = 1000
+
+
+@dataclass
+class IngestResult:
+    inserted: int = 0
+    skipped: int = 0
+    updated: int = 0
+
+    def __add__(self, other):
+        return IngestResult(
+            self.inserted + other.inserted,
+            self.skipped + other.skipped,
+            self.updated + other.updated,
+        )
+
+
+# Source-table columns of each row, in the order the ingest functions build them.
+AUTOTRADER_COLUMNS = (
+    "title", "price", "location", "odometer", "image_src", "ad_link", "created_at", "last_seen",
+    "price_num", "odometer_km", "year", "brand", "model",
+)
+
+KIJIJI_COLUMNS = (
+    "type", "name", "description", "image", "price", "priceCurrency", "url",
+    "brand_name", "mileage_value", "mileage_unitCode", "model",
+    "vehicleModelDate", "bodyType", "color", "numberOfDoors",
+    "fuelType", "vehicleTransmission", "created_at", "last_seen",
+    "price_num", "odometer_km", "year",
+)
+
+# Keys produced by the Kijiji ld+json extractor, in KIJIJI_COLUMNS order.
+KIJIJI_KEYS = (
+    "@type", "name", "description", "image", "price", "priceCurrency", "url",
+    "brand.name", "mileageFromOdometer.value", "mileageFromOdometer.unitCode", "model",
+    "vehicleModelDate", "bodyType", "color", "numberOfDoors",
+    "vehicleEngine.fuelType", "vehicleTransmission",
+)
+
+# What a re-sighting compares against: a change in either adds a listing_observations row.
+TRACKED = ("price_num", "odometer_km")
+
+
+def _upsert_sql(table, key, columns):
+    # A known ad keeps its created_at (first seen); everything else is
+    # refreshed, except that a field missing from this scrape keeps its value.
+    updates = ", ".join(
+        f"{column} = coalesce(excluded.{column}, {column})" for column in columns if column not in (key, "created_at")
+    )
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        f" ON CONFLICT ({key}) DO UPDATE SET {updates}"
+    )
+
+
+AUTOTRADER_UPSERT = _upsert_sql("autotrader", "ad_link", AUTOTRADER_COLUMNS)
+KIJIJI_UPSERT = _upsert_sql("kjiji", "url", KIJIJI_COLUMNS)
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _chunks(rows, size=CHUNK_SIZE):
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _stored(conn, table, key, keys):
+    # {key: (price_num, odometer_km)} of the rows already stored, in one indexed SELECT.
+    keys = list(set(keys))
+    if not keys:
+        return {}
+    rows = conn.execute(
+        f"SELECT {key}, {', '.join(TRACKED)} FROM {table} WHERE {key} IN ({','.join('?' * len(keys))})", keys
+    )
+    return {row[0]: row[1:] for row in rows}
+
+
+def _upsert(table, key, columns, sql, rows, result, db):
+    """Upsert `rows` (tuples in `columns` order) in one transaction, counting into `result`.
+
+    New keys count as inserted, known ones whose price or odometer changed as
+    updated, and the rest (only last_seen refreshed) as skipped. Rows without
+    a key are skipped too: NULL never conflicts, so every scrape would insert
+    them again.
+    """
+    key_index = columns.index(key)
+    tracked = [columns.index(column) for column in TRACKED]
+    with span("upsert", table=table, rows=0) as upsert, (db or get_db()).writer() as conn:
+        for chunk in _chunks(rows):
+            upsert.attrs["rows"] += len(chunk)
+            keyed = [row for row in chunk if row[key_index]]
+            result.skipped += len(chunk) - len(keyed)
+            chunk = keyed
+            stored = _stored(conn, table, key, [row[key_index] for row in chunk])
+            for row in chunk:
+                before = stored.get(row[key_index])
+                after = tuple(row[i] for i in tracked)
+                if before is None:
+                    result.inserted += 1
+                else:
+                    after = tuple(old if new is None else new for new, old in zip(after, before))
+                    if after != before:
+                        result.updated += 1
+                    else:
+                        result.skipped += 1
+                stored[row[key_index]] = after
+            conn.executemany(sql, chunk)
+        upsert.attrs.update(inserted=result.inserted, updated=result.updated)
+    count(f"{table}.inserted", result.inserted)
+    count(f"{table}.updated", result.updated)
+    return result
+
+
+def ingest_autotrader(cars, db=None):
+    """Upsert parsed Autotrader cars on ad_link in one transaction.
+
+    `cars` is any iterable of dicts with title, price, location, odometer,
+    image_src and ad_link keys. Cars without a title or an ad_link are
+    skipped. Make, model and year are extracted from the title here so the
+    view never has to.
+    """
+    now = _now()
+    matcher = get_matcher()
+    result = IngestResult()
+
+    def rows():
+        for car in cars:
+            if not car.get("title"):
+                result.skipped += 1
+                continue
+            match = matcher.match(car["title"])
+            yield (
+                car["title"],
+                car.get("price"),
+                car.get("location"),
+                car.get("odometer"),
+                car.get("image_src"),
+                car.get("ad_link"),
+                now,
+                now,
+                parse_price(car.get("price")),
+                parse_odometer(car.get("odometer")),
+                match.year,
+                match.make,
+                match.model,
+            )
+
+    return _upsert("autotrader", "ad_link", AUTOTRADER_COLUMNS, AUTOTRADER_UPSERT, rows(), result, db)
+
+
+def ingest_kijiji(cars, db=None):
+    """Upsert parsed Kijiji cars on url in one transaction.
+
+    `cars` is any iterable of dicts shaped like extract_vehicle_info output.
+    Cars without a url are skipped.
+    """
+    now = _now()
+    rows = (
+        tuple(car.get(key) for key in KIJIJI_KEYS) + (
+            now,
+            now,
+            parse_price(car.get("price")),
+            parse_odometer(car.get("mileageFromOdometer.value"), car.get("mileageFromOdometer.unitCode")),
+            parse_year(car.get("vehicleModelDate"), car.get("name")),
+        )
+        for car in cars
+    )
+    return _upsert("kjiji", "url", KIJIJI_COLUMNS, KIJIJI_UPSERT, rows, IngestResult(), db)
@@ -0,0 +1,359 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import requests
+
+from carsapp.db import get_db
+from carsapp.metrics import span
+
+
+# ---------------- CONFIG ----------------
+WORKERS = 4
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 15       # seconds before the first retry (before jitter)
+BACKOFF_CAP = 300
+BREAKER_THRESHOLD = 3   # consecutive failed jobs (each after its retries) that open a source's circuit
+BREAKER_RESET = 600     # seconds an open circuit rejects jobs before allowing a trial run
+SCRAPE_PAGES = 20       # pages a scrape crawls unless told otherwise (UI and command line)
+POLL = 1.0              # seconds between checks of a job someone is waiting on
+
+SOURCES = ("autotrader", "kijiji")
+
+ACTIVE_STATUSES = ("queued", "running", "retrying")
+
+# Errors worth retrying: network trouble, non-200 pages, and block pages that
+# do not parse as the JSON/HTML we expect.
+RETRYABLE = (requests.RequestException, ValueError, KeyError)
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ---------------- RETRY POLICY ----------------
+class Backoff:
+    """Exponential backoff with full jitter: a random delay in [0, base * 2^(n-1)], capped."""
+
+    def __init__(self, base=BACKOFF_BASE, cap=BACKOFF_CAP, rng=random.random):
+        self.base = base
+        self.cap = cap
+        self.rng = rng
+
+    def delay(self, attempt):
+        return self.rng() * min(self.cap, self.base * 2 ** (attempt - 1))
+
+
+class CircuitBreaker:
+    """Stops hammering a source that keeps failing.
+
+    After `threshold` consecutive failed jobs the circuit opens and jobs for
+    the source fail fast for `reset_after` seconds; then one trial run is let
+    through and its outcome closes or re-opens the circuit. A job's retries
+    are its own: only the job's final outcome is recorded here.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_after=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            return self.opened_at is None or time.monotonic() - self.opened_at >= self.reset_after
+
+    def retry_in(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 0
+            return max(0, self.reset_after - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+# ---------------- RUNNER ----------------
+class JobRunner:
+    """Runs scrape/valuation jobs on background threads and records them in the jobs table.
+
+    A job is a callable taking a `progress(message)` function and returning a
+    summary string. At most one job per kind is active at a time; submitting
+    another returns the active job's id.
+    """
+
+    def __init__(self, db=None, workers=WORKERS, max_attempts=MAX_ATTEMPTS, backoff=None,
+                 breaker_threshold=BREAKER_THRESHOLD, breaker_reset=BREAKER_RESET):
+        self.db = db or get_db()
+        self.max_attempts = max_attempts
+        self.backoff = backoff or Backoff()
+        self.breakers = {}
+        self._breaker_args = (breaker_threshold, breaker_reset)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._reap_orphans()
+
+    def breaker(self, kind):
+        with self._lock:
+            if kind not in self.breakers:
+                self.breakers[kind] = CircuitBreaker(*self._breaker_args)
+            return self.breakers[kind]
+
+    def _update(self, job_id, **values):
+        columns = ", ".join(f"{key} = ?" for key in values)
+        with self.db.writer() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", list(values.values()) + [job_id])
+
+    def _reap_orphans(self):
+        # Jobs whose process died mid-run would otherwise look active forever.
+        with self.db.reader() as conn:
+            rows = conn.execute(
+                f"SELECT id, pid FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                ACTIVE_STATUSES,
+            ).fetchall()
+        for job_id, pid in rows:
+            if not _pid_alive(pid):
+                self._update(job_id, status="failed", message="interrupted: worker process exited",
+                             finished_at=_now())
+
+    def submit(self, kind, fn, params=None):
+        with self._lock, self.db.writer() as conn:
+            active = conn.execute(
+                f"SELECT id FROM jobs WHERE kind = ? AND status IN ({','.join('?' * len(ACTIVE_STATUSES))})"
+                " ORDER BY id DESC LIMIT 1",
+                (kind,) + ACTIVE_STATUSES,
+            ).fetchone()
+            if active:
+                return active[0]
+            job_id = conn.execute(
+                "INSERT INTO jobs (kind, status, params, attempts, pid, created_at) VALUES (?, 'queued', ?, 0, ?, ?)",
+                (kind, json.dumps(params or {}), os.getpid(), _now()),
+            ).lastrowid
+        self._pool.submit(self._run, job_id, kind, fn)
+        return job_id
+
+    def _run(self, job_id, kind, fn):
+        # Each job is its own metrics trace: its fetch, parse and upsert spans nest under it.
+        with span("job", root=True, kind=kind, job_id=job_id):
+            self._attempts(job_id, kind, fn)
+
+    def _attempts(self, job_id, kind, fn):
+        breaker = self.breaker(kind)
+        self._update(job_id, status="running", started_at=_now())
+
+        def progress(message):
+            self._update(job_id, message=str(message))
+
+        for attempt in range(1, self.max_attempts + 1):
+            if not breaker.allow():
+                self._update(job_id, status="failed", finished_at=_now(),
+                             message=f"{kind} circuit open after repeated failures; "
+                                     f"retry in {breaker.retry_in():.0f}s")
+                return
+            self._update(job_id, status="running", attempts=attempt)
+            try:
+                summary = fn(progress)
+            except RETRYABLE as e:
+                if attempt == self.max_attempts:
+                    breaker.record_failure()
+                    self._update(job_id, status="failed", message=f"gave up after {attempt} attempts: {e}",
+                                 finished_at=_now())
+                    return
+                delay = self.backoff.delay(attempt)
+                self._update(job_id, status="retrying",
+                             message=f"attempt {attempt} failed ({e}); retrying in {delay:.0f}s")
+                if self._stop.wait(delay):
+                    self._update(job_id, status="failed", message="cancelled: runner shut down",
+                                 finished_at=_now())
+                    return
+            except Exception as e:
+                breaker.record_failure()
+                self._update(job_id, status="failed", message=f"{type(e).__name__}: {e}", finished_at=_now())
+                return
+            else:
+                breaker.record_success()
+                self._update(job_id, status="succeeded", message=summary, finished_at=_now())
+                return
+
+    def shutdown(self, wait=True):
+        self._stop.set()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _pid_alive(pid):
+    if pid is None:
+        return False
+    if pid == os.getpid():
+        return False    # our own jobs are only active while this runner runs them
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
+
+
+# ---------------- JOBS ----------------
+def scrape_job(source, max_pages=SCRAPE_PAGES, **options):
+    # `options` go to the crawler as is (base_url, db, workers...).
+    from carsapp.deals import score_deals
+    from carsapp.scrapers import autotrader, kijiji
+
+    crawler = {"autotrader": autotrader, "kijiji": kijiji}[source]
+
+    # Pages finished by earlier attempts. A retry resumes after them: restarting
+    # at page 0 would hit the already-stored page and stop before the rest.
+    done = {"pages": 0, "inserted": 0, "updated": 0}
+
+    def run(progress):
+        start, inserted, updated = done["pages"], done["inserted"], done["updated"]
+
+        def update(stats):
+            done["pages"] = start + stats.pages
+            done["inserted"] = inserted + stats.result.inserted
+            done["updated"] = updated + stats.result.updated
+            progress(f"page {done['pages']}: {done['inserted']} new cars, {done['updated']} changed so far")
+
+        stats = crawler.crawl(max_pages=max_pages, progress=update, start_page=start, **options)
+        summary = f"{done['inserted']} new, {done['updated']} changed price or odometer from {done['pages']} pages"
+        # Only peer groups the new and repriced cars belong to are rescored. The
+        # cars are stored by now: a scoring error must not fail the crawl (or trip
+        # the source's breaker). Its groups stay queued for the next run.
+        try:
+            scored = score_deals(db=options.get("db"))
+        except Exception as e:
+            summary += f", deal scoring failed ({type(e).__name__}: {e})"
+        else:
+            summary += f", {scored.groups} peer groups rescored"
+        return f"{summary}, stopped: {stats.stopped}"
+
+    return run
+
+
+def valuation_job(client):
+    from carsapp.valuation import value_pending
+
+    def run(progress):
+        stats = value_pending(client, progress=lambda done, total: progress(f"valued {done} of {total} listings"))
+        return f"{stats.valued} valued, {stats.no_match} without a make/model match, {stats.failed} failed"
+
+    return run
+
+
+def snapshot_job(**options):
+    from carsapp.snapshots import write_snapshot
+
+    def run(progress):
+        written = write_snapshot(**options)
+        return ", ".join(f"{rows} {dataset} rows" for dataset, rows in written.items()) + " appended"
+
+    return run
+
+
+def start_scrape(source, max_pages=SCRAPE_PAGES, runner=None, refresh=False):
+    return (runner or get_runner()).submit(
+        source, scrape_job(source, max_pages, refresh=refresh), {"max_pages": max_pages, "refresh": refresh}
+    )
+
+
+def score_job(full=False):
+    from carsapp.deals import score_deals
+
+    def run(progress):
+        stats = score_deals(full=full)
+        return f"{stats.scored} of {stats.listings} listings in {stats.groups} peer groups scored"
+
+    return run
+
+
+def start_valuation(client, runner=None):
+    return (runner or get_runner()).submit("valuation", valuation_job(client))
+
+
+def start_snapshot(runner=None):
+    return (runner or get_runner()).submit("snapshot", snapshot_job())
+
+
+def start_scoring(full=False, runner=None):
+    return (runner or get_runner()).submit("score", score_job(full), {"full": full})
+
+
+def recent_jobs(limit=10, db=None):
+    with (db or get_db()).reader() as conn:
+        return pd.read_sql_query(
+            "SELECT id, kind, status, attempts, message, created_at, started_at, finished_at"
+            " FROM jobs ORDER BY id DESC LIMIT ?",
+            conn, params=(limit,),
+        )
+
+
+def job_status(job_id, db=None):
+    """(status, message) of one job, whichever process runs it."""
+    with (db or get_db()).reader() as conn:
+        return conn.execute("SELECT status, message FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+
+def wait_for_job(job_id, progress=None, poll=POLL, db=None):
+    """Block until the job finishes; `progress(status, message)` sees each change. Returns the last pair."""
+    last = None
+    while True:
+        current = job_status(job_id, db)
+        if current != last and progress:
+            progress(*current)
+        last = current
+        if current[0] not in ACTIVE_STATUSES:
+            return current
+        time.sleep(poll)
+
+
+# ---------------- SCHEDULE ----------------
+def run_schedule(intervals, runner=None, max_pages=SCRAPE_PAGES, refresh=False, stop=None, log=print):
+    """Submit scrapes (and snapshots) forever, each kind every `intervals[kind]` seconds.
+
+    Every kind runs once at start. A kind whose previous job is still active
+    is not queued twice: the runner hands back the active job instead.
+    Returns once `stop` (a threading.Event) is set.
+    """
+    runner = runner or get_runner()
+    stop = stop or threading.Event()
+    due = dict.fromkeys(intervals, 0.0)
+    while not stop.is_set():
+        now = time.monotonic()
+        for kind, every in intervals.items():
+            if due[kind] > now:
+                continue
+            if kind == "snapshot":
+                job_id = start_snapshot(runner)
+            else:
+                job_id = start_scrape(kind, max_pages, runner, refresh=refresh)
+            log(f"{_now()} {kind}: job #{job_id}, next in {every:.0f}s")
+            due[kind] = now + every
+        stop.wait(max(0.0, min(due.values()) - time.monotonic()))
@@ -0,0 +1,159 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from carsapp.http import request_template
+from carsapp.matcher import get_matcher, match_model
+from carsapp.metrics import span
+
+
+# ---------------- CONFIG ----------------
+BASE_URL = "https://enterprise-api.kdp.kardataservices.com/vehicle-retail-data"
+
+# Browser headers and fixed query parameters, in carsapp/assets/requests/market_guide.json.
+_TEMPLATE = request_template("market_guide")
+HEADERS = _TEMPLATE["headers"]
+GUIDE_PARAMS = _TEMPLATE["guide_params"]
+
+SALE_WINDOW_DAYS = 90
+ODOMETER_BUCKET_KM = 10_000
+ODOMETER_SLACK_KM = 5_000
+NO_ODOMETER_MAX = 1_000_000
+
+MODELS_TTL = 24 * 3600
+GUIDE_TTL = 6 * 3600
+
+
+class MarketGuideError(Exception):
+    pass
+
+
+# ---------------- CACHE ----------------
+class TTLCache:
+    """Thread-safe LRU dict whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Shared by every client: results do not depend on whose token fetched them.
+MODELS_CACHE = TTLCache(maxsize=256, ttl=MODELS_TTL)
+GUIDE_CACHE = TTLCache(maxsize=4096, ttl=GUIDE_TTL)
+
+
+def odometer_bucket(odometer_km):
+    # Guides are requested (and cached) per 10,000 km bucket instead of per exact reading.
+    if odometer_km is None:
+        return NO_ODOMETER_MAX
+    return int(math.ceil((odometer_km + ODOMETER_SLACK_KM) / ODOMETER_BUCKET_KM) * ODOMETER_BUCKET_KM)
+
+
+# ---------------- CLIENT ----------------
+class MarketGuideClient:
+    """kardataservices market-guide API over one pooled keep-alive session."""
+
+    def __init__(self, token, base_url=BASE_URL, models_cache=MODELS_CACHE, guide_cache=GUIDE_CACHE,
+                 pool_size=16, timeout=30, verify=False, rate_limiter=None):
+        self.base_url = base_url.rstrip("/")
+        self.rate_limiter = rate_limiter
+        self.models_cache = models_cache
+        self.guide_cache = guide_cache
+        self.timeout = timeout
+        self.requests_made = 0
+        self.session = requests.Session()
+        self.session.verify = verify
+        self.session.headers.update(HEADERS)
+        self.session.headers["Authorization"] = f"Bearer {token}"
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _get(self, path, params):
+        url = f"{self.base_url}{path}"
+        if self.rate_limiter:
+            self.rate_limiter.wait(url)
+        self.requests_made += 1
+        with span("fetch", source="market_guide", path=path):
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def model_names(self, make):
+        models = self.models_cache.get(make)
+        if models is None:
+            data = self._get("/marketguide/models", {'yearMin': '1940', 'yearMax': '2027', 'makeNames': make})
+            models = tuple(data['modelNames'])
+            self.models_cache.set(make, models)
+        return models
+
+    def guide(self, make, model, year, odometer_km=None):
+        odometer_max = odometer_bucket(odometer_km)
+        key = (make, model, int(year), odometer_max)
+        data = self.guide_cache.get(key)
+        if data is None:
+            today = date.today()
+            params = dict(GUIDE_PARAMS)
+            params.update({
+                'makeNames': make,
+                'modelNames': model,
+                'yearMin': str(int(year) - 1),
+                'odometerMax': str(odometer_max),
+                'saleDateFrom': (today - timedelta(days=SALE_WINDOW_DAYS)).isoformat(),
+                'saleDateTo': today.isoformat(),
+            })
+            data = self._get("/marketguide", params)
+            self.guide_cache.set(key, data)
+        return data
+
+    def resolve(self, title, make=None, year=None):
+        """(make, model, year) the API knows for a listing, using the title for what is not stored."""
+        match = get_matcher().match(title)
+        make = make or match.make
+        if not make:
+            raise MarketGuideError("no brand matched !!!")
+        model = match_model(title, self.model_names(make))
+        if not model:
+            raise MarketGuideError("no model matched !!!")
+        year = year or match.year
+        if not year:
+            raise MarketGuideError("no year matched !!!")
+        return make, model, int(year)
+
+    def lookup(self, title, make=None, year=None, odometer_km=None):
+        make, model, year = self.resolve(title, make, year)
+        return self.guide(make, model, year, odometer_km)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,86 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import pandas as pd
+
+
+BRANDS = ['AM General','Acura','Alfa Romeo','American Motors (AMC)','Aston Martin','Audi','BMW','Bentley','BrightDrop','Buick','Cadillac','Chevrolet','Chrysler','Daewoo','Datsun','Dodge','Ducati','Eagle','FIAT','Ferrari','Fiat','Fisker','Ford','Freightliner','GMC','Genesis','Geo','HUMMER','Harley-Davidson','Hino','Honda','Hyundai','INEOS','INFINITI','Indian','International','Isuzu','Jaguar','Jeep','KTM','Karma','Kawasaki','Kenworth','Kia','Lamborghini','Land Rover','Lexus','Lincoln','Lordstown','Lotus','Lucid','MINI','MV-1','Mack','Maserati','Maybach','Mazda','McLaren','Mercedes-Benz','Mercury','Merkur','Mitsubishi','Moto Guzzi','Nissan','Oldsmobile','Panoz','Peterbilt','Peugeot','Plymouth','Polestar','Pontiac','Porsche','Ram','Renault','Rivian','Rolls-Royce','Saab','Saturn','Scion','Smart','Sterling','Subaru','Suzuki','Tesla','Toyota','Triumph','VPG','Victory','VinFast','Volkswagen','Volvo','Western Star','Yamaha','Yugo','Zero','smart']
+
+YEAR_PATTERN = r"\b(?:19|20)\d{2}\b"
+
+
+def _alternation(names):
+    # Longest names first so "Land Rover" wins over "Rover"-style prefixes, and
+    # alphanumeric lookarounds instead of substring tests so "Geo" does not
+    # match "George" nor "Ram" match "Frame".
+    names = sorted(set(names), key=len, reverse=True)
+    return r"(?<![A-Za-z0-9])(?:" + "|".join(re.escape(n) for n in names) + r")(?![A-Za-z0-9])"
+
+
+@dataclass
+class TitleMatch:
+    make: str = None
+    model: str = None
+    year: int = None
+
+
+class TitleMatcher:
+    """Extracts make, model and year from free-text listing titles.
+
+    Built once from the brand list; matching is a single compiled regex pass
+    per title (or per column with `extract`). Without a model list the model
+    is taken to be the word that follows the make.
+    """
+
+    def __init__(self, brands=BRANDS):
+        self.canonical = {}
+        for brand in brands:
+            # First spelling wins for case-only duplicates (FIAT/Fiat, Smart/smart).
+            self.canonical.setdefault(brand.lower(), brand)
+        make = _alternation(self.canonical.values())
+        self.make_re = re.compile(f"(?P<make>{make})(?:\\s+(?P<model>[A-Za-z0-9][\\w-]*))?", re.IGNORECASE)
+        self.year_re = re.compile(YEAR_PATTERN)
+
+    def match(self, title, model_names=None):
+        if not title:
+            return TitleMatch()
+        result = TitleMatch()
+        year = self.year_re.search(title)
+        if year:
+            result.year = int(year.group(0))
+        make = self.make_re.search(title)
+        if make:
+            result.make = self.canonical[make.group("make").lower()]
+            result.model = make.group("model")
+        if model_names is not None:
+            result.model = match_model(title, model_names)
+        return result
+
+    def extract(self, titles):
+        """Vectorized `match` over a Series of titles -> DataFrame(make, model, year)."""
+        titles = pd.Series(titles, dtype="object").fillna("")
+        found = titles.str.extract(self.make_re)
+        make = found["make"].str.lower().map(self.canonical)
+        year = pd.to_numeric(titles.str.extract(f"({YEAR_PATTERN})")[0], errors="coerce").astype("Int64")
+        return pd.DataFrame({"make": make, "model": found["model"], "year": year}, index=titles.index)
+
+
+@lru_cache(maxsize=256)
+def _model_index(model_names):
+    return re.compile(_alternation(model_names), re.IGNORECASE), {n.lower(): n for n in model_names}
+
+
+def match_model(title, model_names):
+    # model_names comes from the market guide per make; the compiled pattern is cached.
+    model_names = tuple(model_names)
+    if not title or not model_names:
+        return None
+    pattern, canonical = _model_index(model_names)
+    found = pattern.search(title)
+    return canonical[found.group(0).lower()] if found else None
+
+
+@lru_cache(maxsize=1)
+def get_matcher():
+    return TitleMatcher()
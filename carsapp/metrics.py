@@ -0,0 +1,302 @@
+"""Where the time goes: spans and counters per stage, kept in a rotating JSONL store.
+
+    with span("fetch", source="kijiji", page=3):
+        ...
+
+A span times one stage (fetch, parse, upsert, db_read, merge, export,
+render...) with its attributes. Spans nest through a contextvar: each one
+knows its parent and the trace it belongs to, which is one page render or
+one job. Work handed to a thread pool keeps its parent when submitted
+through contextvars.copy_context().run.
+
+Finished spans and counter increments are buffered and appended to
+METRICS_DIR/metrics.jsonl every FLUSH_SECONDS (or FLUSH_RECORDS records).
+The file rotates at MAX_BYTES, keeping BACKUPS older ones, so the store
+stays bounded. load_spans(), stage_summary() and slowest_runs() read it back
+for the Performance page. Percentiles and histograms are computed from the
+raw durations there.
+"""
+import atexit
+import contextvars
+import io
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+from carsapp.db import DB_FILE
+
+
+# ---------------- CONFIG ----------------
+METRICS_DIR = os.environ.get("CARSAPP_METRICS", os.path.join(os.path.dirname(DB_FILE), "metrics"))
+PROFILE_DIR = os.path.join(METRICS_DIR, "profiles")
+MAX_BYTES = 8 * 1024 * 1024     # per file; the Performance page reads up to BACKUPS + 1 of them
+BACKUPS = 3
+FLUSH_SECONDS = 5
+FLUSH_RECORDS = 500
+PROFILES_KEPT = 20
+ENABLED = True
+
+# Upper bounds (ms) of the latency histogram buckets on the Performance page.
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+_current = contextvars.ContextVar("carsapp_span", default=None)
+_buffer = []
+_counters = {}
+_lock = threading.Lock()
+_file_lock = threading.Lock()
+_last_flush = time.monotonic()
+# Span ids: a random prefix per process and a counter, unique across the processes sharing the store.
+_id_prefix = uuid.uuid4().hex[:6]
+_ids = itertools.count()
+
+
+def _id():
+    return f"{_id_prefix}{next(_ids):x}"
+
+
+# ---------------- RECORD ----------------
+class Span:
+    """One timed stage; use as a context manager, or begin()/end() across a script."""
+
+    def __init__(self, stage, root=False, **attrs):
+        self.stage = stage
+        self.attrs = attrs
+        self.root = root
+        self.start = None
+        self._token = None
+
+    def begin(self):
+        parent = None if self.root else _current.get()
+        self.span_id = _id()
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def end(self, error=None, **attrs):
+        ms = (time.perf_counter() - self.start) * 1000
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            _current.set(None)     # ended from another context (e.g. a later rerun)
+        if ENABLED:
+            _record({
+                "record": "span", "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                "stage": self.stage, "ms": round(ms, 3), "trace": self.trace_id, "span": self.span_id,
+                "parent": self.parent_id, "pid": os.getpid(), "error": error, **self.attrs, **attrs,
+            })
+        return ms
+
+    def __enter__(self):
+        return self.begin()
+
+    def __exit__(self, kind, value, tb):
+        self.end(error=kind.__name__ if kind else None)
+        return False
+
+
+def span(stage, root=False, **attrs):
+    """Time a block as `stage`; `root` starts a new trace instead of nesting."""
+    return Span(stage, root=root, **attrs)
+
+
+def timed(stage, **attrs):
+    """Decorator: every call of the function is a `stage` span."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, **attrs):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """Add `n` to a counter; totals are flushed with the spans."""
+    if ENABLED and n:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def _record(record):
+    with _lock:
+        _buffer.append(record)
+        due = len(_buffer) >= FLUSH_RECORDS or time.monotonic() - _last_flush >= FLUSH_SECONDS
+    if due:
+        flush()
+
+
+# ---------------- STORE ----------------
+def _path(directory, n=0):
+    return os.path.join(directory, "metrics.jsonl" + (f".{n}" if n else ""))
+
+
+def _rotate(directory):
+    for n in range(BACKUPS, 0, -1):
+        if os.path.exists(_path(directory, n - 1)):
+            os.replace(_path(directory, n - 1), _path(directory, n))
+
+
+def flush(directory=None):
+    """Append buffered spans and counters to the store."""
+    global _last_flush
+    directory = directory or METRICS_DIR
+    with _lock:
+        records = _buffer[:]
+        _buffer.clear()
+        if _counters:
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            records += [{"record": "counter", "ts": now, "name": name, "value": value, "pid": os.getpid()}
+                        for name, value in _counters.items()]
+            _counters.clear()
+        _last_flush = time.monotonic()
+    if not records:
+        return
+    lines = "".join(json.dumps(record, default=str) + "\n" for record in records)
+    with _file_lock:
+        os.makedirs(directory, exist_ok=True)
+        try:
+            if os.path.getsize(_path(directory)) + len(lines) > MAX_BYTES:
+                _rotate(directory)
+        except FileNotFoundError:
+            pass
+        with open(_path(directory), "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+atexit.register(flush)
+
+
+def load(directory=None, since=None):
+    """Every stored record (newest file last) as a DataFrame, optionally only those from datetime `since` on."""
+    directory = directory or METRICS_DIR
+    frames = []
+    for n in range(BACKUPS, -1, -1):
+        try:
+            if since is not None and datetime.fromtimestamp(os.path.getmtime(_path(directory, n))) < since:
+                continue    # last written before the window: nothing in it is recent enough
+            frames.append(pd.read_json(_path(directory, n), lines=True, dtype={"ts": str}))
+        except (FileNotFoundError, ValueError):
+            continue
+    if not frames:
+        return pd.DataFrame(columns=["record", "ts", "stage", "ms", "trace", "span", "parent"])
+    df = pd.concat(frames, ignore_index=True)
+    if since is not None:
+        df = df[df["ts"] >= since.strftime("%Y-%m-%d %H:%M:%S")]
+    return df
+
+
+def load_spans(directory=None, since=None):
+    df = load(directory, since)
+    return df[df["record"] == "span"].reset_index(drop=True)
+
+
+def load_counters(directory=None, since=None):
+    df = load(directory, since)
+    df = df[df["record"] == "counter"]
+    if df.empty:
+        return pd.DataFrame(columns=["name", "value"])
+    df = df.groupby("name", as_index=False)["value"].sum().astype({"value": int})
+    return df.sort_values("value", ascending=False)
+
+
+# ---------------- SUMMARIES ----------------
+def stage_summary(spans):
+    """count, p50, p95, max and total ms per stage, slowest p95 first."""
+    if spans.empty:
+        return pd.DataFrame(columns=["stage", "count", "p50_ms", "p95_ms", "max_ms", "total_s", "errors"])
+    by_stage = spans.groupby("stage")
+    summary = pd.DataFrame({
+        "count": by_stage["ms"].count(),
+        "p50_ms": by_stage["ms"].quantile(0.5),
+        "p95_ms": by_stage["ms"].quantile(0.95),
+        "max_ms": by_stage["ms"].max(),
+        "total_s": by_stage["ms"].sum() / 1000,
+        "errors": by_stage["error"].count() if "error" in spans else 0,
+    }).round(2)
+    return summary.sort_values("p95_ms", ascending=False).reset_index()
+
+
+def histogram(spans, stage):
+    """Span counts of one stage per latency bucket (label: upper bound)."""
+    ms = spans.loc[spans["stage"] == stage, "ms"]
+    edges = (0,) + BUCKETS_MS + (np.inf,)
+    labels = [f"≤{b:g} ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]:g} ms"]
+    return pd.cut(ms, edges, labels=labels).value_counts(sort=False)
+
+
+def slowest_runs(spans, limit=10):
+    """The slowest root spans (page renders, jobs) with the time their stages took inside."""
+    roots = spans[spans["parent"].isna()].nlargest(limit, "ms")
+    if roots.empty:
+        return roots
+    inside = spans[spans["trace"].isin(roots["trace"]) & spans["parent"].notna()]
+    # Only top-level children: nested spans' time is already in their parent's.
+    inside = inside[inside["parent"].isin(roots["span"])]
+    breakdown = inside.pivot_table(index="trace", columns="stage", values="ms", aggfunc="sum").round(1)
+    attrs = [c for c in ("page", "kind", "job_id") if c in roots]
+    return roots[["ts", "stage", "ms", "trace"] + attrs].join(breakdown, on="trace").reset_index(drop=True)
+
+
+# ---------------- PROFILING ----------------
+def start_profile():
+    """Start profiling this thread (pyinstrument when installed, else cProfile); pass the result to stop_profile.
+
+    None when another profiler is already running: since Python 3.12 only one
+    can be active at a time, so concurrent sessions take turns.
+    """
+    # Imported here: profiling is opt-in, and neither profiler is needed to record spans.
+    try:
+        from pyinstrument import Profiler
+    except ImportError:     # optional: profiles fall back to cProfile
+        from cProfile import Profile as Profiler
+    try:
+        profiler = Profiler()
+        if hasattr(profiler, "output_text"):
+            profiler.start()
+        else:
+            profiler.enable()
+    except (RuntimeError, ValueError):
+        return None
+    return profiler
+
+
+def stop_profile(profiler, name="rerun", directory=None):
+    """Stop `profiler` and save a text report (and .prof file for cProfile); returns the report's path."""
+    directory = directory or PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, f"{datetime.now():%Y%m%d-%H%M%S-%f}-{name}")
+    if hasattr(profiler, "output_text"):   # pyinstrument
+        profiler.stop()
+        report = profiler.output_text(unicode=True, color=False)
+    else:
+        import pstats
+
+        profiler.disable()
+        profiler.dump_stats(stem + ".prof")     # for snakeviz and friends
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        report = out.getvalue()
+    with open(stem + ".txt", "w", encoding="utf-8") as f:
+        f.write(report)
+    for old in sorted(os.listdir(directory))[:-PROFILES_KEPT * 2]:
+        os.remove(os.path.join(directory, old))
+    return stem + ".txt"
+
+
+def recent_profiles(directory=None, limit=10):
+    directory = directory or PROFILE_DIR
+    try:
+        names = sorted((n for n in os.listdir(directory) if n.endswith(".txt")), reverse=True)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names[:limit]]
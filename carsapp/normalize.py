@@ -0,0 +1,48 @@
+import re
+
+
+# Scraped prices and odometers arrive as display strings ("$24,995", "85,000 km",
+# "24995.0"). These helpers turn them into numbers for the typed columns.
+
+_NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+_MILES_RE = re.compile(r"\bmi(?:les?)?\b", re.IGNORECASE)
+
+MILES_TO_KM = 1.609344
+MILE_UNITS = {"SMI", "MI", "MILES"}
+
+
+def _first_number(text):
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = _NUMBER_RE.search(str(text))
+    if not match:
+        return None
+    return float(match.group(0).replace(",", ""))
+
+
+def parse_price(text):
+    return _first_number(text)
+
+
+def parse_odometer(text, unit=None):
+    value = _first_number(text)
+    if value is None:
+        return None
+    in_miles = str(unit).upper() in MILE_UNITS if unit else bool(_MILES_RE.search(str(text)))
+    if in_miles:
+        value *= MILES_TO_KM
+    return int(round(value))
+
+
+def parse_year(*texts):
+    # First plausible model year found in any of the given strings.
+    for text in texts:
+        if text is None:
+            continue
+        match = _YEAR_RE.search(str(text))
+        if match:
+            return int(match.group(0))
+    return None
@@ -0,0 +1,263 @@
+import re
+from dataclasses import dataclass, fields
+
+import pandas as pd
+
+from carsapp.cache import cached
+from carsapp.db import get_db
+
+
+# Filterable columns differ slightly between the two source tables.
+# "combined" is the trigger-maintained listings table holding both.
+# "versions" are the versioned tables a cached query on the source reads.
+SOURCES = {
+    "autotrader": {"table": "autotrader", "brand": "brand", "model": "model", "versions": ("autotrader",)},
+    "kijiji": {"table": "kjiji", "brand": "brand_name", "model": "model", "versions": ("kjiji",)},
+    "combined": {"table": "listings", "brand": "brand", "model": "model",
+                 "versions": ("autotrader", "kjiji", "listing_links", "deal_groups")},
+}
+LISTINGS_VERSIONS = SOURCES["combined"]["versions"]
+
+
+def _source_versions(source, *args, **kwargs):
+    return SOURCES[source]["versions"]
+
+
+# sort key -> (column, direction). Every sort column is indexed on each table
+# that offers the sort (see carsapp.db) and ties are broken on id, which gives
+# a stable keyset cursor of (value, id): a page is one index seek, not a sort.
+SORTS = {
+    "newest": ("created_at", "DESC"),
+    "oldest": ("created_at", "ASC"),
+    "price_low": ("price_num", "ASC"),
+    "price_high": ("price_num", "DESC"),
+    "km_low": ("odometer_km", "ASC"),
+    "year_new": ("year", "DESC"),
+    "best_deal": ("deal_score", "DESC"),
+}
+# Sorts on columns only the combined listings table has (scored by carsapp.deals).
+COMBINED_SORTS = ("best_deal",)
+
+PAGE_SIZE = 24
+
+# Keeps only the first listing (lowest id) of each cluster found by carsapp.dedupe.
+NOT_DUPLICATE = (
+    "NOT EXISTS (SELECT 1 FROM listing_links k WHERE k.listing_id = listings.id AND k.cluster_id != listings.id)"
+)
+
+
+@dataclass
+class ListingFilters:
+    brand: str = None
+    model: str = None
+    year_min: int = None
+    year_max: int = None
+    price_min: float = None
+    price_max: float = None
+    max_km: int = None
+    added_since: str = None     # "YYYY-MM-DD"
+    hide_duplicates: bool = False   # combined only: one listing per cross-site cluster
+
+    def key(self):
+        return tuple(getattr(self, f.name) for f in fields(self))
+
+
+@dataclass
+class Page:
+    rows: pd.DataFrame
+    next_cursor: tuple = None   # pass back as `after` to get the following page
+
+
+def _where(source, filters):
+    spec = SOURCES[source]
+    clauses, params = [], []
+
+    def add(clause, value):
+        if value is not None and value != "":
+            clauses.append(clause)
+            params.append(value)
+
+    add(f"{spec['brand']} = ?", filters.brand)
+    add(f"{spec['model']} = ?", filters.model)
+    add("year >= ?", filters.year_min)
+    add("year <= ?", filters.year_max)
+    add("price_num >= ?", filters.price_min)
+    add("price_num <= ?", filters.price_max)
+    add("odometer_km <= ?", filters.max_km)
+    add("created_at >= ?", filters.added_since and str(filters.added_since))
+    if filters.hide_duplicates and source == "combined":
+        clauses.append(NOT_DUPLICATE)
+    return clauses, params
+
+
+@cached(_source_versions)
+def query_listings(source, filters=None, sort="newest", after=None, page_size=PAGE_SIZE, db=None):
+    """Return one page of listings from `source` matching `filters`.
+
+    Pagination is keyset based: `after` is the `next_cursor` of the previous
+    page, so every page costs an index seek no matter how deep it is. Rows
+    with no value in the sort column are left out of that ordering.
+    """
+    db = db or get_db()
+    filters = filters or ListingFilters()
+    column, direction = SORTS[sort]
+    clauses, params = _where(source, filters)
+    clauses.append(f"{column} IS NOT NULL")
+    if after is not None:
+        clauses.append(f"({column}, id) {'<' if direction == 'DESC' else '>'} (?, ?)")
+        params.extend(after)
+
+    sql = (
+        f"SELECT * FROM {SOURCES[source]['table']}"
+        f" WHERE {' AND '.join(clauses)}"
+        f" ORDER BY {column} {direction}, id {direction}"
+        f" LIMIT ?"
+    )
+    with db.reader() as conn:
+        df = pd.read_sql_query(sql, conn, params=params + [page_size + 1])
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        next_cursor = (last[column].item() if hasattr(last[column], "item") else last[column], int(last["id"]))
+    return Page(df, next_cursor)
+
+
+@cached(_source_versions)
+def distinct_values(source, field, brand=None, db=None):
+    # Options for the brand/model filter widgets, served from the (brand, model, year) index.
+    db = db or get_db()
+    spec = SOURCES[source]
+    column = spec[field]
+    sql = f"SELECT DISTINCT {column} FROM {spec['table']} WHERE {column} IS NOT NULL"
+    params = []
+    if brand:
+        sql += f" AND {spec['brand']} = ?"
+        params.append(brand)
+    with db.reader() as conn:
+        return [row[0] for row in conn.execute(sql + " ORDER BY 1", params)]
+
+
+# ---------------- SEARCH ----------------
+SEARCH_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class SearchResults:
+    rows: pd.DataFrame
+    total: int
+
+
+def fts_query(text):
+    """FTS5 MATCH expression for free text typed in the search box.
+
+    Every word must match (quoted, so "4x4" or "AWD-" are not FTS syntax) and
+    the last one also matches as a prefix, for results while typing.
+    """
+    words = SEARCH_WORD.findall(text.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+@cached(LISTINGS_VERSIONS)
+def search_listings(text, filters=None, page=0, page_size=PAGE_SIZE, db=None):
+    """Listings matching `text`, best first, with highlighted title and description snippet.
+
+    Ranked by bm25 (title weighted over description) straight from the FTS5
+    index; `filters` narrow the matches like on the combined listing view.
+    Pages are numbered from 0.
+    """
+    db = db or get_db()
+    match = fts_query(text)
+    if match is None:
+        return SearchResults(pd.DataFrame(), 0)
+    clauses, params = _where("combined", filters or ListingFilters())
+    where = " AND ".join(["listings_fts MATCH ?"] + clauses)
+    joined = "FROM listings_fts JOIN listings ON listings.id = listings_fts.rowid"
+
+    with db.reader() as conn:
+        total = conn.execute(f"SELECT COUNT(*) {joined} WHERE {where}", [match] + params).fetchone()[0]
+        rows = pd.read_sql_query(
+            f"""
+            SELECT listings.*,
+                   highlight(listings_fts, 0, '**', '**') AS title_match,
+                   snippet(listings_fts, 1, '**', '**', '…', 16) AS snippet
+            {joined} WHERE {where}
+            ORDER BY listings_fts.rank LIMIT ? OFFSET ?
+            """,
+            conn, params=[match] + params + [page_size, page * page_size],
+        )
+    return SearchResults(rows, total)
+
+
+# ---------------- HISTORY ----------------
+@cached(LISTINGS_VERSIONS)
+def price_history(listing_id, db=None):
+    # Every change of one listing (listings.id), oldest first, from the (listing_id, seen_at) key.
+    db = db or get_db()
+    with db.reader() as conn:
+        return pd.read_sql_query(
+            "SELECT seen_at, price_num, odometer_km FROM listing_observations WHERE listing_id = ? ORDER BY seen_at",
+            conn, params=(listing_id,),
+        )
+
+
+@cached(LISTINGS_VERSIONS)
+def price_drops(since=None, min_drop=1, limit=50, db=None):
+    """Listings whose price is now at least `min_drop` below the first one seen.
+
+    Only listings with an observation since `since` ("YYYY-MM-DD") are
+    looked at, found through the seen_at index; the biggest drops come first.
+    """
+    db = db or get_db()
+    sql = """
+        SELECT * FROM (
+            SELECT l.id, l.source, l.title, l.brand, l.model, l.year, l.ad_link, l.created_at, c.changed_at,
+                   (SELECT o.price_num FROM listing_observations o
+                    WHERE o.listing_id = l.id AND o.price_num IS NOT NULL ORDER BY o.seen_at LIMIT 1) AS first_price,
+                   l.price_num AS price
+            FROM (
+                SELECT listing_id, MAX(seen_at) AS changed_at FROM listing_observations {recent}
+                GROUP BY listing_id
+            ) c
+            JOIN listings l ON l.id = c.listing_id
+        )
+        WHERE first_price - price >= ?
+        ORDER BY first_price - price DESC, id
+        LIMIT ?
+    """
+    # Without stats the planner prefers walking the primary key for the GROUP BY,
+    # which reads every observation however recent `since` is.
+    recent = "INDEXED BY idx_listing_observations_seen_at WHERE seen_at >= ?" if since else ""
+    params = ([str(since)] if since else []) + [min_drop, limit]
+    with db.reader() as conn:
+        df = pd.read_sql_query(sql.format(recent=recent), conn, params=params)
+    df["drop"] = df["first_price"] - df["price"]
+    df["drop_pct"] = (100 * df["drop"] / df["first_price"]).round(1)
+    return df
+
+
+@cached(LISTINGS_VERSIONS)
+def days_on_market(brand=None, min_listings=1, db=None):
+    """Days between first and last sighting, per make/model.
+
+    Listings still being seen count up to their latest sighting. Served from
+    the (brand, model, created_at, last_seen) covering index.
+    """
+    db = db or get_db()
+    sql = """
+        SELECT brand, model, COUNT(*) AS listings,
+               ROUND(AVG(julianday(last_seen) - julianday(created_at)), 1) AS avg_days,
+               ROUND(MAX(julianday(last_seen) - julianday(created_at)), 1) AS max_days
+        FROM listings
+        WHERE brand IS NOT NULL AND last_seen IS NOT NULL
+    """
+    params = []
+    if brand:
+        sql += " AND brand = ?"
+        params.append(brand)
+    sql += " GROUP BY brand, model HAVING COUNT(*) >= ? ORDER BY avg_days DESC"
+    with db.reader() as conn:
+        return pd.read_sql_query(sql, conn, params=params + [min_listings])
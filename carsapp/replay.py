@@ -0,0 +1,189 @@
+"""Record scraper/API responses to a fixture store and serve them back offline.
+
+Recording mounts an adapter on a requests session, so any crawler or client
+that takes a `session` can be recorded unchanged. Replay is a local HTTP
+server; point the crawler's `base_url` (or MarketGuideClient's) at it.
+"""
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+
+# Query parameters that change from run to run (the market guide's sale-date
+# window) and would otherwise stop recorded responses from matching.
+IGNORED_PARAMS = {"saleDateFrom", "saleDateTo"}
+
+
+def request_key(method, url, body=None):
+    """(method, path?query, body hash) with the host dropped, so replays match on any base_url."""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS)
+    target = parts.path + ("?" + urlencode(query) if query else "")
+    if isinstance(body, str):
+        body = body.encode()
+    body_hash = hashlib.sha1(body).hexdigest() if body else ""
+    return method.upper(), target, body_hash
+
+
+# ---------------- STORE ----------------
+class FixtureStore:
+    """One JSON file per recorded response in `directory`."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.directory, hashlib.sha1("\n".join(key).encode()).hexdigest()[:20] + ".json")
+
+    def save(self, key, status, content_type, body):
+        method, target, body_hash = key
+        record = {"method": method, "target": target, "body_hash": body_hash,
+                  "status": status, "content_type": content_type, "body": body}
+        tmp = self._file(key) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp, self._file(key))
+
+    def load(self, key):
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".json"))
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Sends requests as usual and saves every response into a FixtureStore."""
+
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        key = request_key(request.method, request.url, request.body)
+        self.store.save(key, response.status_code, response.headers.get("Content-Type", ""), response.text)
+        return response
+
+
+def recording_session(session, store):
+    # Keeps the session's pool size; crawlers size it to their worker count.
+    pool_size = session.get_adapter("https://").poolmanager.connection_pool_kw.get("maxsize", 10)
+    adapter = RecordingAdapter(store, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def record_crawl(source, directory, max_pages=3, **options):
+    """Crawl `max_pages` live pages of a source into a fixture store.
+
+    Uses a throwaway database so the crawl does not stop early at listings
+    already stored in cars.db. `options` go to the crawler (base_url, workers...).
+    """
+    from carsapp.db import Database, init_db
+    from carsapp.scrapers import autotrader, kijiji
+
+    crawler = {"autotrader": autotrader, "kijiji": kijiji}[source]
+    store = FixtureStore(directory)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = init_db(Database(os.path.join(tmp, "record.db")))
+        try:
+            return crawler.crawl(max_pages=max_pages, db=db,
+                                 session=recording_session(crawler.new_session(), store), **options)
+        finally:
+            db.close()
+
+
+# ---------------- REPLAY ----------------
+class ReplayServer:
+    """Serves a FixtureStore over HTTP with added latency and random 503s.
+
+    Each request sleeps `latency` seconds plus up to `jitter` more, then fails
+    with probability `error_rate`. Requests with no recording get a 404.
+    """
+
+    def __init__(self, store, latency=0.0, jitter=0.0, error_rate=0.0, seed=None, port=0):
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stats = {"requests": 0, "errors": 0, "missing": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else None
+                status, content_type, payload = replay.respond(self.command, self.path, body)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type or "text/plain")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def respond(self, method, path, body=None):
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self.latency + self._rng.random() * self.jitter
+            fail = self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.stats["errors"] += 1
+            return 503, "text/plain", b"injected error"
+        record = self.store.load(request_key(method, path, body))
+        if record is None:
+            with self._lock:
+                self.stats["missing"] += 1
+            return 404, "text/plain", b"no recording"
+        return record["status"], record["content_type"], record["body"].encode("utf-8")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1 @@
+# Site scrapers: request templates, page parsers and crawlers per source.
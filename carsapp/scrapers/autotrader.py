@@ -0,0 +1,155 @@
+import json
+from functools import partial
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:     # optional: BeautifulSoup is used without it
+    etree = lxml_html = None
+
+from carsapp.http import request_template
+from carsapp.ingest import ingest_autotrader
+from carsapp.metrics import span, timed
+from carsapp.scrapers import common
+
+
+# ---------------- CONFIG ----------------
+BASE_URL = "https://www.autotrader.ca"
+SEARCH_PATH = "/Refinement/Search"
+PAGE_SIZE = 50          # Autotrader's maximum 'Top'
+MAX_PAGES = 20
+WORKERS = 4
+
+
+# Browser session captured from autotrader.ca (the search endpoint rejects
+# requests without it) and the search body, kept in
+# carsapp/assets/requests/autotrader.json and read once, at import.
+_TEMPLATE = request_template("autotrader")
+COOKIES = _TEMPLATE["cookies"]
+HEADERS = _TEMPLATE["headers"]
+SEARCH_PAYLOAD = _TEMPLATE["search_payload"]
+
+
+# ---------------- PARSE ----------------
+# One listing per wrapper div. The XPath expressions are compiled once and
+# evaluated relative to each wrapper; class tests match one token of @class,
+# like BeautifulSoup's class_ does.
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+if etree is not None:
+    WRAPPER_XPATH = etree.XPath(f"//div[{_has_class('dealer-split-wrapper')}]")
+    FIELD_XPATHS = {
+        "title": etree.XPath(f".//span[{_has_class('title-with-trim')}]"),
+        "price": etree.XPath(f".//span[{_has_class('price-amount')}]"),
+        "location": etree.XPath(".//span[@class='proximity-text overflow-ellipsis']"),
+        "odometer": etree.XPath(f".//span[{_has_class('odometer-proximity')}]"),
+    }
+    PHOTO_XPATH = etree.XPath(f"(.//img[{_has_class('photo-image')}])[1]")
+    IMAGE_XPATH = etree.XPath("(.//img)[1]")
+    LINK_XPATH = etree.XPath(f"(.//a[{_has_class('inner-link')}])[1]")
+
+IMAGE_ATTRS = ("data-original", "data-src", "src")
+
+
+def _text(element):
+    # Same as BeautifulSoup's get_text(strip=True).
+    return "".join(piece.strip() for piece in element.itertext())
+
+
+def _image_url(image_tag):
+    if image_tag is None:
+        return None
+    for attr in IMAGE_ATTRS:
+        value = image_tag.get(attr)
+        if value and not value.startswith("data:image"):
+            return value
+    return None
+
+
+def _parse_ads_lxml(html):
+    if not html or not html.strip():
+        return []
+    root = lxml_html.fromstring(html)
+    cars = []
+    for wrapper in WRAPPER_XPATH(root):
+        car = {}
+        for key, xpath in FIELD_XPATHS.items():
+            found = xpath(wrapper)
+            car[key] = _text(found[0]) if found else None
+        images = PHOTO_XPATH(wrapper) or IMAGE_XPATH(wrapper)
+        car["image_src"] = _image_url(images[0] if images else None)
+        links = LINK_XPATH(wrapper)
+        href = links[0].get("href") if links else None
+        car["ad_link"] = BASE_URL + href if href is not None else None
+        cars.append(car)
+    return cars
+
+
+# Without lxml, BeautifulSoup builds only the listing wrappers, not the whole fragment.
+WRAPPER_STRAINER = SoupStrainer("div", class_="dealer-split-wrapper")
+
+
+def _parse_ads_soup(html):
+    soup = BeautifulSoup(html, "html.parser", parse_only=WRAPPER_STRAINER)
+    cars = []
+
+    for wrapper in soup.find_all("div", class_="dealer-split-wrapper"):
+        car = {}
+        for key, tag in (("title", wrapper.find("span", class_="title-with-trim")),
+                         ("price", wrapper.find("span", class_="price-amount")),
+                         ("location", wrapper.find("span", class_="proximity-text overflow-ellipsis")),
+                         ("odometer", wrapper.find("span", class_="odometer-proximity"))):
+            car[key] = tag.get_text(strip=True) if tag else None
+        car["image_src"] = _image_url(wrapper.find("img", class_="photo-image") or wrapper.find("img"))
+        ad_tag = wrapper.find("a", class_="inner-link")
+        car["ad_link"] = BASE_URL + ad_tag["href"] if ad_tag and ad_tag.has_attr("href") else None
+        cars.append(car)
+    return cars
+
+
+@timed("parse", source="autotrader")
+def parse_ads_html(html):
+    """Listings in a search response's AdsHtml fragment, as ingest_autotrader expects them."""
+    if lxml_html is not None:
+        return _parse_ads_lxml(html)
+    return _parse_ads_soup(html)
+
+
+# ---------------- FETCH ----------------
+def new_session(workers=WORKERS):
+    return common.new_session(HEADERS, COOKIES, workers)
+
+
+def fetch_page(session, page, base_url=BASE_URL, page_size=PAGE_SIZE):
+    payload = dict(SEARCH_PAYLOAD, Top=page_size, Skip=page * page_size)
+    with span("fetch", source="autotrader", page=page) as fetch:
+        response = session.post(base_url + SEARCH_PATH, json=payload, timeout=60)
+        fetch.attrs.update(status=response.status_code, bytes=len(response.content))
+    response.raise_for_status()
+    return json.loads(response.text)['AdsHtml']
+
+
+def fetch_and_parse(session, page, base_url=BASE_URL, page_size=PAGE_SIZE):
+    # Runs on a worker thread: parsing happens off the caller's thread too.
+    return parse_ads_html(fetch_page(session, page, base_url, page_size))
+
+
+# ---------------- CRAWL ----------------
+def crawl(max_pages=MAX_PAGES, workers=WORKERS, base_url=BASE_URL, page_size=PAGE_SIZE,
+          session=None, db=None, progress=None, start_page=0, refresh=False):
+    """Walk the newest-first search results until known ads or `max_pages`.
+
+    Pages are fetched `workers` at a time over one shared session and handled
+    in page order: each page goes straight into the bulk upsert, and the crawl
+    stops at the first page with nothing new (or an empty page) unless
+    `refresh` asks for every page, to update prices and last_seen of the ads
+    already stored. `progress(stats)` is called after each page; `start_page`
+    resumes a crawl that failed part way (pages count from 0).
+    """
+    session = session or new_session(workers)
+    fetch = partial(fetch_and_parse, session, base_url=base_url, page_size=page_size)
+    return common.crawl_pages(fetch, ingest_autotrader, max_pages, workers, "autotrader", db, progress,
+                              start_page, refresh, page_size)
@@ -0,0 +1,86 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from carsapp.dedupe import link_new
+from carsapp.ingest import IngestResult
+
+
+@dataclass
+class CrawlStats:
+    pages: int = 0
+    cars: int = 0
+    known: int = 0
+    stopped: str = ""
+    result: IngestResult = field(default_factory=IngestResult)
+
+
+def new_session(headers, cookies, workers):
+    """A session for one site: its captured headers and cookies, one pooled connection per worker."""
+    session = requests.Session()
+    session.verify = False
+    session.headers.update(headers)
+    session.cookies.update(cookies)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def ordered_pages(fetch, max_pages, workers, name="crawl", start=0):
+    """Yield (page, fetch(page)) for pages start..max_pages-1 in order.
+
+    Pages are fetched `workers` at a time on a thread pool. When the caller
+    stops iterating, pages that have not started yet are cancelled. Each
+    fetch runs in a copy of the caller's context, so its metrics spans nest
+    under the caller's (the crawl's job).
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) as pool:
+        for first in range(start, max_pages, workers):
+            window = range(first, min(first + workers, max_pages))
+            futures = [(page, pool.submit(contextvars.copy_context().run, fetch, page)) for page in window]
+            try:
+                for page, future in futures:
+                    yield page, future.result()
+            finally:
+                for _, future in futures:
+                    future.cancel()
+
+
+def crawl_pages(fetch, ingest, max_pages, workers, name, db=None, progress=None, start=0, refresh=False,
+                page_size=None):
+    """Fetch pages with ordered_pages and upsert each with `ingest(cars, db)`, in page order.
+
+    The crawl stops at an empty page, at a short one (fewer than `page_size`
+    cars, when the site has a fixed size) and at the first page with nothing
+    new, unless `refresh` asks for every page. `progress(stats)` is called
+    after each page.
+    """
+    stats = CrawlStats()
+    for page, cars in ordered_pages(fetch, max_pages, workers, name, start):
+        stats.pages += 1
+        if not cars:
+            stats.stopped = "empty page"
+            break
+
+        # Known listings are upserted too: that refreshes their last_seen and records price changes.
+        result = ingest(cars, db)
+        stats.cars += len(cars)
+        stats.known += len(cars) - result.inserted
+        if result.inserted:
+            link_new(db)    # link the page's new cars to their copies on the other site
+        stats.result += result
+        if progress:
+            progress(stats)
+        if not result.inserted and not refresh:
+            stats.stopped = "reached already-stored listings"
+            break
+        if page_size and len(cars) < page_size:
+            stats.stopped = "last page"
+            break
+    else:
+        stats.stopped = f"reached {max_pages} pages"
+    return stats
@@ -0,0 +1,146 @@
+import json
+import re
+from functools import partial
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+from carsapp.http import request_template
+from carsapp.ingest import ingest_kijiji
+from carsapp.metrics import count, span, timed
+from carsapp.scrapers import common
+
+
+# ---------------- CONFIG ----------------
+BASE_URL = "https://www.kijiji.ca"
+CATEGORY_PATH = "/b-cars-trucks/ontario"
+CATEGORY_ID = "c174l9004"
+MAX_PAGES = 20
+WORKERS = 4
+
+
+# Request parameters, headers and cookies captured from a browser session,
+# kept in carsapp/assets/requests/kijiji.json and read once, at import.
+_TEMPLATE = request_template("kijiji")
+PARAMS = _TEMPLATE["params"]
+COOKIES = _TEMPLATE["cookies"]
+HEADERS = _TEMPLATE["headers"]
+
+
+# ---------------- PARSE ----------------
+def extract_vehicle_info(vehicle_data):
+    item = vehicle_data.get("item", {})
+    offers = item.get("offers", {})
+    brand = item.get("brand", {})
+    mileage = item.get("mileageFromOdometer", {})
+    engine = item.get("vehicleEngine", {})
+
+    return {
+        "@type": item.get("@type"),
+        "name": item.get("name"),
+        "description": item.get("description"),
+        "image": item.get("image"),
+        "price": offers.get("price"),
+        "priceCurrency": offers.get("priceCurrency"),
+        "url": item.get("url"),
+        "brand.name": brand.get("name"),
+        "mileageFromOdometer.value": mileage.get("value"),
+        "mileageFromOdometer.unitCode": mileage.get("unitCode"),
+        "model": item.get("model"),
+        "vehicleModelDate": item.get("vehicleModelDate"),
+        "bodyType": item.get("bodyType"),
+        "color": item.get("color"),
+        "numberOfDoors": item.get("numberOfDoors"),
+        "vehicleEngine.fuelType": engine.get("fuelType"),
+        "vehicleTransmission": item.get("vehicleTransmission")
+    }
+
+
+# A list page is ~1 MB of markup around a few small ld+json scripts. Script
+# contents are raw text, so they can be cut out without parsing the HTML.
+LD_JSON_PATTERN = re.compile(
+    r"""<script\b[^>]*\btype\s*=\s*["']?application/ld\+json["']?[^>]*>(.*?)</script\s*>""",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _decode(texts):
+    blocks = []
+    for text in texts:
+        try:
+            blocks.append(json.loads(text))
+        except (json.JSONDecodeError, TypeError):
+            count("kijiji.invalid_json_blocks")
+    return blocks
+
+
+def ld_json_blocks(html):
+    return _decode(match.group(1) for match in LD_JSON_PATTERN.finditer(html))
+
+
+def _ld_json_blocks_soup(html):
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("script", type="application/ld+json"))
+    return _decode(script.string for script in soup.find_all("script"))
+
+
+def _vehicles(blocks):
+    # The listing block is the ItemList; other blocks describe the page itself.
+    for block in blocks:
+        if isinstance(block, dict) and "itemListElement" in block:
+            return [extract_vehicle_info(v) for v in block["itemListElement"]]
+    return None
+
+
+@timed("parse", source="kijiji")
+def parse_list_page(html):
+    vehicles = _vehicles(ld_json_blocks(html))
+    if vehicles is None and "itemListElement" in html:
+        # Script markup the pattern does not cover: let the HTML parser find it.
+        vehicles = _vehicles(_ld_json_blocks_soup(html))
+    return vehicles or []
+
+
+# ---------------- FETCH ----------------
+def page_url(page, base_url=BASE_URL):
+    # Page numbers start at 1; later pages live under /page-N/.
+    if page <= 1:
+        return f"{base_url}{CATEGORY_PATH}/{CATEGORY_ID}"
+    return f"{base_url}{CATEGORY_PATH}/page-{page}/{CATEGORY_ID}"
+
+
+def new_session(workers=WORKERS):
+    return common.new_session(HEADERS, COOKIES, workers)
+
+
+def fetch_page(session, page, base_url=BASE_URL):
+    # Non-200 pages raise; retries with backoff are up to the job runner.
+    with span("fetch", source="kijiji", page=page) as fetch:
+        response = session.get(page_url(page, base_url), params=PARAMS, timeout=60)
+        fetch.attrs.update(status=response.status_code, bytes=len(response.content))
+    if response.status_code != 200:
+        raise requests.HTTPError(f"Kijiji page {page} returned {response.status_code}", response=response)
+    return response.text
+
+
+def fetch_and_parse(session, page, base_url=BASE_URL):
+    return parse_list_page(fetch_page(session, page, base_url))
+
+
+# ---------------- CRAWL ----------------
+def crawl(max_pages=MAX_PAGES, workers=WORKERS, base_url=BASE_URL, session=None, db=None, progress=None,
+          start_page=0, refresh=False):
+    """Walk the newest-first list pages until a page holds only known URLs.
+
+    Pages are fetched `workers` at a time and handled in order. Each page is
+    upserted on kjiji's UNIQUE url, and a page with nothing new ends the
+    crawl, so an incremental refresh touches just the first few pages.
+    `refresh` walks every page instead, to update prices and last_seen of the
+    cars already stored.
+    `progress(stats)` is called after each page; `start_page` resumes a
+    crawl that failed part way (pages count from 0).
+    """
+    session = session or new_session(workers)
+    fetch = partial(fetch_and_parse, session, base_url=base_url)
+    # crawl_pages counts pages from 0, Kijiji from 1.
+    return common.crawl_pages(lambda i: fetch(i + 1), ingest_kijiji, max_pages, workers, "kijiji", db, progress,
+                              start_page, refresh)
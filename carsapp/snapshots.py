@@ -0,0 +1,124 @@
+"""Append-only Parquet snapshots of the listing tables for analysis outside the app.
+
+One dataset per table, hive-partitioned by source and scrape date (readable
+by pandas/pyarrow/duckdb/spark as well as read_snapshot below):
+
+    snapshots/combined/source=kijiji/scrape_date=2026-10-17/part-000001-000950.parquet
+
+Each part holds the rows with ids first..last of one partition. The highest
+`last` in a dataset is its watermark: a new snapshot only writes rows above
+it, so deleting the directory simply starts over.
+"""
+import os
+import re
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from carsapp.db import DB_FILE, get_db
+
+
+# ---------------- CONFIG ----------------
+SNAPSHOT_DIR = os.environ.get("CARSAPP_SNAPSHOTS", os.path.join(os.path.dirname(DB_FILE), "snapshots"))
+CHUNK_SIZE = 50_000
+
+# dataset -> (table, source of its rows). "combined" is the unified listings
+# table, whose rows carry their own source column.
+DATASETS = {"autotrader": ("autotrader", "autotrader"), "kijiji": ("kjiji", "kijiji"), "combined": ("listings", None)}
+
+SQLITE_TYPES = {"INTEGER": pa.int64(), "REAL": pa.float64()}
+PARTITIONING = pa.schema([("source", pa.string()), ("scrape_date", pa.string())])
+PART_PATTERN = re.compile(r"part-(\d+)-(\d+)\.parquet$")
+# Rewritten in place by carsapp.deals; appended parts would only hold stale values.
+DERIVED_COLUMNS = ("expected_price", "deal_score")
+
+
+def _schema(conn, table):
+    # Declared sqlite types -> Arrow types; created_at becomes a real timestamp.
+    fields = []
+    for _, name, kind, *_ in conn.execute(f"PRAGMA table_info({table})"):
+        if name == "source":
+            continue  # stored in the partition path
+        if name in DERIVED_COLUMNS:
+            continue  # from_pandas leaves out columns the schema does not list
+        if name == "created_at":
+            fields.append(pa.field(name, pa.timestamp("s")))
+        else:
+            fields.append(pa.field(name, SQLITE_TYPES.get(kind.upper(), pa.string())))
+    return pa.schema(fields)
+
+
+def watermark(dataset, directory=SNAPSHOT_DIR):
+    """Highest id already written to `dataset` (0 if none)."""
+    last = 0
+    for _, _, files in os.walk(os.path.join(directory, dataset)):
+        for name in files:
+            match = PART_PATTERN.match(name)
+            if match:
+                last = max(last, int(match.group(2)))
+    return last
+
+
+def _write_parts(df, schema, root):
+    for (source, scrape_date), part in df.groupby(["source", "scrape_date"], sort=True):
+        folder = os.path.join(root, f"source={source}", f"scrape_date={scrape_date}")
+        os.makedirs(folder, exist_ok=True)
+        table = pa.Table.from_pandas(part.drop(columns=["source", "scrape_date"]), schema=schema, preserve_index=False)
+        name = f"part-{int(part['id'].min()):06d}-{int(part['id'].max()):06d}.parquet"
+        tmp = os.path.join(folder, f".{name}.tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, os.path.join(folder, name))
+
+
+# ---------------- WRITE ----------------
+def write_snapshot(datasets=tuple(DATASETS), directory=SNAPSHOT_DIR, db=None):
+    """Append rows added since the last snapshot; returns {dataset: rows written}."""
+    db = db or get_db()
+    written = {}
+    with db.reader() as conn:
+        for dataset in datasets:
+            table, source = DATASETS[dataset]
+            schema = _schema(conn, table)
+            written[dataset] = 0
+            chunks = pd.read_sql_query(
+                f"SELECT * FROM {table} WHERE id > ? ORDER BY id", conn,
+                params=(watermark(dataset, directory),), chunksize=CHUNK_SIZE,
+            )
+            for df in chunks:
+                if source:
+                    df["source"] = source
+                df["created_at"] = pd.to_datetime(df["created_at"], format="%Y-%m-%d %H:%M:%S", errors="coerce")
+                df["scrape_date"] = df["created_at"].dt.strftime("%Y-%m-%d").fillna("unknown")
+                _write_parts(df, schema, os.path.join(directory, dataset))
+                written[dataset] += len(df)
+    return written
+
+
+# ---------------- READ ----------------
+def read_snapshot(dataset, source=None, since=None, until=None, columns=None, directory=SNAPSHOT_DIR):
+    """Snapshot rows of one dataset as a DataFrame, read through memory-mapped files.
+
+    `source` and `since`/`until` ("YYYY-MM-DD", inclusive) prune whole
+    partitions before any file is opened. Integer columns come back as
+    nullable Int64 so missing values do not turn them into floats.
+    """
+    filters = []
+    if source:
+        filters.append(("source", "=", source))
+    if since:
+        filters.append(("scrape_date", ">=", str(since)))
+    if until:
+        filters.append(("scrape_date", "<=", str(until)))
+    path = os.path.join(directory, dataset)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=columns)
+    table = pq.read_table(
+        path, columns=columns, filters=filters or None, memory_map=True,
+        partitioning=ds.partitioning(PARTITIONING, flavor="hive"),
+    )
+    df = table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+    if columns is None or "id" in columns:
+        df = df.sort_values("id", ignore_index=True)
+    return df
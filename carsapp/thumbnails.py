@@ -0,0 +1,187 @@
+"""Local 180px thumbnails of listing photos, served instead of the full-size CDN images.
+
+Each photo is downloaded once, shrunk and stored as THUMB_DIR/<sha1 of url>.jpg.
+A failed download leaves an empty <hash>.miss marker, so the card shows the
+bundled placeholder and the URL is not retried until MISS_TTL has passed.
+The directory is an LRU bounded by MAX_BYTES: every hit refreshes the file's
+mtime, and the oldest files go first when it grows past the limit.
+
+Downloads run on a shared pool. A page waits at most WAIT seconds for them;
+photos still in flight show the placeholder and are ready on the next rerun.
+"""
+import contextvars
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait as wait_for
+from io import BytesIO
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from carsapp.db import DB_FILE
+from carsapp.metrics import span
+
+
+# ---------------- CONFIG ----------------
+THUMB_DIR = os.environ.get("CARSAPP_THUMBNAILS", os.path.join(os.path.dirname(DB_FILE), "thumbnails"))
+PLACEHOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "no-image.png")
+THUMB_WIDTH = 180
+JPEG_QUALITY = 80
+MAX_BYTES = 200 * 1024 * 1024
+MISS_TTL = 24 * 3600        # seconds before a failed photo is tried again
+TIMEOUT = 10
+WORKERS = 8
+WAIT = 1.5                  # seconds a page of cards waits on downloads
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                         "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"}
+
+_session = None
+_session_lock = threading.Lock()
+_evict_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="thumbs")
+_pending = {}               # (directory, url) -> Future of a download in flight
+_pending_lock = threading.Lock()
+
+
+def _get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=WORKERS)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _key(url):
+    return hashlib.sha1(url.encode()).hexdigest()
+
+
+def shrink(data, width=THUMB_WIDTH):
+    """JPEG bytes of `data` (any image Pillow reads) scaled down to `width` pixels wide."""
+    from PIL import Image   # imported with the first download, not with every page using thumbnails()
+
+    image = Image.open(BytesIO(data))
+    # For JPEGs, draft() decodes straight at a reduced scale (1/2..1/8),
+    # which is most of the saving on large listing photos.
+    image.draft("RGB", (width, width))
+    image = image.convert("RGB")
+    if image.width > width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+    out = BytesIO()
+    image.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def _store(path, data):
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _download(url, directory, session):
+    from PIL import Image
+
+    key = _key(url)
+    try:
+        with span("fetch", source="thumbnail"):
+            response = session.get(url, timeout=TIMEOUT)
+        response.raise_for_status()
+        data = shrink(response.content)
+    except (requests.RequestException, OSError, Image.DecompressionBombError):
+        # OSError covers Pillow's "cannot identify image file" for HTML error pages.
+        _store(os.path.join(directory, f"{key}.miss"), b"")
+        return None
+    path = os.path.join(directory, f"{key}.jpg")
+    _store(path, data)
+    return path
+
+
+def _cached(url, directory):
+    # (found, path): found is False when the URL still has to be downloaded.
+    key = _key(url)
+    path = os.path.join(directory, f"{key}.jpg")
+    try:
+        os.utime(path)      # an LRU hit
+        return True, path
+    except FileNotFoundError:
+        pass
+    try:
+        if time.time() - os.path.getmtime(os.path.join(directory, f"{key}.miss")) < MISS_TTL:
+            return True, None
+    except FileNotFoundError:
+        pass
+    return False, None
+
+
+def _submit(url, directory, session):
+    key = (directory, url)
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _pending[key] = _pool.submit(contextvars.copy_context().run, _download, url, directory, session)
+            future.add_done_callback(lambda _: _pending.pop(key, None))
+        return future
+
+
+def thumbnails(urls, directory=THUMB_DIR, wait=WAIT, session=None):
+    """{url: local thumbnail path, or None to show the placeholder} for `urls`.
+
+    Cached thumbnails are returned straight away. The rest are downloaded
+    concurrently, and those not done within `wait` seconds map to None for now.
+    """
+    with span("thumbnails") as timing:
+        result = _thumbnails(urls, directory, wait, session)
+        timing.attrs.update(urls=len(result), missing=sum(path is None for path in result.values()))
+    return result
+
+
+def _thumbnails(urls, directory, wait, session):
+    result, futures = {}, {}
+    for url in set(urls):
+        if not url or not str(url).startswith(("http://", "https://")):
+            result[url] = None
+            continue
+        found, path = _cached(url, directory)
+        if found:
+            result[url] = path
+        else:
+            futures[url] = None
+    if futures:
+        os.makedirs(directory, exist_ok=True)
+        session = session or _get_session()
+        futures = {url: _submit(url, directory, session) for url in futures}
+        done, _ = wait_for(futures.values(), timeout=wait)
+        for url, future in futures.items():
+            result[url] = future.result() if future in done else None
+        if done:
+            evict(directory)
+    return result
+
+
+def evict(directory=THUMB_DIR, max_bytes=MAX_BYTES):
+    """Delete least recently used files until the directory is under `max_bytes`."""
+    with _evict_lock:
+        try:
+            entries = [entry for entry in os.scandir(directory) if entry.is_file()]
+        except FileNotFoundError:
+            return 0
+        stats = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries]
+        total = sum(size for _, size, _ in stats)
+        removed = 0
+        for _, size, path in sorted(stats):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            removed += 1
+        return removed
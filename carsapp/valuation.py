@@ -0,0 +1,188 @@
+import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+import requests
+
+from carsapp.cache import cached
+from carsapp.db import get_db
+from carsapp.http import HostRateLimiter
+from carsapp.market_guide import MarketGuideError
+
+
+STATUS_OK = "ok"
+STATUS_NO_MATCH = "no_match"     # make/model/year could not be resolved; not retried
+STATUS_ERROR = "error"           # request failed; retried with retry_errors=True
+
+# Listings of each source and the columns the market guide needs from them.
+PENDING_SQL = {
+    "autotrader": """
+        SELECT l.id, l.title, l.brand, l.year, l.odometer_km
+        FROM autotrader l
+        LEFT JOIN valuations v ON v.source = 'autotrader' AND v.listing_id = l.id
+        WHERE ({pending}) AND NOT EXISTS ({duplicate})
+    """,
+    "kijiji": """
+        SELECT l.id, l.name, l.brand_name, l.year, l.odometer_km
+        FROM kjiji l
+        LEFT JOIN valuations v ON v.source = 'kijiji' AND v.listing_id = l.id
+        WHERE ({pending}) AND NOT EXISTS ({duplicate})
+    """,
+}
+
+# `ok` valuations of the other listings in the cluster of listing m: copies of
+# the same car on the other site (carsapp.dedupe) share their market guide.
+CLUSTER_VALUATIONS = f"""
+    FROM listings m
+    JOIN listing_links k ON k.listing_id = m.id
+    JOIN listing_links c ON c.cluster_id = k.cluster_id AND c.listing_id != m.id
+    JOIN listings o ON o.id = c.listing_id
+    JOIN valuations cv ON cv.source = o.source AND cv.listing_id = o.listing_id AND cv.status = '{STATUS_OK}'
+"""
+
+# A duplicate is not looked up once its cluster has a market guide; until then
+# (none of its copies valued yet, or all of them no_match) it is tried itself.
+DUPLICATE_SQL = "SELECT 1" + CLUSTER_VALUATIONS + " WHERE m.source = '{source}' AND m.listing_id = l.id"
+
+VALUATION_UPSERT = """
+    INSERT OR REPLACE INTO valuations (
+        source, listing_id, status, make, model, year,
+        avg_price, median_price, comparable_count, message, valued_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# The API has used several names for the sold price of a comparable.
+SALE_PRICE_KEYS = ("salePrice", "price", "soldPrice", "saleAmount")
+
+
+@dataclass
+class ValuationStats:
+    valued: int = 0
+    no_match: int = 0
+    failed: int = 0
+
+    @property
+    def total(self):
+        return self.valued + self.no_match + self.failed
+
+
+def summarize(data):
+    """(average, median, count) of the comparable sale prices in a market-guide response."""
+    prices = []
+    for vehicle in data.get("marketGuideVehicles") or []:
+        for key in SALE_PRICE_KEYS:
+            value = vehicle.get(key)
+            if isinstance(value, (int, float)) and value > 0:
+                prices.append(float(value))
+                break
+    if not prices:
+        return None, None, 0
+    return statistics.fmean(prices), statistics.median(prices), len(prices)
+
+
+def valuation_row(source, listing_id, client, title, make=None, year=None, odometer_km=None, data=None):
+    """Value one listing and return the row to store for it. Never raises for API errors."""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        make, model, year = client.resolve(title or "", make, year)
+        if data is None:
+            data = client.guide(make, model, year, odometer_km)
+    except MarketGuideError as e:
+        return (source, listing_id, STATUS_NO_MATCH, make, None, year, None, None, 0, str(e), now)
+    except (requests.RequestException, ValueError, KeyError) as e:
+        return (source, listing_id, STATUS_ERROR, make, None, year, None, None, 0, str(e)[:500], now)
+    avg, median, count = summarize(data)
+    return (source, listing_id, STATUS_OK, make, model, year, avg, median, count, None, now)
+
+
+def store_valuations(rows, db=None):
+    with (db or get_db()).writer() as conn:
+        conn.executemany(VALUATION_UPSERT, rows)
+
+
+def pending_listings(db=None, sources=tuple(PENDING_SQL), retry_errors=False, limit=None):
+    db = db or get_db()
+    pending = "v.listing_id IS NULL"
+    if retry_errors:
+        pending += f" OR v.status = '{STATUS_ERROR}'"
+    for source in sources:
+        duplicate = DUPLICATE_SQL.format(source=source)
+        sql = PENDING_SQL[source].format(pending=pending, duplicate=duplicate) + " ORDER BY l.id DESC"
+        params = ()
+        if limit:
+            sql += " LIMIT ?"
+            params = (limit,)
+        with db.reader() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        for row in rows:
+            yield (source,) + tuple(None if pd.isna(v) else v for v in row)
+
+
+def value_pending(client, db=None, sources=tuple(PENDING_SQL), workers=8, rate_per_sec=5,
+                  retry_errors=False, limit=None, progress=None, flush_every=50):
+    """Value every listing that has no stored valuation yet.
+
+    Lookups run on a bounded thread pool; the client's per-host rate limiter
+    keeps the API from being flooded. Results are written in batches from this
+    thread, so workers never touch the database. `progress(done, total)` is
+    called after each listing.
+    """
+    db = db or get_db()
+    if client.rate_limiter is None and rate_per_sec:
+        client.rate_limiter = HostRateLimiter(rate_per_sec)
+
+    listings = list(pending_listings(db, sources, retry_errors, limit))
+    stats = ValuationStats()
+    batch = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="valuation") as pool:
+        futures = [
+            pool.submit(valuation_row, source, listing_id, client, title, make, year, odometer_km)
+            for source, listing_id, title, make, year, odometer_km in listings
+        ]
+        for future in as_completed(futures):
+            row = future.result()
+            batch.append(row)
+            if row[2] == STATUS_OK:
+                stats.valued += 1
+            elif row[2] == STATUS_NO_MATCH:
+                stats.no_match += 1
+            else:
+                stats.failed += 1
+            if len(batch) >= flush_every:
+                store_valuations(batch, db)
+                batch = []
+            if progress:
+                progress(stats.total, len(listings))
+    if batch:
+        store_valuations(batch, db)
+    return stats
+
+
+@cached(("valuations", "listing_links"))
+def get_valuations(source, listing_ids, db=None):
+    # Stored valuations for one page of listings, indexed by listing id. A
+    # listing without an `ok` one of its own gets its cluster's, if any.
+    db = db or get_db()
+    ids = [int(i) for i in listing_ids]
+    columns = "status, avg_price, median_price, comparable_count, valued_at"
+    if not ids:
+        return pd.DataFrame(columns=["avg_price", "median_price", "comparable_count", "status"])
+    placeholders = ",".join("?" * len(ids))
+    with db.reader() as conn:
+        own = pd.read_sql_query(
+            f"SELECT listing_id, {columns} FROM valuations WHERE source = ? AND listing_id IN ({placeholders})",
+            conn, params=[source] + ids, index_col="listing_id",
+        )
+        missing = [i for i in ids if i not in own.index[own["status"] == STATUS_OK]]
+        if not missing:
+            return own
+        placeholders = ",".join("?" * len(missing))
+        shared = pd.read_sql_query(
+            f"SELECT m.listing_id, {', '.join('cv.' + c for c in columns.split(', '))} {CLUSTER_VALUATIONS}"
+            f" WHERE m.source = ? AND m.listing_id IN ({placeholders}) ORDER BY o.id",
+            conn, params=[source] + missing, index_col="listing_id",
+        )
+    shared = shared[~shared.index.duplicated()]      # the copy listed first
+    return pd.concat([own.drop(shared.index, errors="ignore"), shared])
@@ -0,0 +1,32 @@
+import threading
+
+from carsapp.db import READERS, Database, init_db
+
+
+def test_readers_are_reused_across_threads(tmp_path):
+    # Streamlit runs every rerun on a new thread: each must get a warm connection, not open one.
+    db = init_db(Database(str(tmp_path / "cars.db")))
+    seen = []
+
+    def read():
+        with db.reader() as conn:
+            conn.execute("SELECT COUNT(*) FROM listings").fetchone()
+            seen.append(id(conn))
+
+    for _ in range(5):
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+    assert len(set(seen)) == 1
+    db.close()
+
+
+def test_idle_readers_are_bounded(tmp_path):
+    db = init_db(Database(str(tmp_path / "cars.db")))
+    held = [db.reader() for _ in range(READERS + 2)]
+    conns = [reader.__enter__() for reader in held]
+    assert len(set(map(id, conns))) == READERS + 2
+    for reader in held:
+        reader.__exit__(None, None, None)
+    assert len(db._idle) == READERS
+    db.close()
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from carsapp.db import Database, init_db
+from carsapp.deals import MIN_PEERS, score_deals, score_frame
+from carsapp.ingest import ingest_kijiji
+
+
+COLUMNS = ["make", "model", "year_band", "year", "price_num", "odometer_km"]
+
+
+def test_score_frame_group_without_prices_or_odometers():
+    # As read from sqlite when no queued listing has a price or an odometer: all-None object columns.
+    df = pd.DataFrame([("honda", "civic", 2015, 2016, None, None)] * MIN_PEERS, columns=COLUMNS)
+    scores, bands = score_frame(df)
+    assert scores["deal_score"].isna().all()
+    assert bands.empty
+
+
+def test_score_frame_group_without_odometers():
+    df = pd.DataFrame([("mazda", "3", 2015, 2016, 9000 + i * 100, None) for i in range(MIN_PEERS + 1)],
+                      columns=COLUMNS)
+    scores, bands = score_frame(df)
+    assert scores["deal_score"].notna().all()
+    assert bands["slope_per_km"].isna().all()
+
+
+def test_score_deals_kijiji_page_without_mileage(tmp_path):
+    db = init_db(Database(str(tmp_path / "cars.db")))
+    ingest_kijiji([{"@type": "Car", "name": "2016 Honda Civic", "url": f"https://www.kijiji.ca/v/{i}",
+                    "brand.name": "Honda", "model": "Civic", "vehicleModelDate": "2016"}
+                   for i in range(MIN_PEERS + 1)], db)
+    stats = score_deals(db=db)
+    assert stats.groups == 1 and stats.listings == MIN_PEERS + 1 and stats.scored == 0
+    db.close()
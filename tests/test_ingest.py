@@ -0,0 +1,17 @@
+from carsapp.db import Database, init_db
+from carsapp.ingest import ingest_autotrader, ingest_kijiji
+
+
+def test_ads_without_a_key_are_skipped(tmp_path):
+    # NULL never conflicts: without the skip every scrape would insert these again.
+    db = init_db(Database(str(tmp_path / "cars.db")))
+    autotrader = [{"title": "2016 Honda Civic", "price": "$9,000", "ad_link": None},
+                  {"title": "2017 Honda Civic", "price": "$9,500", "ad_link": "https://www.autotrader.ca/a/1"}]
+    kijiji = [{"@type": "Car", "name": "2016 Honda Civic", "price": "9000", "url": None}]
+    for _ in range(2):
+        at, kj = ingest_autotrader(autotrader, db), ingest_kijiji(kijiji, db)
+    assert (at.inserted, at.skipped, kj.inserted, kj.skipped) == (0, 2, 0, 1)
+    with db.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM autotrader").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM kjiji").fetchone()[0] == 0
+    db.close()
@@ -0,0 +1,26 @@
+import requests
+
+from carsapp.db import Database, init_db
+from carsapp.jobs import BREAKER_THRESHOLD, MAX_ATTEMPTS, Backoff, JobRunner, job_status, wait_for_job
+
+
+def test_breaker_counts_failed_jobs_not_attempts(tmp_path):
+    runner = JobRunner(init_db(Database(str(tmp_path / "cars.db"))), backoff=Backoff(base=0))
+    calls = []
+
+    def failing(progress):
+        calls.append(1)
+        raise requests.ConnectionError("down")
+
+    for job in range(BREAKER_THRESHOLD):
+        job_id = runner.submit("kijiji", failing)
+        wait_for_job(job_id, poll=0.01, db=runner.db)
+        assert job_status(job_id, runner.db)[1].startswith(f"gave up after {MAX_ATTEMPTS} attempts")
+    assert len(calls) == BREAKER_THRESHOLD * MAX_ATTEMPTS
+
+    job_id = runner.submit("kijiji", failing)
+    wait_for_job(job_id, poll=0.01, db=runner.db)
+    assert "circuit open" in job_status(job_id, runner.db)[1]
+    assert len(calls) == BREAKER_THRESHOLD * MAX_ATTEMPTS
+    runner.shutdown()
+    runner.db.close()
@@ -0,0 +1,68 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from carsapp.market_guide import MarketGuideClient, TTLCache
+
+
+class StubAPI(BaseHTTPRequestHandler):
+    # /marketguide/models and /marketguide, counting requests and new TCP connections.
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real API
+    counts = None
+
+    def setup(self):
+        super().setup()
+        self.counts["connections"] += 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.counts[url.path] = self.counts.get(url.path, 0) + 1
+        if url.path.endswith("/models"):
+            body = {"modelNames": {"Honda": ["Civic", "Accord"]}.get(parse_qs(url.query)["makeNames"][0], [])}
+        else:
+            body = {"marketGuideVehicles": [{"salePrice": 12000}, {"salePrice": 14000}]}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    StubAPI.counts = {"connections": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = MarketGuideClient("stub-token", base_url=f"http://127.0.0.1:{server.server_address[1]}",
+                               models_cache=TTLCache(16, 3600), guide_cache=TTLCache(16, 3600))
+    yield client, StubAPI.counts
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_repeated_lookups_are_served_from_cache(stub):
+    client, counts = stub
+    for _ in range(5):
+        client.lookup("2016 Honda Civic LX", make="Honda", year=2016, odometer_km=120_000)
+    assert client.requests_made == 2
+    assert counts["/marketguide/models"] == 1 and counts["/marketguide"] == 1
+
+
+def test_duplicate_lookups_share_requests_and_one_connection(stub):
+    client, counts = stub
+    # The same car listed twice (readings within one odometer bucket), then another model of the make.
+    client.lookup("2016 Honda Civic LX", make="Honda", year=2016, odometer_km=120_000)
+    client.lookup("Honda Civic 2016", make="Honda", year=2016, odometer_km=121_500)
+    client.lookup("2018 Honda Accord", make="Honda", year=2018, odometer_km=60_000)
+    assert counts["/marketguide/models"] == 1       # one model list per make
+    assert counts["/marketguide"] == 2              # one guide per model/year/odometer bucket
+    assert client.requests_made == 3
+    assert counts["connections"] == 1               # every request over the same keep-alive connection
@@ -0,0 +1,25 @@
+from carsapp.db import Database, init_db
+from carsapp.ingest import ingest_kijiji
+from carsapp.scrapers.common import crawl_pages
+
+
+def page(i, size=3):
+    return [{"@type": "Car", "name": "2016 Honda Civic", "price": "9000", "url": f"https://www.kijiji.ca/v/{i}-{n}"}
+            for n in range(size)]
+
+
+def test_crawl_pages_stops_at_known_short_and_empty_pages(tmp_path):
+    db = init_db(Database(str(tmp_path / "cars.db")))
+    stats = crawl_pages(page, ingest_kijiji, 5, 2, "test", db)
+    assert (stats.pages, stats.result.inserted, stats.stopped) == (5, 15, "reached 5 pages")
+
+    stats = crawl_pages(page, ingest_kijiji, 5, 2, "test", db)
+    assert (stats.pages, stats.known, stats.stopped) == (1, 3, "reached already-stored listings")
+    stats = crawl_pages(page, ingest_kijiji, 5, 2, "test", db, refresh=True)
+    assert (stats.pages, stats.stopped) == (5, "reached 5 pages")
+
+    stats = crawl_pages(lambda i: page(i + 10, size=3 if i < 2 else 1), ingest_kijiji, 5, 2, "test", db, page_size=3)
+    assert (stats.pages, stats.stopped) == (3, "last page")
+    stats = crawl_pages(lambda i: page(i + 20) if i < 1 else [], ingest_kijiji, 5, 2, "test", db)
+    assert (stats.pages, stats.stopped) == (2, "empty page")
+    db.close()
@@ -0,0 +1,40 @@
+from carsapp.db import Database, init_db
+from carsapp.ingest import ingest_autotrader, ingest_kijiji
+from carsapp.valuation import STATUS_NO_MATCH, STATUS_OK, get_valuations, pending_listings, store_valuations
+
+
+def linked_pair(tmp_path):
+    # The same car on both sites, the Autotrader ad (lower listings.id) the cluster's representative.
+    db = init_db(Database(str(tmp_path / "cars.db")))
+    ingest_autotrader([{"title": "2016 Honda", "price": "$9,000", "odometer": "120,000 km",
+                        "ad_link": "https://www.autotrader.ca/a/1"}], db)
+    ingest_kijiji([{"@type": "Car", "name": "2016 Honda Civic", "price": "9000", "url": "https://www.kijiji.ca/v/1",
+                    "brand.name": "Honda", "model": "Civic", "vehicleModelDate": "2016"}], db)
+    with db.writer() as conn:
+        ids = [i for i, in conn.execute("SELECT id FROM listings ORDER BY id")]
+        conn.executemany("INSERT INTO listing_links VALUES (?, ?, 1.0)", [(i, ids[0]) for i in ids])
+    return db
+
+
+def valuation(source, status, median=None):
+    return (source, 1, status, "Honda", "Civic", 2016, median, median, 3 if median else 0, None, "2026-01-01 00:00:00")
+
+
+def test_duplicate_valued_until_its_cluster_has_a_market_guide(tmp_path):
+    db = linked_pair(tmp_path)
+    assert {row[0] for row in pending_listings(db)} == {"autotrader", "kijiji"}
+    store_valuations([valuation("autotrader", STATUS_NO_MATCH)], db)
+    assert [row[0] for row in pending_listings(db)] == ["kijiji"]
+    store_valuations([valuation("kijiji", STATUS_OK, 8500.0)], db)
+    assert list(pending_listings(db)) == []
+    db.close()
+
+
+def test_duplicate_shows_its_cluster_valuation(tmp_path):
+    db = linked_pair(tmp_path)
+    store_valuations([valuation("autotrader", STATUS_NO_MATCH), valuation("kijiji", STATUS_OK, 8500.0)], db)
+    shared = get_valuations("autotrader", [1], db=db)
+    assert shared.loc[1, "status"] == STATUS_OK and shared.loc[1, "median_price"] == 8500.0
+    own = get_valuations("kijiji", [1], db=db)
+    assert own.loc[1, "median_price"] == 8500.0
+    db.close()
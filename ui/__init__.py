@@ -0,0 +1 @@
+# Streamlit helpers shared by the app's pages (app_pages/); imported once per process, not on every rerun.
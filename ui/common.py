@@ -0,0 +1,27 @@
+from functools import partial
+
+import pandas as pd
+import streamlit as st
+
+from carsapp.db import get_db, init_db
+from carsapp.exports import export_bytes
+
+
+# ---------------- DATABASE ----------------
+@st.cache_resource
+def database():
+    # One connection manager per server process, shared by every session and rerun.
+    return init_db(get_db())
+
+
+def export_data(name, fmt):
+    # Built only when the button is clicked (on Streamlit's download thread),
+    # then served from carsapp.exports' file cache until the table changes.
+    return partial(export_bytes, name, fmt, database())
+
+
+# ---------------- FORMATTING ----------------
+def na(value, default="N/A"):
+    if value is None or (isinstance(value, float) and pd.isna(value)) or value == "":
+        return default
+    return value
@@ -0,0 +1,42 @@
+import streamlit as st
+
+from carsapp.jobs import ACTIVE_STATUSES, JobRunner, recent_jobs
+from ui.common import database, na
+
+
+# ---------------- JOBS ----------------
+@st.cache_resource
+def job_runner():
+    return JobRunner(database())
+
+
+STATUS_ICONS = {"queued": "⏳", "running": "🔄", "retrying": "🔁", "succeeded": "✅", "failed": "⚠️"}
+
+
+POLL_SECONDS = 2
+
+
+def jobs_panel(kinds):
+    """Recent jobs of `kinds`, refreshed every POLL_SECONDS while one of them is queued or running.
+
+    Without an active job the panel does not poll at all: starting a job from a
+    button reruns the page, which turns polling back on.
+    """
+    polling = _recent(kinds)["status"].isin(ACTIVE_STATUSES).any()
+    st.fragment(_jobs_list, run_every=POLL_SECONDS if polling else None)(kinds, polling)
+
+
+def _recent(kinds):
+    jobs = recent_jobs(limit=20)
+    return jobs[jobs["kind"].isin(kinds)].head(5)
+
+
+def _jobs_list(kinds, polling):
+    # Polls the jobs table; scrapes and valuations run on the runner's threads, never in the script.
+    jobs = _recent(kinds)
+    for job in jobs.to_dict("records"):
+        icon = STATUS_ICONS.get(job["status"], "")
+        st.caption(f"{icon} #{job['id']} {job['kind']} — {job['status']} "
+                   f"(attempt {job['attempts']}): {na(job['message'], '')}")
+    if polling and not jobs["status"].isin(ACTIVE_STATUSES).any():
+        st.rerun()      # the last one finished: a full rerun stops the polling and shows what it stored
@@ -0,0 +1,224 @@
+import pandas as pd
+import streamlit as st
+
+from carsapp.metrics import timed
+from carsapp.queries import (
+    COMBINED_SORTS, PAGE_SIZE, SORTS, ListingFilters, distinct_values, query_listings, search_listings,
+)
+from carsapp.thumbnails import PLACEHOLDER, thumbnails
+from carsapp.valuation import STATUS_OK, get_valuations
+from ui.common import na
+
+
+# ---------------- FILTERS & PAGING ----------------
+SORT_LABELS = {
+    "newest": "Newest first",
+    "oldest": "Oldest first",
+    "price_low": "Price: low to high",
+    "price_high": "Price: high to low",
+    "km_low": "Lowest km",
+    "year_new": "Newest model year",
+    "best_deal": "Best deal (vs. similar cars)",
+}
+
+
+def listing_controls(key, source):
+    # Filter widgets for one expander; returns the filters and sort key to query with.
+    c1, c2, c3, c4 = st.columns(4)
+    brand = c1.selectbox("Brand", [""] + distinct_values(source, "brand"), key=f"{key}_brand")
+    model = c2.selectbox("Model", [""] + distinct_values(source, "model", brand=brand), key=f"{key}_model")
+    year_min = c3.number_input("Year from", min_value=1900, max_value=2100, value=None, step=1, key=f"{key}_year_min")
+    year_max = c4.number_input("Year to", min_value=1900, max_value=2100, value=None, step=1, key=f"{key}_year_max")
+
+    c5, c6, c7, c8, c9 = st.columns(5)
+    price_min = c5.number_input("Min price", min_value=0, value=None, step=1000, key=f"{key}_price_min")
+    price_max = c6.number_input("Max price", min_value=0, value=None, step=1000, key=f"{key}_price_max")
+    max_km = c7.number_input("Max km", min_value=0, value=None, step=10000, key=f"{key}_max_km")
+    added_since = c8.date_input("Added since", value=None, key=f"{key}_added_since")
+    sorts = [sort for sort in SORTS if source == "combined" or sort not in COMBINED_SORTS]
+    sort = c9.selectbox("Sort by", sorts, format_func=SORT_LABELS.get, key=f"{key}_sort")
+
+    filters = ListingFilters(
+        brand=brand or None,
+        model=model or None,
+        year_min=year_min,
+        year_max=year_max,
+        price_min=price_min,
+        price_max=price_max,
+        max_km=max_km,
+        added_since=added_since.isoformat() if added_since else None,
+        hide_duplicates=source == "combined" and st.checkbox(
+            "Hide cars listed on both sites", value=True, key=f"{key}_hide_duplicates"),
+    )
+    return filters, sort
+
+
+def paged_query(key, source, filters, sort):
+    # Keyset cursors of the pages visited so far; the last one is the current page.
+    query_key = (filters.key(), sort)
+    if st.session_state.get(f"{key}_query") != query_key:
+        st.session_state[f"{key}_query"] = query_key
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+    return query_listings(source, filters, sort=sort, after=cursors[-1])
+
+
+def pager(key, page):
+    cursors = st.session_state[f"{key}_cursors"]
+    prev_col, label_col, next_col = st.columns([1, 2, 1])
+    prev_col.button("⬅️ Prev", key=f"{key}_prev", disabled=len(cursors) == 1,
+                    on_click=cursors.pop)
+    label_col.caption(f"Page {len(cursors)}")
+    next_col.button("Next ➡️", key=f"{key}_next", disabled=page.next_cursor is None,
+                    on_click=cursors.append, args=(page.next_cursor,))
+
+
+# ---------------- CARDS ----------------
+CARD_WINDOW = 24
+
+
+def card_window(key, df, window=CARD_WINDOW):
+    # Only a bounded slice of the rows is ever turned into cards.
+    if len(df) <= window:
+        return df
+    pages = (len(df) + window - 1) // window
+    number = st.number_input(f"Cards page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_card_page")
+    start = (number - 1) * window
+    return df.iloc[start:start + window]
+
+
+def render_cards(key, df, title_col, image_col, details, actions=None):
+    # to_dict("records") converts the visible window in one pass instead of
+    # building a Series per row like iterrows; each card's details are one
+    # markdown element instead of a dozen st.write calls.
+    window = card_window(key, df)
+    # Local 180px thumbnails, downloaded together the first time a photo is shown.
+    images = thumbnails(window[image_col].tolist())
+    for car in window.to_dict("records"):
+        with st.container():
+            cols = st.columns([1, 3])
+            with cols[0]:
+                # Thumbnails are JPEGs, the placeholder a PNG: with "auto", st.image
+                # would decode and re-encode the placeholder as JPEG on every rerun.
+                image = images.get(car[image_col])
+                st.image(image or PLACEHOLDER, width=180, output_format="JPEG" if image else "PNG")
+            with cols[1]:
+                st.subheader(na(car[title_col], "Unknown Vehicle"))
+                if actions:
+                    actions(car)
+                st.markdown(details(car) + valuation_markdown(car), unsafe_allow_html=True)
+        st.divider()
+
+
+@timed("merge")
+def with_valuations(df, source):
+    # Stored market-guide summaries for the listings on this page (one indexed lookup).
+    valuations = get_valuations(source, df["id"])
+    valuations = valuations[valuations["status"] == STATUS_OK]
+    return df.join(valuations[["avg_price", "median_price", "comparable_count"]], on="id")
+
+
+@timed("merge")
+def with_combined_valuations(df):
+    # Combined rows carry their source and the id within it.
+    if df.empty:
+        return df
+    valuations = pd.concat([
+        get_valuations(source, group["listing_id"]).assign(source=source).reset_index()
+        for source, group in df.groupby("source")
+    ])
+    valuations = valuations[valuations["status"] == STATUS_OK].set_index(["source", "listing_id"])
+    return df.join(valuations[["avg_price", "median_price", "comparable_count"]], on=["source", "listing_id"])
+
+
+def valuation_markdown(car):
+    if na(car.get("median_price"), None) is None:
+        return ""
+    return (f"  \n**Market guide:** median ${car['median_price']:,.0f} · "
+            f"avg ${car['avg_price']:,.0f} ({car['comparable_count']:.0f} comparable sales)")
+
+
+def autotrader_details(car):
+    return "  \n".join([
+        f"**Price:** {car['price']}",
+        f"**Location:** {car['location']}",
+        f"**Odometer:** {car['odometer']}",
+        f":gray[🕒 Added on: {car['created_at']}]",
+        f"[🔗 View Ad]({car['ad_link']})",
+    ])
+
+
+def kijiji_details(car):
+    lines = [
+        f"**Type:** {na(car['type'])}",
+        f"**Model:** {na(car['model'])} ({na(car['vehicleModelDate'])})",
+        f"**Price:** {na(car['price'])} {na(car['priceCurrency'], '')}",
+        f"**Brand:** {na(car['brand_name'])}",
+        f"**Body Type:** {na(car['bodyType'])}",
+        f"**Color:** {na(car['color'])}",
+        f"**Fuel Type:** {na(car['fuelType'])}",
+        f"**Transmission:** {na(car['vehicleTransmission'])}",
+        "\n---\n",
+        f"**Mileage:** {na(car['mileage_value'])} {na(car['mileage_unitCode'], '')}",
+        f"**Doors:** {na(car['numberOfDoors'])}",
+        f":gray[🕒 Added on: {car['created_at']}]",
+    ]
+    if na(car["url"], None):
+        lines.append(f"[🔗 View Ad]({car['url']})")
+    return "  \n".join(lines)
+
+
+SOURCE_LABELS = {"autotrader": "Autotrader", "kijiji": "Kijiji"}
+
+
+def merged_details(car):
+    lines = [
+        f":gray[📦 Source: {SOURCE_LABELS.get(car['source'], car['source'])}]",
+        f"**Price:** {na(car['price'])} {na(car['currency'], '')}",
+        f"**Brand:** {na(car['brand'])}",
+        f"**Model:** {na(car['model'])} ({na(car['vehicleModelDate'])})",
+        f"**Body Type:** {na(car['bodyType'])}",
+        f"**Color:** {na(car['color'])}",
+        f"**Fuel Type:** {na(car['fuelType'])}",
+        f"**Transmission:** {na(car['vehicleTransmission'])}",
+        f"**Odometer:** {na(car['odometer'])}",
+        f":gray[🕒 Added on: {car['created_at']}]",
+    ]
+    if na(car["deal_score"], None) is not None:
+        below = "below" if car["deal_score"] >= 0 else "above"
+        lines.append(f"**Deal:** {abs(car['deal_score']):.0%} {below} the ${car['expected_price']:,.0f}"
+                     f" expected for similar cars")
+    if na(car["ad_link"], None):
+        lines.append(f"[🔗 View Ad]({car['ad_link']})")
+    return "  \n".join(lines)
+
+
+def search_details(car):
+    # The matching part of a Kijiji description, above the usual combined details.
+    snippet = na(car["snippet"], None)
+    return (f"…{snippet}…  \n" if snippet else "") + merged_details(car)
+
+
+# ---------------- SEARCH ----------------
+def search_panel():
+    text = st.text_input("🔎 Search titles and descriptions", placeholder='e.g. AWD one owner', key="search_text")
+    if not text.strip():
+        return
+    if st.session_state.get("search_query") != text:
+        st.session_state["search_query"] = text
+        st.session_state["search_page"] = 0
+    number = st.session_state["search_page"]
+    results = search_listings(text, ListingFilters(hide_duplicates=True), page=number)
+    if not results.total:
+        st.info("No listings match that search.")
+        return
+    pages = (results.total + PAGE_SIZE - 1) // PAGE_SIZE
+    st.caption(f"{results.total} matching listings")
+    render_cards("search", with_combined_valuations(results.rows), "title_match", "image_src", search_details)
+
+    prev_col, label_col, next_col = st.columns([1, 2, 1])
+    prev_col.button("⬅️ Prev", key="search_prev", disabled=number == 0,
+                    on_click=st.session_state.update, kwargs={"search_page": number - 1})
+    label_col.caption(f"Page {number + 1} of {pages}")
+    next_col.button("Next ➡️", key="search_next", disabled=number + 1 >= pages,
+                    on_click=st.session_state.update, kwargs={"search_page": number + 1})
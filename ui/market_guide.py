@@ -0,0 +1,54 @@
+import re
+
+import requests
+import streamlit as st
+
+from carsapp.jobs import start_valuation
+from carsapp.market_guide import MarketGuideClient, MarketGuideError
+from carsapp.valuation import store_valuations, valuation_row
+from ui.common import na
+from ui.jobs import job_runner, jobs_panel
+
+
+# ---------------- MARKET GUIDE ----------------
+def bearer_token(token_text):
+    match = re.search(r'Authorization:\s*Bearer\s+([A-Za-z0-9\-\._]+)', token_text or "")
+    if not match:
+        return None
+    return match.group(1)
+
+
+@st.cache_resource
+def market_guide_client(token):
+    # One pooled session per token, kept across reruns; result caches are shared.
+    return MarketGuideClient(token)
+
+
+def market_guide_button(source, car, title, make, token):
+    if not token:
+        st.write(f"no token !!!")
+        return
+    if not st.button(f"{car['id']} - get market guide - {title.lower()}"):
+        return
+
+    # Make/year/odometer were normalized at ingest; the client only falls back to the title.
+    client = market_guide_client(token)
+    make, year, odometer_km = na(make, None), na(car.get("year"), None), na(car.get("odometer_km"), None)
+    try:
+        data = client.lookup(title, make=make, year=year, odometer_km=odometer_km)
+    except MarketGuideError as e:
+        st.warning(str(e))
+        return
+    except requests.RequestException as e:
+        st.error(f"Market guide request failed: {e}")
+        return
+    # Keep the summary so the card shows it without another call next time.
+    store_valuations([valuation_row(source, int(car["id"]), client, title, make, year, odometer_km, data=data)])
+    data = {k: v for k, v in data.items() if k != 'marketGuideVehicles'}
+    st.write(data)
+
+
+def value_all_button(token):
+    if token and st.button("💰 Value all listings without a market guide"):
+        start_valuation(market_guide_client(token), runner=job_runner())
+    jobs_panel(["valuation"])